@@ -1 +1,43 @@
-# Register your models here.
+from django.contrib import admin, messages
+
+from .models import ImportRun
+
+
+@admin.register(ImportRun)
+class ImportRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "file_name",
+        "user",
+        "status",
+        "total_rows",
+        "rows_per_second",
+        "error_count",
+        "created_at",
+        "duration",
+    )
+    list_filter = ("status",)
+    search_fields = ("file_name", "task_id")
+    readonly_fields = [f.name for f in ImportRun._meta.fields]
+    actions = ["resume_import"]
+
+    def error_count(self, obj):
+        return len(obj.errors)
+
+    error_count.short_description = "Ошибок"
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Возобновить импорт с последнего чекпоинта")
+    def resume_import(self, request, queryset):
+        from .services import process_uploaded_csv
+
+        resumable = (
+            queryset.exclude(status__in=[ImportRun.Status.SUCCESS, ImportRun.Status.PREVIEW])
+            .exclude(source_file="")
+        )
+        for run in resumable:
+            task = process_uploaded_csv.delay(import_run_id=run.pk)
+            ImportRun.objects.filter(pk=run.pk).update(task_id=task.id)
+        self.message_user(request, f"Возобновлено импортов: {resumable.count()}", messages.SUCCESS)
@@ -0,0 +1,164 @@
+# data_processing/diff.py
+"""
+Dry-run импорта: что изменится в коллекции, без записи в БД.
+
+CSV читается pandas'ом целиком в колонки, существующие карты поднимаются
+одним запросом (на пачку ID), а create/update/unchanged и дельты количества
+считаются векторно. Строки к записи сохраняются в файл, и применение
+(services.apply_import_diff) работает по ним, не разбирая CSV повторно.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from django.core.files.base import ContentFile
+
+from mtg_app.models import Card
+
+from .models import ImportRun
+from .services import CANONICAL_FIELDS, _resolve_column
+
+CREATE, UPDATE, UNCHANGED = "create", "update", "unchanged"
+ID_BATCH_SIZE = 10_000  # держимся ниже лимита параметров SQLite
+SAMPLE_SIZE = 100       # сколько строк каждого вида показываем на странице
+
+
+@dataclass
+class ImportDiff:
+    frame: pd.DataFrame  # по строке на карту: канонические колонки + status, old_/new_ значения
+    errors: list = field(default_factory=list)
+    merged_duplicates: int = 0
+    total_rows: int = 0
+
+    def count(self, status: str) -> int:
+        return int((self.frame["status"] == status).sum())
+
+    @property
+    def summary(self) -> dict:
+        changed = self.frame[self.frame["status"] != UNCHANGED]
+        return {
+            "total_rows": self.total_rows,
+            CREATE: self.count(CREATE),
+            UPDATE: self.count(UPDATE),
+            UNCHANGED: self.count(UNCHANGED),
+            "errors": len(self.errors),
+            "merged_duplicates": self.merged_duplicates,
+            "quantity_delta": int(changed["quantity_delta"].sum()),
+        }
+
+    def samples(self, status: str, limit: int = SAMPLE_SIZE) -> list[dict]:
+        part = self.frame[self.frame["status"] == status].head(limit)
+        return [
+            {
+                "row": int(row_num),
+                "name": row["name"],
+                "set_code": row["set code"],
+                "old_quantity": int(row["old_quantity"]),
+                "new_quantity": int(row["new_quantity"]),
+                "quantity_delta": int(row["quantity_delta"]),
+                "old_price": float(row["old_price"]),
+                "new_price": float(row["new_price"]),
+            }
+            for row_num, row in part.iterrows()
+        ]
+
+    def planned_rows(self) -> list:
+        """[(номер строки, каноническая строка), ...] — только то, что надо записать."""
+        part = self.frame[self.frame["status"] != UNCHANGED]
+        records = part[list(CANONICAL_FIELDS)].to_dict("records")
+        return [(int(row_num), record) for row_num, record in zip(part.index, records, strict=True)]
+
+
+def read_csv_frame(file_path: str) -> pd.DataFrame:
+    """CSV -> DataFrame с каноническими колонками (строки), индекс — номер строки в файле."""
+    raw = pd.read_csv(file_path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    if raw.columns.empty:
+        raise ValueError("CSV пуст или не имеет заголовков.")
+    field_map = {str(column).lower().strip(): column for column in raw.columns}
+
+    empty = pd.Series("", index=raw.index, dtype=object)
+    frame = pd.DataFrame(
+        {
+            name: raw[column].str.strip() if (column := _resolve_column(field_map, name)) else empty
+            for name in CANONICAL_FIELDS
+        }
+    )
+    frame.index = raw.index + 2  # строка 1 — заголовок
+    return frame
+
+
+def _existing_cards(scryfall_ids: np.ndarray, owner_id: int | None) -> pd.DataFrame:
+    rows = []
+    for start in range(0, len(scryfall_ids), ID_BATCH_SIZE):
+        batch = scryfall_ids[start : start + ID_BATCH_SIZE].tolist()
+        rows.extend(
+            Card.objects.filter(owner_id=owner_id, printing__scryfall_id__in=batch)
+            .values_list("printing__scryfall_id", "quantity", "purchase_price")
+        )
+    existing = pd.DataFrame(rows, columns=["scryfall id", "old_quantity", "old_price"])
+    existing["old_price"] = existing["old_price"].astype(float)
+    return existing
+
+
+def compute_import_diff(file_path: str, owner_id: int | None = None) -> ImportDiff:
+    """Та же семантика, что у импорта: количество и цена существующей записи коллекции
+    владельца выставляются из файла, дубликаты суммируются в первое вхождение."""
+    frame = read_csv_frame(file_path)
+    total_rows = len(frame)
+
+    valid = (frame["scryfall id"] != "") & (frame["name"] != "") & (frame["set code"] != "")
+    errors = [{"row": int(row_num), "message": "Нет ID, Имени или Кода Сета. Пропуск."} for row_num in frame.index[~valid]]
+    frame = frame[valid].copy()
+
+    quantity = pd.to_numeric(frame["quantity"].replace("", "1"), errors="coerce").fillna(1)
+    frame["new_quantity"] = np.trunc(quantity).astype(np.int64)
+    price = pd.to_numeric(frame["purchase price"].str.replace(",", ".", regex=False), errors="coerce")
+    frame["new_price"] = price.fillna(0).round(2)
+
+    # Дубликаты: первое вхождение со суммой количества
+    totals = frame.groupby("scryfall id", sort=False)["new_quantity"].sum()
+    first = frame.drop_duplicates("scryfall id").copy()
+    merged_duplicates = len(frame) - len(first)
+    first["new_quantity"] = first["scryfall id"].map(totals).to_numpy()
+    first["quantity"] = first["new_quantity"].astype(str)
+
+    existing = _existing_cards(first["scryfall id"].to_numpy(), owner_id)
+    row_nums = first.index
+    diff = first.merge(existing, on="scryfall id", how="left")
+    diff.index = row_nums
+
+    exists = diff["old_quantity"].notna().to_numpy()
+    diff["old_quantity"] = diff["old_quantity"].fillna(0).astype(np.int64)
+    diff["old_price"] = diff["old_price"].fillna(0.0)
+    changed = (diff["old_quantity"] != diff["new_quantity"]) | ~np.isclose(diff["old_price"], diff["new_price"])
+    diff["status"] = np.select([~exists, changed.to_numpy()], [CREATE, UPDATE], default=UNCHANGED)
+    diff["quantity_delta"] = diff["new_quantity"] - diff["old_quantity"]
+
+    return ImportDiff(diff, errors=errors, merged_duplicates=merged_duplicates, total_rows=total_rows)
+
+
+def store_diff(run: ImportRun, diff: ImportDiff) -> None:
+    """Сохраняет строки к записи и сводку (с примерами) в ImportRun."""
+    payload = json.dumps(diff.planned_rows(), ensure_ascii=False)
+    run.diff_file.save(f"diff_{run.pk}.json", ContentFile(payload.encode("utf-8")), save=False)
+    run.diff_summary = {
+        **diff.summary,
+        "samples": {status: diff.samples(status) for status in (CREATE, UPDATE)},
+    }
+    run.total_rows = diff.total_rows
+    run.errors = diff.errors
+    run.save(update_fields=["diff_file", "diff_summary", "total_rows", "errors"])
+
+
+def load_planned_rows(run: ImportRun) -> list:
+    with run.diff_file.open("rb") as f:
+        return json.load(f)
+
+
+def prepare_preview(run: ImportRun) -> ImportDiff:
+    diff = compute_import_diff(run.source_file.path, owner_id=run.user_id)
+    store_diff(run, diff)
+    return diff
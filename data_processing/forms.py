@@ -12,3 +12,9 @@ class CSVUploadForm(forms.Form):
         label="Обновлять существующие карты",
         help_text="Если включено — при совпадении имени и сета, запись будет обновлена.",
     )
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Сначала показать изменения",
+        help_text="Dry-run: покажем, какие карты будут созданы и обновлены, ничего не записывая.",
+    )
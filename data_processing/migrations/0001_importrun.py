@@ -0,0 +1,42 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.CharField(blank=True, db_index=True, max_length=255, verbose_name='ID задачи')),
+                ('file_name', models.CharField(blank=True, max_length=255, verbose_name='Файл')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('success', 'Завершен'), ('failure', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('total_rows', models.PositiveIntegerField(default=0, verbose_name='Строк в файле')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='Обработано строк')),
+                ('rows_per_second', models.FloatField(default=0, verbose_name='Строк/сек')),
+                ('counters', models.JSONField(blank=True, default=dict, verbose_name='Счетчики')),
+                ('stage_timings', models.JSONField(blank=True, default=dict, verbose_name='Время по стадиям (сек.)')),
+                ('http_calls', models.JSONField(blank=True, default=dict, verbose_name='HTTP-запросы')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='Ошибки по строкам')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Запуск импорта',
+                'verbose_name_plural': 'Запуски импорта',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_processing', '0001_importrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importrun',
+            name='committed_rows',
+            field=models.PositiveIntegerField(default=0, verbose_name='Записано в БД строк'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='resumed_from',
+            field=models.PositiveIntegerField(default=0, verbose_name='Возобновлен со строки'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='source_file',
+            field=models.FileField(blank=True, upload_to='imports/', verbose_name='Исходный файл'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.26 on 2026-10-19 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_processing', '0002_importrun_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importrun',
+            name='diff_file',
+            field=models.FileField(blank=True, upload_to='imports/', verbose_name='Файл diff'),
+        ),
+        migrations.AddField(
+            model_name='importrun',
+            name='diff_summary',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Сводка diff'),
+        ),
+        migrations.AlterField(
+            model_name='importrun',
+            name='status',
+            field=models.CharField(choices=[('preview', 'Предпросмотр'), ('pending', 'В очереди'), ('running', 'Выполняется'), ('success', 'Завершен'), ('failure', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус'),
+        ),
+    ]
@@ -1 +1,59 @@
-# Create your models here.
+from django.conf import settings
+from django.db import models
+
+
+class ImportRun(models.Model):
+    """Журнал запусков импорта CSV (с замерами по стадиям)."""
+
+    class Status(models.TextChoices):
+        PREVIEW = "preview", "Предпросмотр"
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        SUCCESS = "success", "Завершен"
+        FAILURE = "failure", "Ошибка"
+
+    task_id = models.CharField(max_length=255, blank=True, db_index=True, verbose_name="ID задачи")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name="import_runs",
+        null=True,
+        blank=True,
+    )
+    file_name = models.CharField(max_length=255, blank=True, verbose_name="Файл")
+    # Загруженный файл хранится до успешного завершения, чтобы импорт можно было возобновить
+    source_file = models.FileField(upload_to="imports/", blank=True, verbose_name="Исходный файл")
+    # Dry-run: посчитанный diff (строки к записи) и сводка для страницы предпросмотра
+    diff_file = models.FileField(upload_to="imports/", blank=True, verbose_name="Файл diff")
+    diff_summary = models.JSONField(default=dict, blank=True, verbose_name="Сводка diff")
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING, verbose_name="Статус"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    total_rows = models.PositiveIntegerField(default=0, verbose_name="Строк в файле")
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name="Обработано строк")
+    # Чекпоинт: строки, запись которых в БД закоммичена (вместе со счетчиками)
+    committed_rows = models.PositiveIntegerField(default=0, verbose_name="Записано в БД строк")
+    resumed_from = models.PositiveIntegerField(default=0, verbose_name="Возобновлен со строки")
+    rows_per_second = models.FloatField(default=0, verbose_name="Строк/сек")
+    counters = models.JSONField(default=dict, blank=True, verbose_name="Счетчики")
+    stage_timings = models.JSONField(default=dict, blank=True, verbose_name="Время по стадиям (сек.)")
+    http_calls = models.JSONField(default=dict, blank=True, verbose_name="HTTP-запросы")
+    errors = models.JSONField(default=list, blank=True, verbose_name="Ошибки по строкам")
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Запуск импорта"
+        verbose_name_plural = "Запуски импорта"
+
+    def __str__(self) -> str:
+        return f"Импорт #{self.pk} ({self.file_name or 'без имени'}) — {self.get_status_display()}"
+
+    @property
+    def duration(self):
+        if self.started_at and self.finished_at:
+            return self.finished_at - self.started_at
+        return None
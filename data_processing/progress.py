@@ -0,0 +1,92 @@
+# data_processing/progress.py
+"""
+Канал прогресса импорта через кэш (Redis).
+
+Задача публикует прогресс не чаще, чем раз в `min_interval` секунд или
+каждые `every_rows` строк; SSE-эндпоинт читает его из кэша, не трогая
+result backend Celery.
+"""
+from __future__ import annotations
+
+import time
+
+from django.core.cache import cache
+
+PROGRESS_TTL = 60 * 60  # час после последнего обновления
+FINAL_STATES = ("SUCCESS", "FAILURE")
+
+
+def progress_key(task_id: str) -> str:
+    return f"data_processing:import_progress:{task_id}"
+
+
+def _done_key(task_id: str) -> str:
+    return f"{progress_key(task_id)}:done"
+
+
+def read_progress(task_id: str) -> dict | None:
+    data = cache.get(progress_key(task_id))
+    if data is not None and data.get("state") == "PROGRESS":
+        # Снимок части параллельного импорта может перезаписать более свежий —
+        # текущее значение берем из атомарного счетчика
+        done = cache.get(_done_key(task_id))
+        if done is not None:
+            data["current"] = max(data["current"], min(done, data["total"]))
+    return data
+
+
+def mark_delivered(task_id: str) -> None:
+    """Финальное событие уже показано пользователю — повторно не отправляем."""
+    data = read_progress(task_id)
+    if data is not None:
+        data["delivered"] = True
+        cache.set(progress_key(task_id), data, PROGRESS_TTL)
+
+
+def add_progress(task_id: str | None, rows: int, total: int) -> None:
+    """Прогресс параллельного импорта: части атомарно увеличивают общий счетчик."""
+    if not task_id or rows <= 0:
+        return
+    done_key = _done_key(task_id)
+    cache.add(done_key, 0, PROGRESS_TTL)
+    done = cache.incr(done_key, rows)
+    cache.set(
+        progress_key(task_id),
+        {"state": "PROGRESS", "current": min(done, total), "total": total},
+        PROGRESS_TTL,
+    )
+
+
+class ProgressPublisher:
+    """Троттлинг публикации прогресса (по времени и по числу строк)."""
+
+    def __init__(self, task_id: str | None, total: int, *, min_interval=1.0, every_rows=200):
+        self.task_id = task_id
+        self.total = total
+        self.min_interval = min_interval
+        self.every_rows = every_rows
+        # Точка отсчета monotonic() произвольна — первый отсчет от создания, а не от нуля
+        self._last_time = time.monotonic()
+        self._last_row = 0
+
+    def _publish(self, data: dict) -> None:
+        if self.task_id:
+            cache.set(progress_key(self.task_id), data, PROGRESS_TTL)
+
+    def update(self, current: int, **extra) -> bool:
+        now = time.monotonic()
+        due = (
+            current - self._last_row >= self.every_rows
+            or now - self._last_time >= self.min_interval
+            or current >= self.total
+        )
+        if not due:
+            return False
+        self._last_time, self._last_row = now, current
+        self._publish({"state": "PROGRESS", "current": current, "total": self.total, **extra})
+        return True
+
+    def finish(self, counters: dict, state: str = "SUCCESS") -> None:
+        self._publish(
+            {"state": state, "current": self.total, "total": self.total, "results": counters}
+        )
@@ -1,10 +1,10 @@
 # data_processing/services.py
 from __future__ import annotations
-import csv, os, re, time, requests
+import csv, logging, os, re, time, requests
 from pathlib import Path
 from typing import Dict, Tuple, List
 from decimal import Decimal, InvalidOperation
-from celery import shared_task
+from celery import chord, shared_task
 
 # Настройка Django
 if "DJANGO_SETTINGS_MODULE" not in os.environ:
@@ -15,32 +15,48 @@ django.setup()
 from django.conf import settings
 from django.db import transaction
 from requests.adapters import HTTPAdapter, Retry
-from mtg_app.models import Card, Set
+from django.utils import timezone
+from mtg_app.legality import legality_bits
+from mtg_app.models import Card, Printing, Set
+from .models import ImportRun
+from .progress import ProgressPublisher, add_progress
+from .telemetry import ImportTelemetry
+
+logger = logging.getLogger(__name__)
 
 # --- Хелперы (без изменений) ---
-def _get_row_val(row: dict, field_map: dict, key: str) -> str:
+FIELD_ALIASES = {
+    "name": ["card name", "название", "имя"],
+    "quantity": ["count", "qty", "количество", "кол-во"],
+    "set code": ["set"],
+    "set name": ["set name (english)", "название сета", "сет"],
+    "collector number": ["card number", "number", "номер", "№"],
+    "purchase price": ["price", "cost", "цена", "цена покупки"],
+    "purchase price currency": ["currency", "валюта"],
+    "scryfall id": ["scryfall_id", "scryfallid", "id"],
+    "image url": ["image", "url", "картинка"],
+    "foil": ["фольга", "foil"],
+    "rarity": ["редкость", "rarity"],
+    "language": ["язык", "language"],
+    "condition": ["состояние", "condition"],
+}
+
+
+def _resolve_column(field_map: dict, key: str) -> str | None:
+    """Заголовок CSV для поля (с учетом синонимов) или None."""
     key_lower = key.lower()
     if key_lower in field_map:
-        return (row.get(field_map[key_lower]) or "").strip()
-    aliases = {
-        "name": ["card name", "название", "имя"],
-        "quantity": ["count", "qty", "количество", "кол-во"],
-        "set code": ["set"],
-        "set name": ["set name (english)", "название сета", "сет"],
-        "collector number": ["card number", "number", "номер", "№"],
-        "purchase price": ["price", "cost", "цена", "цена покупки"],
-        "purchase price currency": ["currency", "валюта"],
-        "scryfall id": ["scryfall_id", "scryfallid", "id"],
-        "image url": ["image", "url", "картинка"],
-        "foil": ["фольга", "foil"],
-        "rarity": ["редкость", "rarity"],
-        "language": ["язык", "language"],
-        "condition": ["состояние", "condition"],
-    }
-    for alias in aliases.get(key_lower, []):
+        return field_map[key_lower]
+    for alias in FIELD_ALIASES.get(key_lower, []):
         if alias in field_map:
-            return (row.get(field_map[alias]) or "").strip()
-    return ""
+            return field_map[alias]
+    return None
+
+def _get_row_val(row: dict, field_map: dict, key: str) -> str:
+    column = _resolve_column(field_map, key)
+    if column is None:
+        return ""
+    return (row.get(column) or "").strip()
 
 def _ensure_media_cards_dir() -> Tuple[Path, str]:
     from django.conf import settings # Локальный импорт
@@ -72,200 +88,532 @@ def _ext_from_content_type(ctype: str) -> str:
 
 # --- ОСНОВНАЯ ФУНКЦИЯ (ПЕРЕРАБОТАНА) ---
 
-@shared_task(bind=True)
-def process_uploaded_csv(self, file_path: str, *, throttle_sec: float = 0.1) -> Dict[str, int]:
-    
-    counters = {"created": 0, "updated": 0, "errors": 0, "downloaded": 0, "enriched": 0, "skipped_img_exists": 0}
-    errors_list = []
+SCRYFALL_CARD_URL = "https://api.scryfall.com/cards/{}"
+
+
+# Колонки, к которым приводятся строки перед раздачей по воркерам
+CANONICAL_FIELDS = (
+    "name", "quantity", "set code", "set name", "collector number", "purchase price",
+    "purchase price currency", "scryfall id", "image url", "foil", "rarity", "language", "condition",
+)
+CANONICAL_FIELD_MAP = {field: field for field in CANONICAL_FIELDS}
+
+
+def _new_counters() -> Dict[str, int]:
+    return {
+        "created": 0, "updated": 0, "errors": 0, "downloaded": 0, "enriched": 0,
+        "skipped_img_exists": 0, "skipped_img_missing": 0, "merged_duplicates": 0,
+    }
+
+
+def _parse_quantity(value: str) -> int:
+    try: return int(float(value or 1))
+    except (TypeError, ValueError): return 1
+
+
+def _make_ctx(field_map: dict, counters: dict, telemetry: ImportTelemetry, throttle_sec: float, **extra) -> dict:
     save_dir, db_prefix = _ensure_media_cards_dir()
-    session = _session_with_retries()
-    processed_ids_in_run = set()
+    return {
+        "field_map": field_map, "counters": counters, "telemetry": telemetry,
+        "session": _session_with_retries(), "processed_ids": set(),
+        "save_dir": save_dir, "db_prefix": db_prefix, "throttle_sec": throttle_sec,
+        **extra,
+    }
+
+
+def _fetch_scryfall(session, scryfall_id: str, telemetry: ImportTelemetry, throttle_sec: float) -> dict:
+    time.sleep(throttle_sec)  # Вежливость к API
+    telemetry.http("scryfall_api")
+    api_resp = session.get(SCRYFALL_CARD_URL.format(scryfall_id), timeout=10)
+    api_resp.raise_for_status()
+    return api_resp.json()
 
-    print("\n--- [START] УМНЫЙ ИМПОРТ v2 (с починкой картинок) ---")
-    
+
+def _enrich_printing(printing: Printing, session, telemetry, counters, throttle_sec) -> None:
+    """Дозаполняет текстовые данные печати из Scryfall (если их нет)."""
+    if printing.cmc != 0:
+        return
     try:
-        # Читаем файл в память, чтобы узнать ОБЩЕЕ КОЛИЧЕСТВО
-        with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
-            reader_list = list(csv.DictReader(f))
-            total_rows = len(reader_list)
-        
-        field_map = {key.lower().strip(): key for key in (reader_list[0].keys() if total_rows > 0 else [])}
-        
-        if not field_map: raise ValueError("CSV пуст или не имеет заголовков.")
-
-        for i, row in enumerate(reader_list):
-            row_num = i + 2
-            card = None 
-            
-            # --- 1. ОБНОВЛЕНИЕ ПРОГРЕССА ---
-            # Сообщаем Celery, что мы на строке i из total_rows
-            self.update_state(state='PROGRESS', 
-                              meta={'current': i + 1, 'total': total_rows})
-            
-            try:
-                # --- 2. ЧТЕНИЕ ДАННЫХ ИЗ CSV ---
-                scryfall_id = _get_row_val(row, field_map, "scryfall id")
-                name = _get_row_val(row, field_map, "name")
-                set_code = _get_row_val(row, field_map, "set code")
-                
-                if not scryfall_id or not name or not set_code:
-                    msg = f"Строка {row_num}: Нет ID, Имени или Кода Сета. Пропуск."
-                    print(f"[ERROR] {msg}")
-                    errors_list.append(msg)
+        data = _fetch_scryfall(session, printing.scryfall_id, telemetry, throttle_sec)
+    except Exception as e:
+        logger.info("Ошибка обогащения %s: %s", printing.scryfall_id, e)
+        return
+    printing.cmc = data.get('cmc', 0.0)
+    printing.mana_cost = data.get('mana_cost', '')
+    printing.type_line = data.get('type_line', '')
+    printing.oracle_text = data.get('oracle_text', '')
+    printing.colors = "".join(data.get('colors', []))
+    printing.legal_formats, printing.restricted_formats = legality_bits(data.get('legalities'))
+    # Без name в update_fields индекс названий (fuzzy) не сбрасывается; поля пипсов добавит Printing.save
+    printing.save(update_fields=[
+        "cmc", "mana_cost", "type_line", "oracle_text", "colors", "legal_formats", "restricted_formats",
+    ])
+    counters["enriched"] += 1
+
+
+def _ensure_card_image(printing: Printing, csv_image_url: str, ctx: dict, row_num: int) -> None:
+    """Привязывает к печати уже скачанную картинку или скачивает новую."""
+    session, telemetry, counters = ctx["session"], ctx["telemetry"], ctx["counters"]
+    save_dir, db_prefix = ctx["save_dir"], ctx["db_prefix"]
+    base_filename = _sanitize_filename(f"{printing.name}__{printing.collector_number}")
+
+    # A. Проверяем, есть ли файл локально
+    for ext in [".jpg", ".png", ".webp"]:
+        if (save_dir / f"{base_filename}{ext}").exists():
+            counters["skipped_img_exists"] += 1
+            db_path = f"{db_prefix}/{base_filename}{ext}"
+            if printing.image_url != db_path:  # Самоисцеление, если путь в БД неверный
+                printing.image_url = db_path
+                printing.save(update_fields=['image_url'])
+            return
+
+    # B. Файла нет: берем URL из CSV, иначе из Scryfall
+    image_url_to_download = csv_image_url
+    if not image_url_to_download:
+        try:
+            data = _fetch_scryfall(session, printing.scryfall_id, telemetry, ctx["throttle_sec"])
+            if "image_uris" in data:
+                image_url_to_download = data["image_uris"].get("large") or data["image_uris"].get("png")
+            elif "card_faces" in data:
+                image_url_to_download = data["card_faces"][0]["image_uris"].get("large")
+        except Exception as e:
+            logger.info("Ошибка получения URL картинки %s: %s", printing.scryfall_id, e)
+
+    if not image_url_to_download:
+        counters["skipped_img_missing"] += 1
+        return
+
+    # C. Скачивание
+    try:
+        telemetry.http("image_download")
+        dl_resp = session.get(image_url_to_download, timeout=20)
+        dl_resp.raise_for_status()
+        ext = _ext_from_content_type(dl_resp.headers.get("Content-Type"))
+        final_filename = f"{base_filename}{ext}"
+        with open(save_dir / final_filename, "wb") as f_img:
+            f_img.write(dl_resp.content)
+        printing.image_url = f"{db_prefix}/{final_filename}"
+        printing.save(update_fields=["image_url"])
+        counters["downloaded"] += 1
+    except Exception as e:
+        telemetry.error(row_num, f"Ошибка скачивания картинки: {e}")
+        counters["errors"] += 1
+
+
+def _write_row(row: dict, row_num: int, ctx: dict) -> Card | None:
+    """Стадии parse + db_write для одной строки. Возвращает запись коллекции или None (пропуск)."""
+    field_map, telemetry, counters = ctx["field_map"], ctx["telemetry"], ctx["counters"]
+
+    # --- 1. ЧТЕНИЕ ДАННЫХ ИЗ CSV ---
+    with telemetry.stage("parse"):
+        scryfall_id = _get_row_val(row, field_map, "scryfall id")
+        name = _get_row_val(row, field_map, "name")
+        set_code = _get_row_val(row, field_map, "set code")
+
+        if not scryfall_id or not name or not set_code:
+            telemetry.error(row_num, "Нет ID, Имени или Кода Сета. Пропуск.")
+            counters["errors"] += 1
+            return None
+
+        quantity = _parse_quantity(_get_row_val(row, field_map, "quantity"))
+
+        price_str = _get_row_val(row, field_map, "purchase price").replace(",", ".")
+        try: price = Decimal(price_str or "0")
+        except InvalidOperation: price = Decimal("0")
+
+    # --- 2. РАБОТА С БД ---
+    with telemetry.stage("db_write"):
+        set_ids = ctx.get("set_ids") or {}
+        if set_code in set_ids:  # Сеты заранее созданы координатором
+            set_kwargs = {"set_id": set_ids[set_code]}
+        else:
+            mtg_set, _ = Set.objects.get_or_create(code=set_code, defaults={"name": _get_row_val(row, field_map, "set name") or set_code})
+            set_kwargs = {"set": mtg_set}
+        # Печать — общий каталог, запись коллекции — своя у каждого владельца
+        printing, _ = Printing.objects.get_or_create(
+            scryfall_id=scryfall_id,
+            defaults={
+                "name": name, **set_kwargs,
+                "collector_number": _get_row_val(row, field_map, "collector number"),
+                "rarity": _get_row_val(row, field_map, "rarity"),
+            }
+        )
+        card, created = Card.objects.get_or_create(
+            printing=printing,
+            owner_id=ctx.get("owner_id"),
+            defaults={
+                "language": _get_row_val(row, field_map, "language"),
+                "condition": _get_row_val(row, field_map, "condition"),
+                "foil": _get_row_val(row, field_map, "foil").lower() in ("true", "1", "foil", "yes", "y", "фольга"),
+                "quantity": quantity,
+                "purchase_price": price,
+                "purchase_price_currency": _get_row_val(row, field_map, "purchase price currency").upper() or "RUB",
+            }
+        )
+
+        processed_ids = ctx["processed_ids"]
+        if created:
+            counters["created"] += 1
+        elif scryfall_id not in processed_ids:
+            card.quantity = quantity
+            card.purchase_price = price
+            counters["updated"] += 1
+        else:
+            card.quantity += quantity  # Дубликат в файле — суммируем
+        processed_ids.add(scryfall_id)
+        card.save(update_fields=["quantity", "purchase_price"])
+    return card
+
+
+def _enrich_row(card: Card, row: dict, row_num: int, ctx: dict) -> None:
+    """Стадии enrichment + image_download. Идемпотентны: повтор ничего не ломает."""
+    telemetry = ctx["telemetry"]
+    with telemetry.stage("enrichment"):
+        _enrich_printing(card.printing, ctx["session"], telemetry, ctx["counters"], ctx["throttle_sec"])
+    with telemetry.stage("image_download"):
+        _ensure_card_image(card.printing, _get_row_val(row, ctx["field_map"], "image url"), ctx, row_num)
+
+
+def _save_checkpoint(run: ImportRun, telemetry: ImportTelemetry, counters: dict, **fields) -> None:
+    for name, value in fields.items():
+        setattr(run, name, value)
+    run.counters = counters
+    run.stage_timings = telemetry.rounded_timings()
+    run.http_calls = dict(telemetry.http_calls)
+    run.errors = telemetry.errors
+    run.save(update_fields=[*fields, "counters", "stage_timings", "http_calls", "errors"])
+
+
+def _import_chunk(run: ImportRun, rows: list, start: int, ctx: dict) -> None:
+    """
+    Чанк строк [start, start + len(rows)).
+    Запись в БД и чекпоинт committed_rows — в одной транзакции: после падения
+    воркера чанк либо целиком записан, либо будет обработан заново.
+    Обогащение/картинки — вне транзакции (долгие HTTP-запросы), затем processed_rows.
+    """
+    telemetry, counters = ctx["telemetry"], ctx["counters"]
+    end = start + len(rows)
+    cards: dict[int, Card | None] = {}
+
+    if run.committed_rows < end:
+        with transaction.atomic():
+            for offset, row in enumerate(rows):
+                row_num = start + offset + 2
+                try:
+                    with transaction.atomic():  # savepoint: ошибка строки не ломает чанк
+                        cards[offset] = _write_row(row, row_num, ctx)
+                except Exception as e:
+                    telemetry.error(row_num, f"CRITICAL ERROR: {e}")
                     counters["errors"] += 1
-                    continue
-
-                print(f"\n>>> [ROW {row_num}/{total_rows}] Обработка: {name} ({set_code})")
-                
-                qty_str = _get_row_val(row, field_map, "quantity")
-                try: quantity = int(float(qty_str or 1))
-                except: quantity = 1
-                
-                price_str = _get_row_val(row, field_map, "purchase price").replace(",", ".")
-                try: price = Decimal(price_str or "0")
-                except: price = Decimal("0")
-
-                mtg_set, _ = Set.objects.get_or_create(code=set_code, defaults={"name": _get_row_val(row, field_map, "set name") or set_code})
-
-                # --- 3. РАБОТА С БД ---
-                card, created = Card.objects.get_or_create(
-                    scryfall_id=scryfall_id,
-                    defaults={
-                        "name": name, "set": mtg_set,
-                        "collector_number": _get_row_val(row, field_map, "collector number"),
-                        "rarity": _get_row_val(row, field_map, "rarity"),
-                        "language": _get_row_val(row, field_map, "language"),
-                        "condition": _get_row_val(row, field_map, "condition"),
-                        "foil": _get_row_val(row, field_map, "foil").lower() in ("true", "1", "foil", "yes", "y", "фольга"),
-                        "quantity": quantity,
-                        "purchase_price": price,
-                        "purchase_price_currency": _get_row_val(row, field_map, "purchase price currency").upper() or "RUB",
-                    }
-                )
-
-                if created:
-                    print(f"    [DB] Создана новая карта.")
-                    counters["created"] += 1
-                elif scryfall_id not in processed_ids_in_run:
-                    card.quantity = quantity
-                    card.purchase_price = price
-                    print(f"    [DB] Найдена. Количество обновлено до {quantity}.")
-                    counters["updated"] += 1
-                else:
-                    card.quantity += quantity
-                    print(f"    [DB] Дубликат в файле. Количество увеличено до {card.quantity}.")
-
-                processed_ids_in_run.add(scryfall_id)
-                card.save() # Сохраняем изменения (quantity)
-
-                # --- 4. ОБОГАЩЕНИЕ ДАННЫМИ (Scryfall API) ---
-                # (Только если текстовых данных нет)
-                if card.cmc == 0:
-                    print(f"    [API] Текст. данные неполные. Запрос к Scryfall...")
-                    try:
-                        time.sleep(throttle_sec)
-                        api_resp = session.get(f"https://api.scryfall.com/cards/{scryfall_id}", timeout=10)
-                        api_resp.raise_for_status()
-                        data = api_resp.json()
-                        
-                        card.cmc = data.get('cmc', 0.0)
-                        card.mana_cost = data.get('mana_cost', '')
-                        card.type_line = data.get('type_line', '')
-                        card.oracle_text = data.get('oracle_text', '')
-                        card.colors = "".join(data.get('colors', []))
-                        card.save()
-                        print(f"    [API] Данные обогащены (CMC: {card.cmc})")
-                        counters["enriched"] += 1
-                    except Exception as e:
-                        print(f"    [API] Ошибка обогащения: {e}")
-                
-                # --- 5. СКАЧИВАНИЕ ИЗОБРАЖЕНИЯ (ОТДЕЛЬНАЯ ЛОГИКА) ---
-                base_filename = _sanitize_filename(f"{name}__{card.collector_number}")
-                
-                # A. Проверяем, есть ли файл локально
-                file_exists = False
-                for ext in [".jpg", ".png", ".webp"]:
-                    path_check = save_dir / f"{base_filename}{ext}"
-                    if path_check.exists():
-                        file_exists = True
-                        counters["skipped_img_exists"] += 1
-                        db_path = f"{db_prefix}/{base_filename}{ext}"
-                        if card.image_url != db_path: # Самоисцеление, если путь в БД неверный
-                            card.image_url = db_path
-                            card.save(update_fields=['image_url'])
-                        break
-                
-                if file_exists:
-                    print(f"    [IMG] Файл уже существует. Пропуск.")
-                    continue
-
-                # B. Файла НЕТ. Ищем URL.
-                print(f"    [IMG] Файл не найден. Поиск URL...")
-                image_url_to_download = _get_row_val(row, field_map, "image url")
-                
-                # C. Если в CSV нет URL, ИДЕМ В API (даже если cmc != 0)
-                if not image_url_to_download:
-                    print(f"    [API] URL нет в CSV. Запрос к Scryfall...")
-                    try:
-                        time.sleep(throttle_sec) # Вежливость
-                        api_resp = session.get(f"https://api.scryfall.com/cards/{scryfall_id}", timeout=10)
-                        api_resp.raise_for_status()
-                        data = api_resp.json()
-                        if "image_uris" in data:
-                            image_url_to_download = data["image_uris"].get("large") or data["image_uris"].get("png")
-                        elif "card_faces" in data:
-                            image_url_to_download = data["card_faces"][0]["image_uris"].get("large")
-                        
-                        if image_url_to_download:
-                            print(f"    [API] URL картинки получен.")
-                    except Exception as e:
-                        print(f"    [API] Ошибка получения URL: {e}")
-
-                # D. Скачивание
-                if image_url_to_download:
-                    print(f"    [DL] Скачивание...")
-                    try:
-                        dl_resp = session.get(image_url_to_download, timeout=20)
-                        dl_resp.raise_for_status()
-                        ext = _ext_from_content_type(dl_resp.headers.get("Content-Type"))
-                        final_filename = f"{base_filename}{ext}"
-                        final_path = save_dir / final_filename
-                        
-                        with open(final_path, "wb") as f_img:
-                            f_img.write(dl_resp.content)
-                            
-                        card.image_url = f"{db_prefix}/{final_filename}"
-                        card.save(update_fields=["image_url"])
-                        
-                        print(f"    [DL] УСПЕХ! Сохранено как {final_filename}")
-                        counters["downloaded"] += 1
-                    except Exception as e:
-                        print(f"    [DL] Ошибка скачивания: {e}")
-                        counters["errors"] += 1
-                else:
-                    print(f"    [IMG] URL для скачивания не найден.")
-                    counters["skipped_img_missing"] += 1 # Новая категория
-
-            except Exception as e:
-                msg = f"CRITICAL ERROR в строке {row_num}: {e}"
-                print(f"[CRITICAL] {msg}")
-                errors_list.append(msg)
-                counters["errors"] += 1
-    
+            _save_checkpoint(run, telemetry, counters, committed_rows=end)
+    else:
+        # Чанк уже записан до падения — поднимаем карты одним запросом
+        ids = [_get_row_val(row, ctx["field_map"], "scryfall id") for row in rows]
+        entries = Card.objects.select_related("printing").filter(
+            owner_id=ctx.get("owner_id"), printing__scryfall_id__in=[i for i in ids if i]
+        )
+        by_id = {card.printing.scryfall_id: card for card in entries}
+        cards = {offset: by_id.get(scryfall_id) for offset, scryfall_id in enumerate(ids)}
+
+    for offset, row in enumerate(rows):
+        card = cards.get(offset)
+        if card is None:
+            continue
+        ctx["progress"].update(start + offset + 1, counters=counters)
+        try:
+            _enrich_row(card, row, start + offset + 2, ctx)
+        except Exception as e:
+            telemetry.error(start + offset + 2, f"CRITICAL ERROR: {e}")
+            counters["errors"] += 1
+
+    _save_checkpoint(run, telemetry, counters, processed_rows=end)
+
+
+def _finish_run(run: ImportRun, telemetry: ImportTelemetry, counters: dict, status: str, elapsed: float | None = None) -> None:
+    run.status = status
+    run.finished_at = timezone.now()
+    run.counters = counters
+    run.stage_timings = telemetry.rounded_timings()
+    run.http_calls = dict(telemetry.http_calls)
+    run.errors = telemetry.errors  # весь список ошибок — одной записью
+    rows = run.processed_rows - run.resumed_from
+    if elapsed is None:
+        run.rows_per_second = telemetry.rows_per_second(rows)
+    else:
+        run.rows_per_second = round(rows / elapsed, 2) if elapsed > 0 else 0.0
+    run.save()
+
+
+def _cleanup_source(run: ImportRun, file_path: str | None) -> None:
+    """Файл удаляем только после успешного импорта — иначе его можно возобновить."""
+    if run.diff_file:
+        run.diff_file.delete(save=True)
+    if run.source_file:
+        run.source_file.delete(save=True)
+    elif file_path and os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            logger.error("Не удалось удалить временный файл %s: %s", file_path, e)
+
+
+# --- ПАРАЛЛЕЛЬНЫЙ ИМПОРТ (fan-out по воркерам Celery) ---
+
+def _canonical_rows(reader_list: list, field_map: dict) -> list:
+    """[(номер строки в файле, строка с каноническими колонками), ...]"""
+    return [
+        (i + 2, {field: _get_row_val(row, field_map, field) for field in CANONICAL_FIELDS})
+        for i, row in enumerate(reader_list)
+    ]
+
+
+def _merge_duplicate_rows(rows: list) -> tuple[list, int]:
+    """
+    Дубликаты одной карты в файле сливаются до раздачи: количество суммируется в
+    первую строку. После этого каждая карта встречается ровно в одной части.
+    """
+    first_by_id: dict[str, dict] = {}
+    merged_rows, merged = [], 0
+    for row_num, row in rows:
+        scryfall_id = row["scryfall id"]
+        first = first_by_id.get(scryfall_id) if scryfall_id else None
+        if first is not None:
+            first["quantity"] = str(_parse_quantity(first["quantity"]) + _parse_quantity(row["quantity"]))
+            merged += 1
+            continue
+        if scryfall_id:
+            first_by_id[scryfall_id] = row
+        merged_rows.append((row_num, row))
+    return merged_rows, merged
+
+
+def _ensure_sets(rows: list) -> dict[str, int]:
+    """Создает все сеты файла заранее (без гонок get_or_create между воркерами)."""
+    names: dict[str, str] = {}
+    for _, row in rows:
+        code = row["set code"]
+        if code and code not in names:
+            names[code] = row["set name"] or code
+    set_ids = dict(Set.objects.filter(code__in=names).values_list("code", "id"))
+    missing = [Set(code=code, name=name) for code, name in names.items() if code not in set_ids]
+    if missing:
+        Set.objects.bulk_create(missing, ignore_conflicts=True)
+        set_ids.update(Set.objects.filter(code__in=[s.code for s in missing]).values_list("code", "id"))
+    return set_ids
+
+
+def _build_fan_out(run: ImportRun, reader_list: list, ctx: dict, progress_task_id: str | None):
+    telemetry, counters = ctx["telemetry"], ctx["counters"]
+    with telemetry.stage("parse"):
+        rows, counters["merged_duplicates"] = _merge_duplicate_rows(_canonical_rows(reader_list, ctx["field_map"]))
+    return _fan_out_rows(run, rows, ctx, progress_task_id)
+
+
+def _fan_out_rows(run: ImportRun, rows: list, ctx: dict, progress_task_id: str | None):
+    """Chord по уже каноническим строкам без дубликатов: [(номер строки, строка), ...]."""
+    telemetry, counters = ctx["telemetry"], ctx["counters"]
+    with telemetry.stage("db_write"):
+        set_ids = _ensure_sets(rows)
+    _save_checkpoint(run, telemetry, counters)
+
+    part_size = getattr(settings, "IMPORT_PART_SIZE", 500)
+    parts = [
+        import_csv_part.s(
+            rows[start : start + part_size], set_ids=set_ids, total=len(rows), owner_id=run.user_id,
+            progress_task_id=progress_task_id, throttle_sec=ctx["throttle_sec"],
+        )
+        for start in range(0, len(rows), part_size)
+    ]
+    logger.info("Импорт #%s: %s строк -> %s частей", run.pk, len(rows), len(parts))
+    callback = finalize_parallel_import.s(import_run_id=run.pk, progress_task_id=progress_task_id)
+    # Упавшая часть (или сам callback) — иначе запуск навсегда остался бы RUNNING
+    callback.on_error(fail_parallel_import.s(import_run_id=run.pk, progress_task_id=progress_task_id))
+    return chord(parts, callback)
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def import_csv_part(rows: list, *, set_ids: dict, total: int, owner_id: int | None = None, progress_task_id: str | None = None, throttle_sec: float = 0.1) -> dict:
+    """
+    Часть параллельного импорта. Дубликаты уже слиты, поэтому повторное выполнение
+    (после падения воркера) идемпотентно: количество просто выставляется заново.
+    """
+    counters = _new_counters()
+    telemetry = ImportTelemetry()
+    ctx = _make_ctx(CANONICAL_FIELD_MAP, counters, telemetry, throttle_sec, set_ids=set_ids, owner_id=owner_id)
+    reported = 0
+
+    for done, (row_num, row) in enumerate(rows, start=1):
+        try:
+            with transaction.atomic():
+                card = _write_row(row, row_num, ctx)
+            if card is not None:
+                _enrich_row(card, row, row_num, ctx)
+        except Exception as e:
+            telemetry.error(row_num, f"CRITICAL ERROR: {e}")
+            counters["errors"] += 1
+        if done - reported >= 50:
+            add_progress(progress_task_id, done - reported, total)
+            reported = done
+    add_progress(progress_task_id, len(rows) - reported, total)
+
+    return {
+        "counters": counters,
+        "timings": telemetry.timings,
+        "http_calls": dict(telemetry.http_calls),
+        "errors": telemetry.errors,
+    }
+
+
+@shared_task
+def finalize_parallel_import(part_results: list, *, import_run_id: int, progress_task_id: str | None = None) -> Dict[str, int]:
+    """Callback chord'а: сводит счетчики, замеры и ошибки всех частей в ImportRun."""
+    run = ImportRun.objects.get(pk=import_run_id)
+    counters = {**_new_counters(), **run.counters}
+    telemetry = ImportTelemetry()
+    telemetry.restore(run.stage_timings, run.http_calls, run.errors)
+
+    for part in part_results:
+        for name, value in part["counters"].items():
+            if name != "merged_duplicates":
+                counters[name] = counters.get(name, 0) + value
+        telemetry.restore(part["timings"], part["http_calls"], part["errors"])
+    telemetry.errors.sort(key=lambda e: e["row"] or 0)
+
+    run.processed_rows = run.committed_rows = run.total_rows
+    elapsed = (timezone.now() - run.started_at).total_seconds() if run.started_at else None
+    _finish_run(run, telemetry, counters, ImportRun.Status.SUCCESS, elapsed=elapsed)
+    _cleanup_source(run, None)
+    ProgressPublisher(progress_task_id, total=run.total_rows).finish(counters)
+    return counters
+
+
+@shared_task
+def fail_parallel_import(task_id: str, *, import_run_id: int, progress_task_id: str | None = None) -> None:
+    """Errback chord'а: помечает запуск FAILURE и закрывает поток прогресса."""
+    run = ImportRun.objects.get(pk=import_run_id)
+    if run.status == ImportRun.Status.SUCCESS:
+        return
+    counters = {**_new_counters(), **run.counters}
+    telemetry = ImportTelemetry()
+    telemetry.restore(run.stage_timings, run.http_calls, run.errors)
+    telemetry.error(None, f"Параллельный импорт прерван: задача {task_id} завершилась с ошибкой")
+    counters["errors"] += 1
+    _finish_run(run, telemetry, counters, ImportRun.Status.FAILURE)
+    ProgressPublisher(progress_task_id, total=run.total_rows).finish(counters, state="FAILURE")
+
+
+# acks_late + reject_on_worker_lost: если воркер умер, брокер вернет задачу
+# в очередь, и она продолжит с последнего чекпоинта.
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_uploaded_csv(self, file_path: str | None = None, *, throttle_sec: float = 0.1, import_run_id: int | None = None) -> Dict[str, int]:
+    run = ImportRun.objects.filter(pk=import_run_id).first() if import_run_id else None
+    if run is None:
+        run = ImportRun.objects.create(file_name=os.path.basename(file_path or ""))
+    if run.status == ImportRun.Status.SUCCESS:
+        return run.counters  # Повторная доставка уже завершенной задачи
+    if run.source_file:
+        file_path = run.source_file.path
+
+    # Возобновление: счетчики и замеры берем из последнего чекпоинта
+    resuming = run.processed_rows > 0 or run.committed_rows > 0
+    counters = {**_new_counters(), **run.counters} if resuming else _new_counters()
+    telemetry = ImportTelemetry()
+    if resuming:
+        telemetry.restore(run.stage_timings, run.http_calls, run.errors)
+
+    run.task_id = self.request.id or run.task_id
+    run.status = ImportRun.Status.RUNNING
+    run.started_at = run.started_at or timezone.now()
+    run.resumed_from = run.processed_rows
+    run.save()
+
+    ctx = _make_ctx(
+        {}, counters, telemetry, throttle_sec,
+        owner_id=run.user_id, progress=ProgressPublisher(self.request.id, total=0),
+    )
+    chunk_size = getattr(settings, "IMPORT_CHUNK_SIZE", 200)
+    status = ImportRun.Status.SUCCESS
+    logger.info("Импорт #%s: старт с строки %s (%s)", run.pk, run.processed_rows, file_path)
+
+    try:
+        with telemetry.stage("parse"):
+            with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+                reader_list = list(csv.DictReader(f))
+        total_rows = len(reader_list)
+        ctx["field_map"] = {key.lower().strip(): key for key in (reader_list[0].keys() if total_rows > 0 else [])}
+        if not ctx["field_map"]: raise ValueError("CSV пуст или не имеет заголовков.")
+
+        ctx["progress"].total = run.total_rows = total_rows
+        run.save(update_fields=["total_rows"])
+    except Exception as e:
+        telemetry.error(None, f"Не удалось прочитать файл {file_path}: {e}")
+        counters["errors"] += 1
+        status = ImportRun.Status.FAILURE
+        reader_list = []
+
+    # Большие файлы раздаем по воркерам: задача заменяется chord'ом
+    # (части + сводящий callback), результат chord'а станет результатом этой задачи
+    parallel_threshold = getattr(settings, "IMPORT_PARALLEL_THRESHOLD", 2000)
+    if status == ImportRun.Status.SUCCESS and not resuming and len(reader_list) >= parallel_threshold:
+        return self.replace(_build_fan_out(run, reader_list, ctx, self.request.id))
+
+    try:
+        # Дубликаты суммируются только после первого вхождения — восстанавливаем,
+        # какие ID уже встречались в закоммиченной части файла
+        for row in reader_list[: run.committed_rows]:
+            ctx["processed_ids"].add(_get_row_val(row, ctx["field_map"], "scryfall id"))
+
+        for start in range(run.processed_rows, len(reader_list), chunk_size):
+            _import_chunk(run, reader_list[start : start + chunk_size], start, ctx)
+
     except Exception as e:
-        msg = f"Не удалось прочитать файл {file_path}: {e}"
-        print(f"[CRITICAL] {msg}")
-        errors_list.append(msg)
+        telemetry.error(None, f"Импорт прерван: {e}")
         counters["errors"] += 1
-    
-    finally:
-        print("\n[INFO] --- Цикл завершен, очистка файла ---")
-        if file_path and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                print(f"[INFO] Временный файл {file_path} успешно удален.")
-            except Exception as e:
-                print(f"[ERROR] Не удалось удалить временный файл {file_path}: {e}")
-
-    print("[INFO] --- ПРОФЕССИОНАЛЬНЫЙ ИМПОРТ ЗАВЕРШЕН ---")
-    return counters
\ No newline at end of file
+        status = ImportRun.Status.FAILURE
+
+    _finish_run(run, telemetry, counters, status)
+    if status == ImportRun.Status.SUCCESS:
+        _cleanup_source(run, file_path)
+    ctx["progress"].finish(counters, state="SUCCESS" if status == ImportRun.Status.SUCCESS else "FAILURE")
+    logger.info(
+        "Импорт #%s: завершен за %.1f с (%s строк/с), стадии: %s",
+        run.pk, telemetry.elapsed, run.rows_per_second, run.stage_timings,
+    )
+    return counters
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def apply_import_diff(self, import_run_id: int, *, throttle_sec: float = 0.1) -> Dict[str, int]:
+    """
+    Применяет diff, посчитанный в dry-run (см. data_processing.diff): CSV заново
+    не разбирается, в работу идут только строки create/update.
+    """
+    from .diff import load_planned_rows
+
+    run = ImportRun.objects.get(pk=import_run_id)
+    if run.status == ImportRun.Status.SUCCESS:
+        return run.counters
+
+    rows = load_planned_rows(run)
+    # Ошибки разбора, найденные в dry-run, остаются в итогах импорта (как в finalize_parallel_import)
+    counters = {
+        **_new_counters(),
+        "merged_duplicates": run.diff_summary.get("merged_duplicates", 0),
+        "errors": len(run.errors),
+    }
+    telemetry = ImportTelemetry()
+    telemetry.restore(run.stage_timings, run.http_calls, run.errors)
+    run.task_id = self.request.id or run.task_id
+    run.status = ImportRun.Status.RUNNING
+    run.started_at = run.started_at or timezone.now()
+    run.total_rows = len(rows)
+    run.save()
+
+    ctx = _make_ctx(CANONICAL_FIELD_MAP, counters, telemetry, throttle_sec)
+    if rows:
+        return self.replace(_fan_out_rows(run, rows, ctx, self.request.id))
+
+    _finish_run(run, telemetry, counters, ImportRun.Status.SUCCESS)
+    _cleanup_source(run, None)
+    ProgressPublisher(self.request.id, total=0).finish(counters)
+    return counters
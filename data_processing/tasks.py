@@ -1,6 +1,7 @@
 import os
 import time
 import requests
+from datetime import timedelta
 from decimal import Decimal
 from celery import shared_task
 from requests.adapters import HTTPAdapter, Retry
@@ -13,7 +14,24 @@ import django
 django.setup()
 # -----------------------------------------------
 
-from mtg_app.models import Card
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+from mtg_app.legality import legality_bits, refresh_deck_legality
+from mtg_app.models import Printing
+from mtg_app import deck_similarity, recommender, trades
+
+SCRYFALL_COLLECTION_URL = "https://api.scryfall.com/cards/collection"
+COLLECTION_BATCH = 75  # максимум идентификаторов в одном запросе /cards/collection
+
+# Как часто обновлять цену: дорогие и новые карты — каждый день, дешевую массу — раз в месяц.
+# Карты без цены (priced_at пуст) идут первыми.
+TIER_NEVER, TIER_HOT, TIER_NORMAL, TIER_BULK = range(4)
+TIER_MAX_AGE = {
+    TIER_HOT: timedelta(days=1),
+    TIER_NORMAL: timedelta(days=7),
+    TIER_BULK: timedelta(days=30),
+}
 
 # Вспомогательная функция для сессии (как в services.py)
 def _session_with_retries() -> requests.Session:
@@ -22,67 +40,160 @@ def _session_with_retries() -> requests.Session:
     s.mount("https://", HTTPAdapter(max_retries=retries))
     return s
 
+def _price_tier_conditions(now):
+    high_value = Decimal(str(getattr(settings, "PRICE_REFRESH_HIGH_VALUE", 10)))
+    bulk_value = Decimal(str(getattr(settings, "PRICE_REFRESH_BULK_VALUE", 1)))
+    recent = now - timedelta(days=getattr(settings, "PRICE_REFRESH_RECENT_DAYS", 7))
+    return {
+        TIER_HOT: Q(market_price__gte=high_value) | Q(added_at__gte=recent),
+        TIER_NORMAL: Q(market_price__gte=bulk_value),
+        TIER_BULK: Q(),
+    }
+
+
+def cards_due_for_pricing(now=None):
+    """
+    Печати, чья цена устарела для их "уровня", в порядке приоритета:
+    без цены -> дорогие/новые -> средние -> дешевые; внутри уровня — самые старые цены.
+    """
+    now = now or timezone.now()
+    conditions = _price_tier_conditions(now)
+    tier = Case(
+        When(priced_at__isnull=True, then=Value(TIER_NEVER)),
+        When(conditions[TIER_HOT], then=Value(TIER_HOT)),
+        When(conditions[TIER_NORMAL], then=Value(TIER_NORMAL)),
+        default=Value(TIER_BULK),
+        output_field=IntegerField(),
+    )
+    return (
+        Printing.objects.exclude(scryfall_id="")
+        .annotate(price_tier=tier)
+        .filter(
+            Q(price_tier=TIER_NEVER)
+            | Q(price_tier=TIER_HOT, priced_at__lt=now - TIER_MAX_AGE[TIER_HOT])
+            | Q(price_tier=TIER_NORMAL, priced_at__lt=now - TIER_MAX_AGE[TIER_NORMAL])
+            | Q(price_tier=TIER_BULK, priced_at__lt=now - TIER_MAX_AGE[TIER_BULK])
+        )
+        .order_by("price_tier", F("priced_at").asc(nulls_first=True), "pk")
+    )
+
+
+def _extract_price(data: dict):
+    """Цена из ответа Scryfall (приоритет: EUR, затем USD) -> (Decimal, валюта) или None."""
+    prices = data.get('prices') or {}
+    if prices.get('eur'):
+        return Decimal(prices['eur']), "EUR"
+    if prices.get('usd'):
+        return Decimal(prices['usd']), "USD"
+    return None
+
+
 @shared_task
-def update_all_card_prices():
+def refresh_card_prices(budget: int | None = None):
     """
-    Проходит по всем картам в БД и обновляет их *рыночную* цену из Scryfall API.
+    Инкрементальное обновление рыночных цен в пределах бюджета запросов.
+    Цены берутся пачками по 75 карт через /cards/collection, поэтому один запуск
+    обновляет до budget * 75 карт и длится ограниченное время при любом размере коллекции.
     """
-    print("\n--- [CELERY BEAT] ЗАПУСК: Обновление рыночных цен... ---")
+    budget = budget or getattr(settings, "PRICE_REFRESH_BUDGET", 100)
+    max_seconds = getattr(settings, "PRICE_REFRESH_MAX_SECONDS", 15 * 60)
+    print("\n--- [CELERY BEAT] ЗАПУСК: Обновление устаревших цен... ---")
     session = _session_with_retries()
-    
-    # Получаем все ID карт, у которых есть Scryfall ID
-    card_ids = Card.objects.exclude(scryfall_id__isnull=True).values_list('pk', 'name', 'scryfall_id')
-    total_cards = card_ids.count()
-    print(f"[INFO] Найдено {total_cards} карт для проверки.")
-    
-    updated_count = 0
-    error_count = 0
-
-    # Обрабатываем карты пачками (по одной, чтобы видеть лог)
-    for i, (card_pk, card_name, scryfall_id) in enumerate(card_ids.iterator()):
-        
-        # Логгирование прогресса
-        if i % 100 == 0:
-            print(f"[INFO] Прогресс: {i} / {total_cards} карт...")
-            
+    started = time.monotonic()
+
+    due = list(cards_due_for_pricing().values_list('pk', 'scryfall_id')[: budget * COLLECTION_BATCH])
+    print(f"[INFO] К обновлению в этом запуске: {len(due)} карт (бюджет: {budget} запросов).")
+
+    updated_count = error_count = requests_made = 0
+    for start in range(0, len(due), COLLECTION_BATCH):
+        if time.monotonic() - started > max_seconds:
+            print("[INFO] Достигнут лимит времени, остальное — в следующий запуск.")
+            break
+        batch = due[start : start + COLLECTION_BATCH]
         try:
-            # 1. Запрос к Scryfall API
-            api_url = f"https://api.scryfall.com/cards/{scryfall_id}"
-            response = session.get(api_url, timeout=10)
+            requests_made += 1
+            response = session.post(
+                SCRYFALL_COLLECTION_URL,
+                json={"identifiers": [{"id": scryfall_id} for _, scryfall_id in batch]},
+                timeout=30,
+            )
             response.raise_for_status()
-            data = response.json()
-
-            # 2. Поиск цены (приоритет: EUR, затем USD)
-            price_str = None
-            currency_str = "USD" # Валюта по умолчанию, если EUR нет
-
-            if data.get('prices'):
-                # --- ВОТ ЭТОТ БЛОК МЫ ИСПРАВИЛИ ---
-                if data['prices'].get('eur'):
-                    price_str = data['prices']['eur']
-                    currency_str = "EUR"
-                elif data['prices'].get('usd'):
-                    price_str = data['prices']['usd']
-                    currency_str = "USD"
-                # ---------------------------------
-
-            if price_str:
-                new_price = Decimal(price_str)
-                
-                # 3. Обновляем цену и валюту в БД
-                Card.objects.filter(pk=card_pk).update(
-                    market_price=new_price, 
-                    market_price_currency=currency_str
-                )
-                updated_count += 1
-            
-            # 4. Вежливость к API (100ms задержка)
-            time.sleep(0.1) # 10 запросов в секунду
-
+            by_id = {item['id']: item for item in response.json().get('data', [])}
         except Exception as e:
-            print(f"[ERROR] Не удалось обновить {card_name} (ID: {scryfall_id}): {e}")
-            error_count += 1
+            print(f"[ERROR] Не удалось получить пачку цен ({len(batch)} карт): {e}")
+            error_count += len(batch)
+            continue
+
+        now = timezone.now()
+        priced, missing = [], []
+        for printing_pk, scryfall_id in batch:
+            data = by_id.get(scryfall_id, {})
+            price = _extract_price(data)
+            if price is None:
+                missing.append(printing_pk)
+                continue
+            market_price, currency = price
+            # Тот же ответ несет и легальность — банлисты подтягиваются вместе с ценами
+            legal, restricted = legality_bits(data.get('legalities'))
+            priced.append(Printing(pk=printing_pk, market_price=market_price, market_price_currency=currency,
+                                   priced_at=now, legal_formats=legal, restricted_formats=restricted))
+        Printing.objects.bulk_update(
+            priced, ["market_price", "market_price_currency", "priced_at", "legal_formats", "restricted_formats"]
+        )
+        # Карты без цены тоже помечаем: иначе они бы занимали бюджет каждый запуск
+        Printing.objects.filter(pk__in=missing).update(priced_at=now)
+        updated_count += len(priced)
+
+        time.sleep(0.1)  # Вежливость к API (до 10 запросов в секунду)
 
     print(f"--- [CELERY BEAT] ЗАВЕРШЕНО ---")
-    print(f"Успешно обновлено: {updated_count}, Ошибок: {error_count}")
-    return f"Updated: {updated_count}, Errors: {error_count}"
\ No newline at end of file
+    print(f"Успешно обновлено: {updated_count}, Ошибок: {error_count}, Запросов: {requests_made}")
+    return f"Updated: {updated_count}, Errors: {error_count}, Requests: {requests_made}"
+
+
+@shared_task
+def update_all_card_prices():
+    """Старое имя задачи (могло остаться в очереди/расписании) — теперь инкрементальное обновление."""
+    return refresh_card_prices()
+
+
+@shared_task
+def revalidate_deck_legality():
+    """Перепроверка легальности всех публичных колод одним проходом (после смены банлиста)."""
+    result = refresh_deck_legality()
+    return f"Legal: {result['legal']}, Illegal: {result['illegal']}"
+
+
+@shared_task
+def update_similar_cards():
+    """Похожие карты для новых карт каталога (без перестройки TF-IDF матрицы)."""
+    result = recommender.update_similar_cards()
+    return f"Cards: {result['cards']}, Updated: {result['updated']}"
+
+
+@shared_task
+def rebuild_similar_cards():
+    """Полная перестройка индекса похожих карт (словарь и IDF — по текущему каталогу)."""
+    result = recommender.build_similar_cards()
+    return f"Cards: {result['cards']}, Updated: {result['updated']}"
+
+
+@shared_task
+def refresh_deck_signatures():
+    """MinHash-сигнатуры и LSH-корзины публичных колод, чей состав изменился."""
+    result = deck_similarity.refresh_deck_signatures()
+    return f"Updated: {result['updated']}, Removed: {result['removed']}"
+
+
+@shared_task
+def cluster_deck_archetypes():
+    """Кластеризация публичных колод в архетипы по LSH-корзинам."""
+    result = deck_similarity.cluster_archetypes()
+    return f"Decks: {result['decks']}, Archetypes: {result['archetypes']}"
+
+
+@shared_task
+def refresh_trade_index():
+    """Индекс свободных для обмена карт — только для пользователей, чья коллекция изменилась."""
+    result = trades.refresh_trade_index()
+    return f"Users: {result['users']}, Haves: {result['haves']}"
@@ -0,0 +1,53 @@
+# data_processing/telemetry.py
+"""Замеры импорта: время по стадиям, HTTP-запросы и ошибки по строкам."""
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("parse", "db_write", "enrichment", "image_download")
+
+
+class ImportTelemetry:
+    def __init__(self):
+        self.timings = dict.fromkeys(STAGES, 0.0)
+        self.http_calls = Counter()
+        self.errors: list[dict] = []
+        self._started = time.perf_counter()
+
+    def restore(self, timings: dict, http_calls: dict, errors: list) -> None:
+        """Продолжение после чекпоинта: накопленное ранее не теряем."""
+        for name, seconds in timings.items():
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+        self.http_calls.update(http_calls)
+        self.errors.extend(errors)
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - started
+
+    def http(self, kind: str) -> None:
+        self.http_calls[kind] += 1
+
+    def error(self, row_num: int | None, message: str) -> None:
+        logger.warning("Импорт, строка %s: %s", row_num, message)
+        self.errors.append({"row": row_num, "message": message})
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def rows_per_second(self, rows: int) -> float:
+        elapsed = self.elapsed
+        return round(rows / elapsed, 2) if elapsed > 0 else 0.0
+
+    def rounded_timings(self) -> dict:
+        return {name: round(seconds, 3) for name, seconds in self.timings.items()}
@@ -5,7 +5,9 @@ app_name = "data_processing"
 
 urlpatterns = [
     path("upload/", views.upload_csv, name="upload_csv"),
+    path("upload/<int:pk>/preview/", views.import_preview, name="import_preview"),
     # --- ДОБАВЬТЕ ЭТУ СТРОКУ ---
     path("api/get_task_status/", views.get_task_status, name="get_task_status"),
+    path("api/import-progress/", views.import_progress_stream, name="import_progress_stream"),
     path("trigger-price-update/", views.trigger_price_update, name="trigger_price_update"),
 ]
\ No newline at end of file
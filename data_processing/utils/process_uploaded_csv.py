@@ -6,7 +6,7 @@ import tempfile
 import requests
 from django.conf import settings
 
-from mtg_app.models import Card, Set
+from mtg_app.models import Card, Printing, Set
 
 
 def sanitize_filename(name: str) -> str:
@@ -49,14 +49,20 @@ def process_uploaded_csv(file_path: str) -> dict:
                     continue
 
                 set_obj, _ = Set.objects.get_or_create(code=set_code, defaults={"name": set_name})
-                card, created = Card.objects.update_or_create(
+                printing, _ = Printing.objects.update_or_create(
                     scryfall_id=scryfall_id,
                     defaults={
                         "name": name,
                         "set": set_obj,
                         "collector_number": collector_number,
-                        "foil": row.get("Foil", "").strip().lower() in ["foil", "true"],
                         "rarity": row.get("Rarity", "common"),
+                    },
+                )
+                card, created = Card.objects.update_or_create(
+                    printing=printing,
+                    owner=None,
+                    defaults={
+                        "foil": row.get("Foil", "").strip().lower() in ["foil", "true"],
                         "quantity": int(row.get("Quantity", 1)),
                         "purchase_price": float(row.get("Purchase price", 0) or 0),
                         "language": row.get("Language", "English"),
@@ -88,8 +94,8 @@ def process_uploaded_csv(file_path: str) -> dict:
                         with open(image_path, "wb") as f:
                             f.write(response.content)
                         image_download_success += 1
-                        card.image_url = f"cards/{image_filename}"
-                        card.save(update_fields=["image_url"])
+                        printing.image_url = f"cards/{image_filename}"
+                        printing.save(update_fields=["image_url"])
                     except Exception:
                         image_download_errors += 1
 
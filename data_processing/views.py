@@ -1,14 +1,23 @@
-import tempfile
+import asyncio
+import json
 import os
+import time
+
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.shortcuts import redirect, render
-from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from celery.result import AsyncResult # <-- НОВЫЙ ИМПОРТ
 
+from mtg_app.decorators import async_login_required
+
+from .diff import prepare_preview
 from .forms import CSVUploadForm
-from .services import process_uploaded_csv
-from .tasks import update_all_card_prices
+from .models import ImportRun
+from .progress import FINAL_STATES, mark_delivered, read_progress
+from .services import apply_import_diff, process_uploaded_csv
+from .tasks import refresh_card_prices
 
 def _is_staff(user):
     return user.is_staff or user.is_superuser
@@ -24,19 +33,28 @@ def upload_csv(request):
                 messages.error(request, "Ошибка: Поле 'file' не найдено.")
                 return redirect("data_processing:upload_csv")
 
-            temp_file_path = None
             try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as temp_file:
-                    for chunk in file.chunks():
-                        temp_file.write(chunk)
-                    temp_file_path = temp_file.name
-
-                # --- ИЗМЕНЕНИЕ: ЗАПУСКАЕМ ЗАДАЧУ И СОХРАНЯЕМ ID ---
-                task = process_uploaded_csv.delay(temp_file_path)
-                
+                # Файл сохраняется в MEDIA_ROOT/imports/ и живет до успешного завершения
+                # импорта, чтобы задача могла продолжить работу после перезапуска воркера
+                run = ImportRun.objects.create(
+                    user=request.user, file_name=file.name, source_file=file
+                )
+                if form.cleaned_data.get("dry_run"):
+                    # Dry-run: считаем diff сразу (секунды даже для 50k строк) и показываем его
+                    run.status = ImportRun.Status.PREVIEW
+                    run.save(update_fields=["status"])
+                    try:
+                        prepare_preview(run)
+                    except Exception:
+                        ImportRun.objects.filter(pk=run.pk).update(status=ImportRun.Status.FAILURE)
+                        raise
+                    return redirect("data_processing:import_preview", pk=run.pk)
+
+                task = process_uploaded_csv.delay(import_run_id=run.pk)
+                ImportRun.objects.filter(pk=run.pk, task_id="").update(task_id=task.id)
+
                 # Сохраняем ID задачи в сессию пользователя
                 request.session['csv_import_task_id'] = task.id
-                # -------------------------------------------------
 
                 messages.info(request, f"Импорт файла \"{file.name}\" начался. Это может занять несколько минут.")
 
@@ -50,6 +68,40 @@ def upload_csv(request):
     return render(request, "data_processing/upload_csv.html", {"form": form})
 
 
+@login_required
+@user_passes_test(_is_staff)
+def import_preview(request, pk):
+    """Предпросмотр dry-run. POST: применить посчитанный diff или отменить импорт."""
+    run = get_object_or_404(ImportRun, pk=pk, status=ImportRun.Status.PREVIEW)
+
+    if request.method == "POST":
+        if request.POST.get("action") == "apply":
+            # Проверка статуса и переход — одним UPDATE: двойной клик ставит задачу один раз
+            claimed = ImportRun.objects.filter(pk=run.pk, status=ImportRun.Status.PREVIEW).update(
+                status=ImportRun.Status.PENDING
+            )
+            if not claimed:
+                messages.info(request, f"Изменения из \"{run.file_name}\" уже применяются.")
+                return redirect("mtg_app:card_list")
+            task = apply_import_diff.delay(run.pk)
+            ImportRun.objects.filter(pk=run.pk, task_id="").update(task_id=task.id)
+            request.session['csv_import_task_id'] = task.id
+            messages.info(request, f"Изменения из \"{run.file_name}\" применяются в фоне.")
+            return redirect("mtg_app:card_list")
+
+        run.diff_file.delete(save=False)
+        run.source_file.delete(save=False)
+        run.delete()
+        messages.info(request, "Импорт отменен, коллекция не изменилась.")
+        return redirect("data_processing:upload_csv")
+
+    return render(request, "data_processing/import_preview.html", {
+        "run": run,
+        "summary": run.diff_summary,
+        "samples": run.diff_summary.get("samples", {}),
+    })
+
+
 # --- НОВАЯ ФУНКЦИЯ ДЛЯ AJAX ---
 @login_required
 def get_task_status(request):
@@ -57,6 +109,17 @@ def get_task_status(request):
     if not task_id:
         return JsonResponse({'state': 'NOT_FOUND'})
 
+    # Сначала смотрим в быстрый канал прогресса (кэш)
+    progress = read_progress(task_id)
+    if progress is not None:
+        if progress['state'] in FINAL_STATES:
+            del request.session['csv_import_task_id']
+        return JsonResponse({
+            'state': progress['state'],
+            'progress': {'current': progress['current'], 'total': progress['total']},
+            'results': progress.get('results'),
+        })
+
     # Получаем результат задачи из Result Backend (который теперь в БД Django)
     task = AsyncResult(task_id)
     
@@ -75,6 +138,81 @@ def get_task_status(request):
 
     return JsonResponse(response_data)
 
+# --- SSE: ПОТОК ПРОГРЕССА ИМПОРТА ---
+# Поток обслуживает ASGI-сервис (app-asgi, см. nginx.conf): асинхронный генератор
+# не держит воркер, пока ждет, а sync-воркер gunicorn был бы занят целиком и убит по таймауту
+SSE_POLL_INTERVAL = 0.5      # как часто читаем кэш (сек.)
+SSE_FALLBACK_INTERVAL = 5.0  # как часто спрашиваем Celery, если в кэше пусто
+SSE_MAX_DURATION = 300       # потом браузер сам переподключится
+SSE_HEARTBEAT = 15
+
+
+def _sse_event(data: dict) -> str:
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _celery_progress(task_id: str) -> dict | None:
+    """Запасной путь, если задача пишет в другой (локальный) кэш."""
+    task = AsyncResult(task_id)
+    if task.state == 'SUCCESS':
+        return {'state': 'SUCCESS', 'results': task.result}
+    if task.state == 'FAILURE':
+        return {'state': 'FAILURE'}
+    return None
+
+
+async def _progress_stream(task_id: str):
+    yield "retry: 3000\n\n"
+    started = last_beat = last_fallback = time.monotonic()
+    last_sent = None
+
+    while time.monotonic() - started < SSE_MAX_DURATION:
+        data = await sync_to_async(read_progress)(task_id)
+        now = time.monotonic()
+        if data is None and now - last_fallback >= SSE_FALLBACK_INTERVAL:
+            last_fallback = now
+            data = await sync_to_async(_celery_progress)(task_id)
+
+        if data is not None and data != last_sent:
+            last_sent, last_beat = data, now
+            yield _sse_event(data)
+            if data['state'] in FINAL_STATES:
+                await sync_to_async(mark_delivered)(task_id)
+                return
+        elif now - last_beat >= SSE_HEARTBEAT:
+            last_beat = now
+            yield ": ping\n\n"
+
+        await asyncio.sleep(SSE_POLL_INTERVAL)
+
+
+def _stream_task_id(request) -> str | None:
+    """Задача импорта из сессии; None (и очистка сессии), если показывать уже нечего."""
+    task_id = request.session.get('csv_import_task_id')
+    progress = read_progress(task_id) if task_id else None
+    if not task_id or (progress and progress.get('delivered')):
+        request.session.pop('csv_import_task_id', None)
+        request.session.save()
+        return None
+    return task_id
+
+
+@async_login_required
+async def import_progress_stream(request):
+    """
+    Server-Sent Events: одно соединение вместо опроса каждые 3 секунды.
+    Сессию читаем только при подключении.
+    """
+    task_id = await sync_to_async(_stream_task_id)(request)
+    if task_id is None:
+        return HttpResponse(status=204)  # 204 — EventSource не будет переподключаться
+
+    response = StreamingHttpResponse(_progress_stream(task_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Nginx не должен буферизовать поток
+    return response
+
+
 @login_required
 @user_passes_test(_is_staff) # Только админ может это делать
 def trigger_price_update(request):
@@ -83,8 +221,8 @@ def trigger_price_update(request):
     """
     try:
         # Вызываем нашу задачу .delay() - это отправит ее в очередь Celery
-        update_all_card_prices.delay()
-        messages.success(request, "Фоновое обновление цен запущено! Прогресс будет виден в консоли Celery.")
+        refresh_card_prices.delay()
+        messages.success(request, "Фоновое обновление устаревших цен запущено! Прогресс будет виден в консоли Celery.")
     except Exception as e:
         messages.error(request, f"Не удалось запустить задачу: {e}")
     
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.26 on 2026-10-19 03:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_thread_activity(apps, schema_editor):
+    Thread = apps.get_model("forum", "Thread")
+    Post = apps.get_model("forum", "Post")
+    for thread in Thread.objects.all().iterator():
+        posts = Post.objects.filter(thread_id=thread.pk)
+        last_post = posts.order_by("-id").first()
+        thread.post_count = posts.count()
+        thread.last_activity_at = last_post.created_at if last_post else thread.created_at
+        thread.last_post_author_id = last_post.author_id if last_post else None
+        thread.save(update_fields=["post_count", "last_activity_at", "last_post_author"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('forum', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thread',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='last_post_author',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='thread',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_thread_activity, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['thread', 'id'], name='forum_post_thread_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thread',
+            index=models.Index(fields=['-last_activity_at', '-id'], name='forum_thread_activity_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 
@@ -10,6 +11,18 @@ class Thread(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_closed = models.BooleanField(default=False)
 
+    # Денормализованные поля (обновляются сигналами в forum/signals.py)
+    post_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    last_post_author = models.ForeignKey(
+        User, on_delete=models.SET_NULL, related_name="+", null=True, blank=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-last_activity_at", "-id"], name="forum_thread_activity_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -20,5 +33,10 @@ class Post(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["thread", "id"], name="forum_post_thread_id_idx"),
+        ]
+
     def __str__(self):
         return f"Post by {self.author.username} on {self.thread.title}"
@@ -0,0 +1,72 @@
+"""
+Keyset-пагинация: следующая страница ищется по значениям ключа сортировки
+последней записи, а не через OFFSET, поэтому стоимость не растет с номером страницы.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from django.db.models import Q
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str | None = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()  # без потери микросекунд
+    raise TypeError(f"Нельзя сериализовать {type(value)!r} в курсор")
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, default=_json_default).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list | None:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, binascii.Error):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _after(ordering, values) -> Q:
+    """(a, b) > (x, y)  =>  a > x OR (a = x AND b > y), с учетом направления."""
+    condition = Q()
+    for i, field in enumerate(ordering):
+        lookup = "lt" if field.startswith("-") else "gt"
+        step = Q(**{f"{field.lstrip('-')}__{lookup}": values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values[:i], strict=True):
+            step &= Q(**{prev_field.lstrip("-"): prev_value})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, ordering, cursor=None, per_page=20) -> KeysetPage:
+    """
+    Возвращает страницу queryset'а, отсортированного по `ordering`.
+    Последнее поле ordering должно быть уникальным (обычно id).
+    """
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(cursor) if cursor else None
+    if values and len(values) == len(ordering):
+        queryset = queryset.filter(_after(ordering, values))
+
+    items = list(queryset[: per_page + 1])
+    if len(items) <= per_page:
+        return KeysetPage(items)
+
+    items = items[:per_page]
+    last = items[-1]
+    return KeysetPage(items, encode_cursor([getattr(last, f.lstrip("-")) for f in ordering]))
@@ -0,0 +1,38 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Post, Thread
+
+
+@receiver(post_save, sender=Post)
+def update_thread_on_post_create(sender, instance, created, **kwargs):
+    if not created:
+        return
+    Thread.objects.filter(pk=instance.thread_id).update(
+        post_count=F("post_count") + 1,
+        last_activity_at=instance.created_at,
+        last_post_author=instance.author_id,
+    )
+
+
+@receiver(pre_delete, sender=Thread)
+def mark_thread_deleted(sender, instance, origin=None, **kwargs):
+    # pre_delete темы приходит раньше post_delete ее сообщений (каскад удаляет их первыми):
+    # помечаем тему на объекте-источнике удаления — он общий для всего каскада
+    if origin is not None:
+        origin._forum_deleted_thread_ids = getattr(origin, "_forum_deleted_thread_ids", set()) | {instance.pk}
+
+
+@receiver(post_delete, sender=Post)
+def update_thread_on_post_delete(sender, instance, origin=None, **kwargs):
+    if instance.thread_id in getattr(origin, "_forum_deleted_thread_ids", ()):
+        return  # Тема удаляется целиком — пересчитывать нечего
+    thread = Thread.objects.filter(pk=instance.thread_id).first()
+    if thread is None:
+        return
+    last_post = thread.posts.order_by("-id").first()
+    thread.post_count = thread.posts.count()
+    thread.last_activity_at = last_post.created_at if last_post else thread.created_at
+    thread.last_post_author_id = last_post.author_id if last_post else None
+    thread.save(update_fields=["post_count", "last_activity_at", "last_post_author"])
@@ -4,16 +4,36 @@ from django.shortcuts import get_object_or_404, redirect, render
 
 from .forms import PostForm, ThreadForm
 from .models import Post, Thread
+from .pagination import keyset_page
+
+THREADS_PER_PAGE = 20
+POSTS_PER_PAGE = 50
 
 
 def thread_list(request):
-    threads = Thread.objects.all().order_by("-created_at")
-    return render(request, "forum/thread_list.html", {"threads": threads})
+    threads = Thread.objects.select_related("author", "last_post_author")
+    page = keyset_page(
+        threads,
+        ("-last_activity_at", "-id"),
+        cursor=request.GET.get("cursor"),
+        per_page=THREADS_PER_PAGE,
+    )
+    return render(
+        request,
+        "forum/thread_list.html",
+        {"threads": page.items, "page": page, "is_first_page": not request.GET.get("cursor")},
+    )
 
 
 def thread_detail(request, pk):
-    thread = get_object_or_404(Thread, pk=pk)
-    posts = thread.posts.all().order_by("created_at")
+    thread = get_object_or_404(Thread.objects.select_related("author"), pk=pk)
+    page = keyset_page(
+        thread.posts.select_related("author"),
+        ("id",),
+        cursor=request.GET.get("cursor"),
+        per_page=POSTS_PER_PAGE,
+    )
+    posts = page.items
 
     # Форма для быстрого ответа внизу темы
     if request.method == "POST" and request.user.is_authenticated:
@@ -28,7 +48,15 @@ def thread_detail(request, pk):
         form = PostForm()
 
     return render(
-        request, "forum/thread_detail.html", {"thread": thread, "posts": posts, "form": form}
+        request,
+        "forum/thread_detail.html",
+        {
+            "thread": thread,
+            "posts": posts,
+            "page": page,
+            "is_first_page": not request.GET.get("cursor"),
+            "form": form,
+        },
     )
 
 
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Card, Deck, Set
+from .models import Card, Deck, Printing, Set
 
 # Register your models here.
 
@@ -11,16 +11,47 @@ class SetAdmin(admin.ModelAdmin):
     search_fields = ("name", "code")
 
     def card_count(self, obj):
-        return obj.cards.count()
+        return obj.card_count
 
     card_count.short_description = "Количество карт"
 
 
+@admin.register(Printing)
+class PrintingAdmin(admin.ModelAdmin):
+    list_display = ("name", "set", "collector_number", "rarity", "market_price", "scryfall_id")
+    search_fields = ("name", "set__name", "scryfall_id")
+    list_filter = ("set", "rarity")
+    list_select_related = ("set",)
+
+
 @admin.register(Card)
 class CardAdmin(admin.ModelAdmin):
-    list_display = ("name", "set", "collector_number", "foil", "rarity", "quantity", "scryfall_id")
-    search_fields = ("name", "set__name", "scryfall_id")
-    list_filter = ("set", "foil", "rarity", "language", "condition")
+    list_display = ("name", "set", "collector_number", "foil", "rarity", "quantity", "owner", "scryfall_id")
+    search_fields = ("printing__name", "printing__set__name", "printing__scryfall_id")
+    list_filter = ("printing__set", "foil", "printing__rarity", "language", "condition")
+    list_select_related = ("printing__set", "owner")
+    raw_id_fields = ("printing",)
+
+    # Каталожные поля берутся из печати
+    @admin.display(description="Название", ordering="printing__name")
+    def name(self, obj):
+        return obj.printing.name
+
+    @admin.display(description="Сет", ordering="printing__set__code")
+    def set(self, obj):
+        return obj.printing.set
+
+    @admin.display(description="Номер", ordering="printing__collector_number")
+    def collector_number(self, obj):
+        return obj.printing.collector_number
+
+    @admin.display(description="Редкость", ordering="printing__rarity")
+    def rarity(self, obj):
+        return obj.printing.rarity
+
+    @admin.display(description="Scryfall ID")
+    def scryfall_id(self, obj):
+        return obj.printing.scryfall_id
 
 
 class DeckCardInline(admin.TabularInline):
@@ -0,0 +1,129 @@
+"""
+Аналитика колод: мана-кривая, цветные символы маны, типы карт, цены.
+
+Состав загружается одним запросом в массивы NumPy (строка = позиция
+колоды), все метрики считаются векторно с группировкой по колоде через
+bincount — одинаково для одной колоды и для всех публичных разом.
+Результат кэшируется по (колода, Deck.version); цены печатей меняются
+без смены версии, поэтому у записи кэша еще и ограниченный срок жизни.
+"""
+from __future__ import annotations
+
+import numpy as np
+from django.core.cache import cache
+
+from .models import Deck, DeckCard
+
+ANALYTICS_CACHE_TIMEOUT = 60 * 60  # цены обновляются раз в час (refresh_card_prices)
+
+CURVE_MAX = 6  # последний столбец кривой — "6+"
+CURVE_LABELS = [str(cmc) for cmc in range(CURVE_MAX)] + [f"{CURVE_MAX}+"]
+PIP_COLORS = ("W", "U", "B", "R", "G", "C")
+CARD_TYPES = ("Creature", "Instant", "Sorcery", "Enchantment", "Artifact", "Planeswalker", "Battle", "Land")
+PRICE_EDGES = (1, 5, 20)  # USD, market_price печати
+PRICE_LABELS = ("<1", "1–5", "5–20", "20+")
+
+
+def analytics_cache_key(deck_id: int, version: int) -> str:
+    return f"mtg_app:deck_analytics:{deck_id}:v{version}"
+
+
+def _load_rows(deck_ids: list[int]) -> dict[str, np.ndarray]:
+    rows = list(
+        DeckCard.objects.filter(deck_id__in=deck_ids).values_list(
+            "deck_id",
+            "quantity",
+            "card__printing__cmc",
+            "card__printing__mana_cost",
+            "card__printing__type_line",
+            "card__printing__market_price",
+        )
+    )
+    deck_col, quantity, cmc, mana_cost, type_line, price = zip(*rows) if rows else ((),) * 6
+    return {
+        "deck_id": np.array(deck_col, dtype=np.int64),
+        "quantity": np.array(quantity, dtype=np.float64),
+        "cmc": np.array(cmc, dtype=np.float64),
+        "mana_cost": np.array(mana_cost, dtype=str),
+        "type_line": np.array(type_line, dtype=str),
+        "price": np.array(price, dtype=np.float64),
+    }
+
+
+def compute_deck_analytics(deck_ids) -> dict[int, dict]:
+    """{deck_id: метрики} для всех переданных колод за один проход (пустые — с нулями)."""
+    decks = np.array(sorted(set(deck_ids)), dtype=np.int64)
+    n = len(decks)
+    if not n:
+        return {}
+    arrays = _load_rows(decks.tolist())
+    group = np.searchsorted(decks, arrays["deck_id"])
+    quantity = arrays["quantity"]
+
+    def per_deck(weights: np.ndarray) -> np.ndarray:
+        return np.bincount(group, weights=quantity * weights, minlength=n)
+
+    def per_deck_bucket(bucket: np.ndarray, size: int, mask: np.ndarray | float = 1.0) -> np.ndarray:
+        flat = np.bincount(group * size + bucket, weights=quantity * mask, minlength=n * size)
+        return flat.reshape(n, size)
+
+    has_type = {t: np.char.find(arrays["type_line"], t) >= 0 for t in CARD_TYPES}
+    spells = ~has_type["Land"]
+
+    total = per_deck(np.ones_like(quantity))
+    spell_count = per_deck(spells)
+    cmc_sum = per_deck(arrays["cmc"] * spells)
+    avg_cmc = np.divide(cmc_sum, spell_count, out=np.zeros(n), where=spell_count > 0)
+
+    curve_bucket = np.clip(np.floor(arrays["cmc"]), 0, CURVE_MAX).astype(np.int64)
+    curve = per_deck_bucket(curve_bucket, CURVE_MAX + 1, spells)
+    # Гибридные символы ({W/U}) засчитываются обоим цветам
+    pips = np.stack([per_deck(np.char.count(arrays["mana_cost"], color)) for color in PIP_COLORS], axis=1)
+    types = np.stack([per_deck(has_type[t]) for t in CARD_TYPES], axis=1)
+
+    price = arrays["price"]
+    value = per_deck(price)
+    price_buckets = per_deck_bucket(np.digitize(price, PRICE_EDGES), len(PRICE_LABELS))
+    max_price = np.zeros(n)
+    np.maximum.at(max_price, group, price)
+
+    return {
+        int(deck_id): {
+            "total_cards": int(total[i]),
+            "lands": int(types[i, CARD_TYPES.index("Land")]),
+            "avg_cmc": round(float(avg_cmc[i]), 2),
+            "mana_curve": dict(zip(CURVE_LABELS, curve[i].astype(int).tolist(), strict=True)),
+            "color_pips": dict(zip(PIP_COLORS, pips[i].astype(int).tolist(), strict=True)),
+            "types": dict(zip(CARD_TYPES, types[i].astype(int).tolist(), strict=True)),
+            "price": {
+                "total": round(float(value[i]), 2),
+                "max": round(float(max_price[i]), 2),
+                "buckets": dict(zip(PRICE_LABELS, price_buckets[i].astype(int).tolist(), strict=True)),
+            },
+        }
+        for i, deck_id in enumerate(decks)
+    }
+
+
+def _cached_analytics(versions: dict[int, int]) -> dict[int, dict]:
+    """versions = {deck_id: version}; промахи кэша считаются одним batch-проходом."""
+    keys = {analytics_cache_key(deck_id, version): deck_id for deck_id, version in versions.items()}
+    result = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [deck_id for deck_id in versions if deck_id not in result]
+    if missing:
+        fresh = compute_deck_analytics(missing)
+        cache.set_many(
+            {analytics_cache_key(deck_id, versions[deck_id]): data for deck_id, data in fresh.items()},
+            ANALYTICS_CACHE_TIMEOUT,
+        )
+        result.update(fresh)
+    return result
+
+
+def deck_analytics(deck: Deck) -> dict:
+    return _cached_analytics({deck.pk: deck.version})[deck.pk]
+
+
+def public_deck_analytics() -> dict[int, dict]:
+    """Метрики всех публичных колод (для страниц сравнения)."""
+    return _cached_analytics(dict(Deck.objects.filter(is_private=False).values_list("pk", "version")))
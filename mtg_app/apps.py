@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MtgAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "mtg_app"
+
+    def ready(self):
+        from . import signals  # noqa: F401
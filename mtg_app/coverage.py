@@ -0,0 +1,149 @@
+"""
+"Что я могу собрать": покрытие публичных колод коллекцией пользователя.
+
+Карта считается по названию (подходит любая печать). Требования всех
+публичных колод загружаются одним запросом в разреженную матрицу
+(колоды × названия), коллекция — одним сгруппированным запросом в вектор.
+Покрытие — min(требуется, есть) по ненулевым элементам матрицы, суммы по
+строкам — через bincount, так что 10k колод считаются за один проход.
+
+Результат кэшируется по версии коллекции пользователя и общей версии
+публичных колод (счетчики в кэше, растут по сигналам), плюс ограниченный
+срок жизни — цены недостающих карт обновляются без смены версий.
+"""
+from __future__ import annotations
+
+import numpy as np
+import scipy.sparse as sp
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .models import Card, Deck, DeckCard
+
+COVERAGE_CACHE_TIMEOUT = 60 * 60  # как у аналитики: цены обновляются раз в час
+PUBLIC_DECKS_VERSION_KEY = "mtg_app:public_decks_version"
+
+
+def collection_version_key(user_id: int) -> str:
+    return f"mtg_app:collection_version:{user_id}"
+
+
+def _bump(key: str) -> None:
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def bump_collection_version(user_id: int | None) -> None:
+    if user_id is not None:
+        _bump(collection_version_key(user_id))
+
+
+def bump_public_decks_version() -> None:
+    _bump(PUBLIC_DECKS_VERSION_KEY)
+
+
+def owned_quantities(user) -> dict[str, int]:
+    """{название: копий в коллекции} — все печати карты вместе."""
+    return dict(
+        Card.objects.filter(owner=user)
+        .values_list("printing__name")
+        .annotate(total=Sum("quantity"))
+        .order_by()
+    )
+
+
+def compute_coverage(owned: dict[str, int]) -> list[dict]:
+    """Покрытие каждой непустой публичной колоды; по убыванию готовности, затем по цене недостающего."""
+    rows = DeckCard.objects.filter(deck__is_private=False).values_list(
+        "deck_id", "card__printing__name", "quantity", "card__printing__market_price"
+    )
+    deck_index, name_index = {}, {}
+    deck_col, name_col, quantity, price = [], [], [], []
+    for deck_id, name, qty, market_price in rows.iterator():
+        deck_col.append(deck_index.setdefault(deck_id, len(deck_index)))
+        name_col.append(name_index.setdefault(name, len(name_index)))
+        quantity.append(qty)
+        price.append(market_price)
+    if not deck_index:
+        return []
+
+    n_decks, n_names = len(deck_index), len(name_index)
+    # Печати одного названия в колоде складываются (дубликаты coo суммируются)
+    required = sp.csr_matrix(
+        (np.array(quantity, dtype=np.int64), (np.array(deck_col), np.array(name_col))), shape=(n_decks, n_names)
+    )
+    required.sum_duplicates()
+    # Цена недостающей копии — самая дешевая печать названия среди публичных колод
+    prices = np.full(n_names, np.inf)
+    price_values = np.array(price, dtype=np.float64)
+    known = price_values > 0
+    np.minimum.at(prices, np.array(name_col)[known], price_values[known])
+    prices[np.isinf(prices)] = 0.0
+
+    have = np.zeros(n_names, dtype=np.int64)
+    for name, count in owned.items():
+        if name in name_index:
+            have[name_index[name]] = count
+
+    rows_of = np.repeat(np.arange(n_decks), np.diff(required.indptr))
+    covered = np.minimum(required.data, have[required.indices])
+    missing = required.data - covered
+    total = np.bincount(rows_of, weights=required.data, minlength=n_decks)
+    covered_total = np.bincount(rows_of, weights=covered, minlength=n_decks)
+    missing_cost = np.bincount(rows_of, weights=missing * prices[required.indices], minlength=n_decks)
+    missing_names = np.bincount(rows_of, weights=missing > 0, minlength=n_decks)
+
+    decks = list(deck_index)
+    result = [
+        {
+            "deck_id": decks[i],
+            "total": int(total[i]),
+            "owned": int(covered_total[i]),
+            "completion": round(float(100.0 * covered_total[i] / total[i]), 1),
+            "missing_cards": int(missing_names[i]),
+            "missing_cost": round(float(missing_cost[i]), 2),
+        }
+        for i in range(n_decks)
+    ]
+    result.sort(key=lambda item: (-item["completion"], item["missing_cost"], item["deck_id"]))
+    return result
+
+
+def collection_coverage(user) -> list[dict]:
+    """compute_coverage для коллекции пользователя — из кэша, пока ни коллекция, ни колоды не менялись."""
+    versions = cache.get_many([collection_version_key(user.pk), PUBLIC_DECKS_VERSION_KEY])
+    key = "mtg_app:coverage:{}:c{}:d{}".format(
+        user.pk, versions.get(collection_version_key(user.pk), 0), versions.get(PUBLIC_DECKS_VERSION_KEY, 0)
+    )
+    result = cache.get(key)
+    if result is None:
+        result = compute_coverage(owned_quantities(user))
+        cache.set(key, result, COVERAGE_CACHE_TIMEOUT)
+    return result
+
+
+def missing_cards(user, deck: Deck) -> list[dict]:
+    """Чего не хватает для конкретной колоды: [{"name", "need", "have"}], по названию.
+    Кэш — по версии коллекции пользователя и версии состава колоды."""
+    key = "mtg_app:missing_cards:{}:v{}:{}:c{}".format(
+        deck.pk, deck.version, user.pk, cache.get(collection_version_key(user.pk), 0)
+    )
+    result = cache.get(key)
+    if result is None:
+        owned = owned_quantities(user)
+        needed = dict(
+            DeckCard.objects.filter(deck=deck)
+            .values_list("card__printing__name")
+            .annotate(total=Sum("quantity"))
+            .order_by()
+        )
+        result = [
+            {"name": name, "need": need, "have": owned.get(name, 0)}
+            for name, need in sorted(needed.items())
+            if owned.get(name, 0) < need
+        ]
+        cache.set(key, result, COVERAGE_CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,166 @@
+"""
+Похожие колоды: MinHash + LSH по составу.
+
+Колода — множество элементов "название#номер копии" (копии свыше
+MAX_COPIES не учитываются, иначе 20 Mountain перевесят все остальное), так
+что сходство сигнатур оценивает Жаккара для мультимножеств. Сигнатура —
+NUM_PERM минимумов универсальных хэшей (a·x + b) mod p, считается векторно.
+
+Сигнатура режется на BANDS полос по ROWS значений; ключ полосы лежит в
+DeckLSHBucket с индексом, так что кандидаты в похожие — один запрос
+key IN (...) вместо сравнения со всеми колодами. Порог, выше которого пара
+почти наверняка окажется кандидатом, ≈ (1/BANDS)^(1/ROWS) ≈ 0.42.
+
+Сигнатуры публичных колод обновляются пачкой для колод, у которых
+Deck.version ушла вперед (refresh_deck_signatures, задача Celery);
+кластеризация в архетипы — отдельный batch по тем же корзинам.
+"""
+from __future__ import annotations
+
+import hashlib
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import Deck, DeckCard, DeckLSHBucket, DeckSignature
+
+NUM_PERM = 128
+BANDS, ROWS = 32, 4
+MAX_COPIES = 4
+MERSENNE_PRIME = (1 << 31) - 1
+ARCHETYPE_THRESHOLD = 0.5
+
+_rng = np.random.default_rng(20240601)  # фиксирован: сигнатуры в БД должны оставаться сравнимыми
+_A = _rng.integers(1, MERSENNE_PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, MERSENNE_PRIME, NUM_PERM, dtype=np.uint64)
+
+
+def _hash(value: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "little")
+
+
+def deck_elements(quantities: dict[str, int]) -> list[str]:
+    return [f"{name}#{copy}" for name, quantity in quantities.items() for copy in range(min(quantity, MAX_COPIES))]
+
+
+def minhash(elements) -> np.ndarray | None:
+    """(NUM_PERM,) uint32; None для пустой колоды."""
+    if not elements:
+        return None
+    values = np.array([_hash(e.encode()) % MERSENNE_PRIME for e in elements], dtype=np.uint64)
+    # a, x < 2^31 — произведение помещается в uint64 без переполнения
+    hashed = (_A[:, None] * values[None, :] + _B[:, None]) % MERSENNE_PRIME
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def band_keys(signature: np.ndarray) -> list[int]:
+    """Ключ каждой полосы как signed int64 (BigIntegerField); номер полосы входит в хэш."""
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(bytes([band]) + signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8)
+        keys.append(int.from_bytes(digest.digest(), "little", signed=True))
+    return keys
+
+
+def similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Оценка Жаккара: доля совпавших минимумов, (m, NUM_PERM) -> (m,)."""
+    return (others == signature[None, :]).mean(axis=1)
+
+
+def _from_bytes(data) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype=np.uint32)
+
+
+def compute_signatures(deck_ids) -> dict[int, np.ndarray]:
+    """{deck_id: сигнатура} одним запросом по DeckCard; пустых колод в ответе нет."""
+    quantities = defaultdict(lambda: defaultdict(int))
+    rows = DeckCard.objects.filter(deck_id__in=list(deck_ids)).values_list("deck_id", "card__printing__name", "quantity")
+    for deck_id, name, quantity in rows.iterator():
+        quantities[deck_id][name] += quantity  # печати одной карты — одна карта
+    return {deck_id: minhash(deck_elements(cards)) for deck_id, cards in quantities.items()}
+
+
+def refresh_deck_signatures(deck_ids=None) -> dict[str, int]:
+    """Пересчитывает сигнатуры и корзины публичных колод, у которых сменилась версия
+    (или указанных), и удаляет индекс колод, ставших приватными или пустыми."""
+    public = Deck.objects.filter(is_private=False)
+    if deck_ids is None:
+        stale = public.filter(Q(signature__isnull=True) | ~Q(signature__version=F("version")))
+    else:
+        stale = public.filter(pk__in=list(deck_ids))
+    versions = dict(stale.values_list("pk", "version"))
+    signatures = compute_signatures(versions)
+    gone = DeckSignature.objects.filter(Q(deck__is_private=True) | Q(deck_id__in=set(versions) - set(signatures)))
+
+    with transaction.atomic():
+        removed, _ = DeckLSHBucket.objects.filter(
+            Q(deck_id__in=list(versions)) | Q(deck__is_private=True)
+        ).delete()
+        gone_count, _ = gone.delete()
+        DeckSignature.objects.bulk_create(
+            [DeckSignature(deck_id=pk, version=versions[pk], minhash=sig.tobytes()) for pk, sig in signatures.items()],
+            batch_size=1000, update_conflicts=True, unique_fields=["deck"], update_fields=["version", "minhash"],
+        )
+        DeckLSHBucket.objects.bulk_create(
+            [DeckLSHBucket(deck_id=pk, key=key) for pk, sig in signatures.items() for key in band_keys(sig)],
+            batch_size=5000,
+        )
+    return {"updated": len(signatures), "removed": gone_count}
+
+
+def similar_decks(deck: Deck, *, limit: int = 10, threshold: float = 0.2) -> list[tuple[Deck, float]]:
+    """Публичные колоды, похожие на deck: кандидаты из LSH-корзин, ранжирование по сигнатурам.
+    Сигнатура самой колоды считается на лету — подходит и для приватной, и для только что
+    измененной."""
+    signature = compute_signatures([deck.pk]).get(deck.pk)
+    if signature is None:
+        return []
+    candidates = (
+        DeckLSHBucket.objects.filter(key__in=band_keys(signature)).exclude(deck_id=deck.pk)
+        .values_list("deck_id", flat=True).distinct()
+    )
+    rows = list(
+        DeckSignature.objects.filter(deck_id__in=candidates, deck__is_private=False).values_list("deck_id", "minhash")
+    )
+    if not rows:
+        return []
+    scores = similarity(signature, np.stack([_from_bytes(data) for _, data in rows]))
+    ranked = sorted(
+        ((deck_id, float(score)) for (deck_id, _), score in zip(rows, scores, strict=True) if score >= threshold),
+        key=lambda item: -item[1],
+    )[:limit]
+    decks = Deck.objects.in_bulk([deck_id for deck_id, _ in ranked])
+    return [(decks[deck_id], round(score, 3)) for deck_id, score in ranked]
+
+
+def cluster_archetypes(threshold: float = ARCHETYPE_THRESHOLD) -> dict[str, int]:
+    """Архетипы — компоненты связности: колоды одной LSH-корзины объединяются, если оценка
+    сходства с первой колодой корзины не ниже threshold. Два запроса на чтение и bulk_update."""
+    signatures = {pk: _from_bytes(data) for pk, data in DeckSignature.objects.values_list("deck_id", "minhash")}
+    parent = {pk: pk for pk in signatures}
+
+    def find(pk):
+        while parent[pk] != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    buckets = defaultdict(list)
+    for key, deck_id in DeckLSHBucket.objects.values_list("key", "deck_id").iterator():
+        if deck_id in signatures:
+            buckets[key].append(deck_id)
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        head, rest = members[0], np.array(members[1:])
+        scores = similarity(signatures[head], np.stack([signatures[pk] for pk in rest]))
+        for pk in rest[scores >= threshold].tolist():
+            a, b = find(head), find(pk)
+            if a != b:
+                parent[max(a, b)] = min(a, b)  # корень — младшая колода компоненты
+
+    updates = [DeckSignature(deck_id=pk, archetype=find(pk)) for pk in signatures]
+    DeckSignature.objects.bulk_update(updates, ["archetype"], batch_size=1000)
+    return {"decks": len(updates), "archetypes": len({item.archetype for item in updates})}
@@ -0,0 +1,112 @@
+"""
+Операции над составом колоды.
+
+Количество увеличивается атомарно на стороне БД (F()), без чтения и
+записи в Python: параллельные клики "+ в колоду" не теряют обновлений.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+
+from .coverage import bump_collection_version, bump_public_decks_version
+from .models import Deck, DeckCard
+
+
+@transaction.atomic
+def add_cards_to_deck(deck: Deck, quantities: dict[int, int]) -> dict:
+    """
+    Добавляет в колоду {card_id: сколько_добавить} за одну транзакцию.
+
+    Upsert в два запроса: недостающие строки вставляются с нулем
+    (конфликты по unique (deck, card) игнорируются), затем один UPDATE
+    прибавляет количества через F(). Возвращает новые количества по
+    затронутым картам и итоги колоды.
+    """
+    card_ids = list(quantities)
+    DeckCard.objects.bulk_create(
+        [DeckCard(deck=deck, card_id=card_id, quantity=0) for card_id in card_ids],
+        ignore_conflicts=True,
+    )
+
+    # Одинаковые приращения — в одну ветку CASE, чтобы не раздувать SQL
+    by_quantity = defaultdict(list)
+    for card_id, quantity in quantities.items():
+        by_quantity[quantity].append(card_id)
+    increment = Case(
+        *(When(card_id__in=ids, then=Value(quantity)) for quantity, ids in by_quantity.items()),
+        default=Value(0),
+    )
+    entries = DeckCard.objects.filter(deck=deck, card_id__in=card_ids)
+    entries.update(quantity=F("quantity") + increment)
+    bump_deck_version(deck.pk, deck.owner_id, deck.is_private)  # bulk-операции не шлют сигналов DeckCard
+
+    return {"cards": dict(entries.values_list("card_id", "quantity")), **deck_totals(deck)}
+
+
+@transaction.atomic
+def set_deck_quantities(deck: Deck, quantities: dict[int, int]) -> dict:
+    """
+    Применяет diff из редактора: {card_id: новое_количество}, 0 — убрать.
+    Карты, которых нет в diff, не трогаются. Количества абсолютные, так что
+    повторная отправка того же diff ничего не меняет.
+    """
+    removed = [card_id for card_id, quantity in quantities.items() if quantity == 0]
+    if removed:
+        DeckCard.objects.filter(deck=deck, card_id__in=removed).delete()
+    DeckCard.objects.bulk_create(
+        [DeckCard(deck=deck, card_id=card_id, quantity=quantity) for card_id, quantity in quantities.items() if quantity],
+        update_conflicts=True,
+        unique_fields=["deck", "card"],
+        update_fields=["quantity"],
+    )
+    bump_deck_version(deck.pk, deck.owner_id, deck.is_private)
+    return deck_totals(deck)
+
+
+def deck_totals(deck: Deck) -> dict:
+    totals = DeckCard.objects.filter(deck=deck).aggregate(total_cards=Sum("quantity"), unique_cards=Count("id"))
+    return {"total_cards": totals["total_cards"] or 0, "unique_cards": totals["unique_cards"]}
+
+
+def bump_deck_version(deck_id: int, owner_id: int | None = None, is_private: bool | None = None) -> None:
+    """Состав колоды изменился: кэш аналитики по старой версии больше не читается,
+    прежний результат проверки легальности тоже. owner_id — у владельца изменилось
+    число свободных для обмена карт. Покрытие публичных колод сбрасывается, только
+    если колода публичная (is_private=None — неизвестно, сбрасываем).
+
+    Счетчики в кэше растут после коммита: иначе запрос между сбросом и коммитом
+    посчитал бы покрытие/индекс обмена по старым строкам и сохранил под новой версией."""
+    Deck.objects.filter(pk=deck_id).update(version=F("version") + 1, is_legal=None)
+    transaction.on_commit(lambda: _bump_deck_caches(owner_id, is_private))
+
+
+def _bump_deck_caches(owner_id: int | None, is_private: bool | None) -> None:
+    if not is_private:
+        bump_public_decks_version()
+    bump_collection_version(owner_id)
+
+
+# Версия в ключе: устаревший состав просто перестает читаться и истекает сам
+COMPOSITION_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def composition_cache_key(deck: Deck) -> str:
+    return f"mtg_app:deck_composition:{deck.pk}:v{deck.version}"
+
+
+def deck_composition(deck: Deck) -> dict:
+    """{"cards": {card_id: количество}, "lands": [card_id, ...]} — кэш по версии колоды."""
+    key = composition_cache_key(deck)
+    composition = cache.get(key)
+    if composition is None:
+        rows = list(DeckCard.objects.filter(deck=deck).values_list("card_id", "quantity", "card__printing__type_line"))
+        composition = {
+            "cards": {card_id: quantity for card_id, quantity, _ in rows},
+            "lands": [card_id for card_id, _, type_line in rows if "Land" in type_line],
+        }
+        cache.set(key, composition, COMPOSITION_CACHE_TIMEOUT)
+    return composition
@@ -0,0 +1,39 @@
+"""
+Декораторы для async-view.
+
+В Django 4.2 login_required и require_POST оборачивают view синхронной
+функцией, и под ASGI корутина из async-view до обработчика не доходит.
+Здесь их async-аналоги с тем же поведением.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseNotAllowed
+
+
+def _load_user(request):
+    # request.user ленивый: сессия и пользователь читаются из БД при первом
+    # обращении, поэтому первый раз — в потоке. Дальше объект закэширован.
+    return request.user.is_authenticated
+
+
+def async_login_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not await sync_to_async(_load_user)(request):
+            return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_require_POST(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != "POST":
+            return HttpResponseNotAllowed(["POST"])
+        return await view(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,125 @@
+"""
+Фасеты списка карт: сколько записей текущей выборки в каждом сете, редкости,
+цвете, корзине CMC и типе.
+
+Вместо COUNT на каждое значение — два запроса на всю выборку: условные
+агрегаты одной строкой (цвета, CMC, типы — фиксированные наборы значений) и
+группировка по (сет, редкость). Результат кэшируется по нормализованному
+ключу фильтра (порядок параметров, пустые значения, пробелы и сортировка не
+влияют) и версиям данных: счетчику записей коллекций (растет по сигналам
+Card) и версии каталога печатей.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .filters import COLOR_CHOICES
+from .fuzzy import INDEX_VERSION_KEY
+from .search import RARITIES
+
+FACETS_CACHE_TIMEOUT = 10 * 60  # цены (usd>5 в запросе) меняются без смены версий
+CARDS_VERSION_KEY = "mtg_app:cards_version"
+SET_FACET_LIMIT = 15
+
+# (подпись, значение параметра cmc, условие)
+CMC_BUCKETS = (
+    *((str(n), str(n), Q(printing__cmc=n)) for n in range(7)),
+    ("7+", ">=7", Q(printing__cmc__gte=7)),
+)
+CARD_TYPES = ("Creature", "Instant", "Sorcery", "Artifact", "Enchantment", "Planeswalker", "Land", "Battle")
+
+
+def bump_cards_version() -> None:
+    cache.add(CARDS_VERSION_KEY, 0, timeout=None)
+    try:
+        cache.incr(CARDS_VERSION_KEY)
+    except ValueError:
+        cache.set(CARDS_VERSION_KEY, 1, timeout=None)
+
+
+def filter_key(params, names) -> str:
+    """Нормализованный ключ фильтра: только параметры фильтра, без пустых, значения по порядку."""
+    items = []
+    for name in sorted(names):
+        values = sorted({" ".join(value.split()) for value in params.getlist(name)} - {""})
+        if values:
+            items.append([name, values])
+    return hashlib.md5(json.dumps(items, ensure_ascii=False).encode()).hexdigest()
+
+
+def _color_filter(code: str) -> Q:
+    # Как CardFilter.filter_by_colors
+    return Q(printing__colors="") if code == "C" else Q(printing__colors__icontains=code)
+
+
+def compute_facets(queryset) -> dict:
+    """Счетчики записей выборки по значениям фасетов; пустые значения опускаются."""
+    queryset = queryset.order_by()
+    aggregates = {
+        **{f"color_{code}": Count("pk", filter=_color_filter(code)) for code, _ in COLOR_CHOICES},
+        **{f"cmc_{i}": Count("pk", filter=q) for i, (_, _, q) in enumerate(CMC_BUCKETS)},
+        **{f"type_{name}": Count("pk", filter=Q(printing__type_line__icontains=name)) for name in CARD_TYPES},
+    }
+    totals = queryset.aggregate(**aggregates)
+
+    sets, rarities = {}, defaultdict(int)
+    for set_id, code, name, rarity, count in (
+        queryset.values_list("printing__set_id", "printing__set__code", "printing__set__name", "printing__rarity")
+        .annotate(n=Count("pk"))
+    ):
+        sets.setdefault(set_id, [code, name, 0])[2] += count
+        rarities[rarity] += count
+
+    order = {rarity: i for i, rarity in enumerate(RARITIES)}
+    return {
+        "set": sorted(([pk, code, name, n] for pk, (code, name, n) in sets.items()), key=lambda s: (-s[3], s[2])),
+        "rarity": sorted(([r, n] for r, n in rarities.items()), key=lambda r: (order.get(r[0], len(order)), r[0])),
+        "color": [[code, label, totals[f"color_{code}"]] for code, label in COLOR_CHOICES if totals[f"color_{code}"]],
+        "cmc": [[label, value, totals[f"cmc_{i}"]] for i, (label, value, _) in enumerate(CMC_BUCKETS)
+                if totals[f"cmc_{i}"]],
+        "type": [[name, totals[f"type_{name}"]] for name in CARD_TYPES if totals[f"type_{name}"]],
+    }
+
+
+def _link(params, name: str, value: str) -> dict:
+    query = params.copy()
+    if name == "q":  # тип — дополнительный терм запроса
+        query["q"] = f"{params.get('q', '').strip()} {value}".strip()
+        active = False
+    elif name == "colors":
+        query.setlist("colors", [value])
+        active = value in params.getlist("colors")
+    else:
+        query[name] = value
+        active = params.get(name) == value
+    return {"query": query.urlencode(), "active": active}
+
+
+def card_facets(queryset, params, filter_names) -> list[dict]:
+    """Фасеты для боковой панели: [{"title", "items": [{"label", "count", "query", "active"}]}].
+    queryset — уже отфильтрованная выборка, params — request.GET."""
+    versions = cache.get_many([CARDS_VERSION_KEY, INDEX_VERSION_KEY])
+    key = "mtg_app:card_facets:{}:c{}:p{}".format(
+        filter_key(params, filter_names), versions.get(CARDS_VERSION_KEY, 0), versions.get(INDEX_VERSION_KEY, 0)
+    )
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset)
+        cache.set(key, facets, FACETS_CACHE_TIMEOUT)
+
+    def items(name, values):
+        return [{"label": label, "count": count, **_link(params, name, value)} for label, value, count in values]
+
+    return [group for group in [
+        {"title": "Сет", "items": items("set", [(f"{name} ({code.upper()})", str(pk), n)
+                                              for pk, code, name, n in facets["set"][:SET_FACET_LIMIT]])},
+        {"title": "Редкость", "items": items("rarity", [(r, r, n) for r, n in facets["rarity"]])},
+        {"title": "Цвет", "items": items("colors", [(label, code, n) for code, label, n in facets["color"]])},
+        {"title": "CMC", "items": items("cmc", facets["cmc"])},
+        {"title": "Тип", "items": items("q", [(name, f"t:{name.lower()}", n) for name, n in facets["type"]])},
+    ] if group["items"]]
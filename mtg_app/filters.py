@@ -1,13 +1,81 @@
+import re
+
 import django_filters
 from django import forms
 from django.db import models
-from .models import Card, Set
+from .models import Card, Printing, Set
+from .search import SearchSyntaxError, compile_query, parse_query
+
+COLOR_CHOICES = (
+    ('W', 'White'), ('U', 'Blue'), ('B', 'Black'),
+    ('R', 'Red'), ('G', 'Green'), ('C', 'Colorless'),
+)
+CMC_RE = re.compile(r"^(?:(<=|>=|<|>|=)?(\d+(?:\.\d+)?)|(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?))$")
+CMC_LOOKUPS = {"": "exact", "=": "exact", "<": "lt", "<=": "lte", ">": "gt", ">=": "gte"}
+
+
+class CmcRangeField(forms.CharField):
+    """"3", "<=3", ">2", "2-4" -> условия для printing__cmc (индекс printing_cmc_name_idx)."""
+
+    def clean(self, value):
+        value = "".join((super().clean(value) or "").split())
+        if not value:
+            return None
+        match = CMC_RE.match(value)
+        if not match:
+            raise forms.ValidationError("Например: 3, <=3, >2 или 2-4.")
+        op, number, low, high = match.groups()
+        if number is not None:
+            return {f"printing__cmc__{CMC_LOOKUPS[op or '']}": float(number)}
+        return {"printing__cmc__gte": float(low), "printing__cmc__lte": float(high)}
+
+
+class CmcRangeFilter(django_filters.Filter):
+    field_class = CmcRangeField
+
+    def filter(self, qs, value):
+        return qs.filter(**value) if value else qs
+
+
+class SearchQueryField(forms.CharField):
+    """Строка запроса в стиле Scryfall -> дерево search.parse_query (синтаксис проверяется здесь)."""
+
+    def clean(self, value):
+        value = (super().clean(value) or "").strip()
+        if not value:
+            return None
+        try:
+            return parse_query(value)
+        except SearchSyntaxError as e:
+            raise forms.ValidationError(str(e)) from None
+
+
+class SearchQueryFilter(django_filters.Filter):
+    field_class = SearchQueryField
+
+    def filter(self, qs, value):
+        return qs.filter(compile_query(value, prefix='printing__').q) if value is not None else qs
+
+
+def pip_filter(color: str) -> django_filters.NumberFilter:
+    return django_filters.NumberFilter(
+        field_name=f'printing__pips_{color.lower()}',
+        lookup_expr='gte',
+        label=f'Символов {color} не меньше',
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'min': 0, 'placeholder': color}),
+    )
 
 class CardFilter(django_filters.FilterSet):
     
+    # 0. Запрос в стиле Scryfall: t:creature c<=ub cmc<=3 o:deathtouch r:mythic s:thb usd>5
+    q = SearchQueryFilter(
+        label='Поиск',
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 't:creature c<=ub cmc<=3'})
+    )
+
     # 1. Поиск по названию (Select2)
     name_search = django_filters.ModelChoiceFilter(
-        queryset=Card.objects.all().order_by('name'),
+        queryset=Printing.objects.all().order_by('name'),
         label='Название карты (быстрый поиск)',
         # --- ИСПРАВЛЕНИЕ 1: Добавляем 'method' ---
         method='filter_by_selected_card', 
@@ -20,7 +88,7 @@ class CardFilter(django_filters.FilterSet):
     
     # 2. Поиск по тексту карты
     oracle_text = django_filters.CharFilter(
-        field_name='oracle_text',
+        field_name='printing__oracle_text',
         lookup_expr='icontains', 
         label='Текст карты (напр. "Deathtouch")',
         # --- ИСПРАВЛЕНИЕ 2: Добавляем 'attrs' ---
@@ -30,27 +98,45 @@ class CardFilter(django_filters.FilterSet):
     # 3. Фильтр по цветам (Чекбоксы)
     colors = django_filters.MultipleChoiceFilter(
         label='Цвет',
-        choices=(
-            ('W', 'White'), ('U', 'Blue'), ('B', 'Black'),
-            ('R', 'Red'), ('G', 'Green'), ('C', 'Colorless'),
-        ),
+        choices=COLOR_CHOICES,
         # Виджет для чекбоксов уже стилизован в HTML
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
         method='filter_by_colors'
     )
 
-    # 4. Фильтр по CMC
-    cmc = django_filters.NumberFilter(
-        field_name='cmc', 
-        lookup_expr='exact', 
+    # 4. Фильтр по CMC: точное значение или диапазон
+    cmc = CmcRangeFilter(
         label='Мана-стоимость (CMC)',
-        # --- ИСПРАВЛЕНИЕ 2: Добавляем 'attrs' ---
-        widget=forms.NumberInput(attrs={'class': 'form-control'})
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': '3, <=3, >2, 2-4'})
+    )
+
+    # Минимум цветных символов в мана-стоимости (колонки Printing.pips_*)
+    pips_w = pip_filter('W')
+    pips_u = pip_filter('U')
+    pips_b = pip_filter('B')
+    pips_r = pip_filter('R')
+    pips_g = pip_filter('G')
+
+    # 5. Сет и редкость — поля печати (каталога)
+    set = django_filters.ModelChoiceFilter(
+        field_name='printing__set',
+        queryset=Set.objects.all().order_by('name'),
+        label='Сет',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    rarity = django_filters.ChoiceFilter(
+        field_name='printing__rarity',
+        label='Редкость',
+        choices=lambda: [
+            (r, r) for r in Printing.objects.order_by('rarity').values_list('rarity', flat=True).distinct()
+        ],
+        widget=forms.Select(attrs={'class': 'form-select'}),
     )
 
     class Meta:
         model = Card
-        fields = ['name_search', 'oracle_text', 'set', 'rarity', 'cmc', 'colors']
+        fields = ['q', 'name_search', 'oracle_text', 'set', 'rarity', 'cmc', 'pips_w', 'pips_u', 'pips_b', 'pips_r',
+                  'pips_g', 'colors']
 
         # --- ИСПРАВЛЕНИЕ 2: Добавляем 'attrs' для 'set' и 'rarity' ---
         filter_overrides = {
@@ -71,19 +157,19 @@ class CardFilter(django_filters.FilterSet):
 
     # --- ИСПРАВЛЕНИЕ 1: Наша "умная" функция фильтрации ---
     def filter_by_selected_card(self, queryset, name, value):
-        # 'value' - это объект Card, который выбрал пользователь.
-        # Мы просто фильтруем по его ID (pk).
+        # 'value' - это печать (Printing), которую выбрал пользователь:
+        # показываем записи коллекции с этой печатью
         if value:
-            return queryset.filter(pk=value.pk)
+            return queryset.filter(printing=value)
         return queryset
 
     def filter_by_colors(self, queryset, name, value):
         if 'C' in value:
-             queryset = queryset.filter(colors__exact='')
+             queryset = queryset.filter(printing__colors__exact='')
              return queryset
         
         q_objects = models.Q()
         for color in value:
-            q_objects |= models.Q(colors__icontains=color)
+            q_objects |= models.Q(printing__colors__icontains=color)
         
         return queryset.filter(q_objects)
\ No newline at end of file
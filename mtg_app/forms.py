@@ -1,8 +1,11 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.db.models import Q
 from django.forms import inlineformset_factory # Важный импорт
-from .models import Card, Deck, DeckCard # Важный импорт
+from django.urls import reverse_lazy
+from .fuzzy import suggest_card_names
+from .models import Card, Deck, DeckCard, Printing, WishlistItem # Важный импорт
 
 class CustomUserCreationForm(UserCreationForm):
     email = forms.EmailField(required=True, help_text="Введите действующий email.")
@@ -11,19 +14,48 @@ class CustomUserCreationForm(UserCreationForm):
         fields = ("username", "email", "password1", "password2")
 
 class CardForm(forms.ModelForm):
+    """Запись своей коллекции. Владельца ставит view (form.instance.owner) до валидации."""
+
     class Meta:
         model = Card
-        fields = '__all__'
+        fields = [
+            'printing', 'foil', 'quantity', 'purchase_price', 'purchase_price_currency', 'language', 'condition',
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Печати подгружает Select2 (mtg_app:card_autocomplete); в разметке — только выбранная
+        field = self.fields['printing']
+        field.queryset = Printing.objects.select_related('set')
+        field.widget = CardAutocompleteSelect(
+            attrs={'data-autocomplete-url': reverse_lazy('mtg_app:card_autocomplete')}
+        )
+        value = self.data.get(self.add_prefix('printing'), '') if self.is_bound else ''
+        printing = field.queryset.filter(pk=value).first() if str(value).isdigit() else None
+        field.widget.choices = [("", field.empty_label)] + (
+            [(printing.pk, printing_choice_label(printing))] if printing else []
+        )
+
+    def clean_printing(self):
+        # owner не поле формы — уникальность (owner, printing) ModelForm сама не проверит
+        printing = self.cleaned_data['printing']
+        owner_id = self.instance.owner_id
+        if owner_id is not None and (
+            Card.objects.filter(owner_id=owner_id, printing=printing).exclude(pk=self.instance.pk).exists()
+        ):
+            raise forms.ValidationError("Эта печать уже есть в вашей коллекции — измените количество в ней.")
+        return printing
 
 # --- ЭТО ФОРМА ДЛЯ САМОЙ КОЛОДЫ ---
 class DeckForm(forms.ModelForm):
     class Meta:
         model = Deck
         # В этой форме НЕ ДОЛЖНО быть поля 'cards'
-        fields = ['name', 'description', 'is_private']
+        fields = ['name', 'description', 'format', 'is_private']
         labels = {
             'name': 'Название колоды',
             'description': 'Описание',
+            'format': 'Формат',
             'is_private': 'Приватная (видна только вам)',
         }
         widgets = {
@@ -31,16 +63,87 @@ class DeckForm(forms.ModelForm):
             'is_private': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
+    def save(self, commit=True):
+        # Проверка легальности была для прежнего формата
+        if 'format' in self.changed_data:
+            self.instance.is_legal = None
+        return super().save(commit)
+
+def printing_choice_label(printing) -> str:
+    return f"{printing.name} ({printing.set.code.upper()})" if printing.set else printing.name
+
+
+def card_choice_label(card) -> str:
+    """Подпись карты в редакторе колоды (и в ответе автокомплита)."""
+    return printing_choice_label(card.printing)
+
+
+class CardAutocompleteSelect(forms.Select):
+    """
+    <select> только с выбранной картой: остальные варианты Select2 подгружает
+    по ajax (mtg_app:deck_card_autocomplete или data-autocomplete-url). Размер
+    страницы не зависит от размера коллекции/каталога.
+    """
+
+    def __init__(self, attrs=None):
+        super().__init__(attrs={"class": "card-autocomplete", **(attrs or {})})
+
+
+class DeckCardForm(forms.ModelForm):
+    def __init__(self, *args, owner=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Валидация — по картам коллекции владельца колоды (уже добавленная строка остается
+        # допустимой); в разметку — только выбранная
+        field = self.fields['card']
+        field.queryset = Card.objects.select_related('printing__set').filter(
+            Q(owner=owner) | Q(pk=self.instance.card_id) if owner is not None else Q(pk__in=[])
+        )
+        card = self._selected_card()
+        field.widget.choices = [("", field.empty_label)] + ([(card.pk, card_choice_label(card))] if card else [])
+
+    def _selected_card(self):
+        if self.is_bound:
+            value = self.data.get(self.add_prefix('card'), '')
+            # Ошибочная отправка: один запрос на строку, только при перерисовке
+            return self.fields['card'].queryset.filter(pk=value).first() if value.isdigit() else None
+        # card уже подгружена select_related'ом формсета
+        return self.instance.card if self.instance.card_id else None
+
+
+class BaseDeckCardFormSet(forms.BaseInlineFormSet):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('queryset', DeckCard.objects.select_related('card__printing__set'))
+        super().__init__(*args, **kwargs)
+
+
 # --- ЭТО ФОРМСЕТ ДЛЯ СПИСКА КАРТ В КОЛОДЕ ---
 # (Он был сломан из-за мусора в файле)
 DeckCardFormSet = inlineformset_factory(
     parent_model=Deck,    # Главная модель
     model=DeckCard,       # Модель связи
+    form=DeckCardForm,
+    formset=BaseDeckCardFormSet,
     fields=['card', 'quantity'], # Поля, которые мы редактируем
     extra=0,              # Не показывать пустые строки по умолчанию
     can_delete=True,
     widgets={
+        'card': CardAutocompleteSelect(),
         # Задаем стиль по умолчанию для поля количества
         'quantity': forms.NumberInput(attrs={'value': 1, 'min': 1}),
     }
-)
\ No newline at end of file
+)
+
+
+class WishlistItemForm(forms.ModelForm):
+    class Meta:
+        model = WishlistItem
+        fields = ['name', 'quantity']
+        labels = {'name': 'Карта', 'quantity': 'Сколько'}
+
+    def clean_name(self):
+        name = self.cleaned_data['name'].strip()
+        if not Printing.objects.filter(name=name).exists():
+            suggestions = ", ".join(c.name for c in suggest_card_names(name, limit=3))
+            hint = f" Возможно, вы имели в виду: {suggestions}." if suggestions else ""
+            raise forms.ValidationError(f"Карты «{name}» нет в каталоге.{hint}")
+        return name
@@ -0,0 +1,159 @@
+# mtg_app/fuzzy.py
+"""
+Нечеткий поиск карт по названию (триграммный индекс в памяти процесса).
+
+Индекс строится по каталогу печатей один раз на процесс и перестраивается,
+когда в кэше меняется версия (её увеличивают сигналы при изменении печатей).
+"""
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+
+import numpy as np
+from django.core.cache import cache
+
+INDEX_VERSION_KEY = "mtg_app:card_names_version"
+DEFAULT_THRESHOLD = 0.3  # как у pg_trgm
+
+_APOSTROPHES_RE = re.compile(r"[’'`´]")
+_NON_ALNUM_RE = re.compile(r"[^\w]+|_")
+
+
+def normalize_name(name: str) -> str:
+    """Приводит название к виду для сравнения: регистр, диакритика, пунктуация."""
+    text = unicodedata.normalize("NFKD", (name or "").casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _APOSTROPHES_RE.sub("", text)
+    text = _NON_ALNUM_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def trigrams(normalized: str) -> set[str]:
+    """Триграммы в стиле pg_trgm: каждое слово дополняется пробелами."""
+    result = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            result.add(padded[i : i + 3])
+    return result
+
+
+@dataclass(frozen=True)
+class NameCandidate:
+    name: str
+    printing_ids: tuple[int, ...]
+    score: float
+
+
+class CardNameIndex:
+    """Триграммный индекс по уникальным (нормализованным) названиям печатей."""
+
+    def __init__(self, rows):
+        names: list[str] = []
+        ids: list[list[int]] = []
+        by_key: dict[str, int] = {}
+
+        for printing_id, name in rows:
+            # Для split/DFC карт ("Fire // Ice") индексируем и лицевые стороны
+            variants = [name] + [part for part in name.split("//") if "//" in name]
+            for variant in variants:
+                key = normalize_name(variant)
+                if not key:
+                    continue
+                pos = by_key.get(key)
+                if pos is None:
+                    pos = by_key[key] = len(names)
+                    names.append(name)
+                    ids.append([])
+                if printing_id not in ids[pos]:
+                    ids[pos].append(printing_id)
+
+        postings: dict[str, list[int]] = {}
+        sizes = np.zeros(len(names), dtype=np.int32)
+        for key, pos in by_key.items():
+            grams = trigrams(key)
+            sizes[pos] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(pos)
+
+        self._names = names
+        self._ids = [tuple(printing_ids) for printing_ids in ids]
+        self._by_key = by_key
+        self._sizes = sizes
+        self._postings = {g: np.asarray(p, dtype=np.int32) for g, p in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def search(self, query: str, limit: int = 5, threshold: float = DEFAULT_THRESHOLD):
+        """Возвращает кандидатов, отсортированных по убыванию сходства."""
+        key = normalize_name(query)
+        if not key or not self._names:
+            return []
+
+        exact = self._by_key.get(key)
+        if exact is not None:
+            return [NameCandidate(self._names[exact], self._ids[exact], 1.0)]
+
+        grams = trigrams(key)
+        hits = [self._postings[g] for g in grams if g in self._postings]
+        if not hits:
+            return []
+
+        shared = np.bincount(np.concatenate(hits), minlength=len(self._names))
+        matched = np.flatnonzero(shared)
+        inter = shared[matched]
+        scores = inter / (len(grams) + self._sizes[matched] - inter)
+
+        keep = scores >= threshold
+        matched, scores = matched[keep], scores[keep]
+        if not len(matched):
+            return []
+
+        if len(matched) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            matched, scores = matched[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+
+        return [
+            NameCandidate(self._names[pos], self._ids[pos], round(float(score), 3))
+            for pos, score in zip(matched[order], scores[order], strict=True)
+        ]
+
+
+# --- Индекс на процесс ---
+_index: CardNameIndex | None = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def bump_index_version() -> None:
+    """Помечает индекс устаревшим во всех процессах."""
+    cache.add(INDEX_VERSION_KEY, 0, timeout=None)
+    try:
+        cache.incr(INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(INDEX_VERSION_KEY, 1, timeout=None)
+
+
+def get_card_name_index() -> CardNameIndex:
+    global _index, _index_version
+    from mtg_app.models import Printing
+
+    version = cache.get(INDEX_VERSION_KEY, 0)
+    if _index is not None and _index_version == version:
+        return _index
+
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = CardNameIndex(Printing.objects.values_list("id", "name").iterator())
+            _index_version = version
+    return _index
+
+
+def suggest_card_names(query: str, limit: int = 5, threshold: float = DEFAULT_THRESHOLD):
+    """"Возможно, вы имели в виду": ранжированные кандидаты по названию."""
+    return get_card_name_index().search(query, limit=limit, threshold=threshold)
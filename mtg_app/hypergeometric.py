@@ -0,0 +1,87 @@
+"""
+Точные вероятности добора (многомерное гипергеометрическое распределение).
+
+Вопрос вида "хотя бы 2 из этих 8 карт и хотя бы 3 земли в верхних 10"
+сводится к произведению многочленов: для категории i коэффициент при x^k —
+число способов взять k ее карт (C(K_i, k), если k в допустимых границах,
+иначе 0); остаток колоды берется без ограничений. Коэффициент при x^d
+произведения, деленный на C(N, d), — ответ для d карт, так что одна
+свертка дает сразу всю таблицу по ходам.
+
+Биномиальные коэффициенты считаются в лог-пространстве по общей таблице
+log(n!), каждый многочлен масштабируется на свой максимум, так что
+переполнения нет и для колод на сотни карт. Результаты мемоизированы.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+_log_factorial = np.zeros(1)
+
+
+def log_factorials(n: int) -> np.ndarray:
+    """log(k!) для k = 0..n; таблица растет по мере надобности и переиспользуется."""
+    global _log_factorial
+    if len(_log_factorial) <= n:
+        size = max(n + 1, 2 * len(_log_factorial))
+        _log_factorial = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, size)))])
+    return _log_factorial
+
+
+def log_comb(n: int, k: np.ndarray) -> np.ndarray:
+    """log C(n, k) поэлементно; -inf вне 0..n."""
+    table = log_factorials(n)
+    k = np.asarray(k)
+    valid = (k >= 0) & (k <= n)
+    safe = np.where(valid, k, 0)
+    return np.where(valid, table[n] - table[safe] - table[n - safe], -np.inf)
+
+
+@dataclass(frozen=True)
+class Category:
+    size: int                  # сколько таких карт в колоде
+    at_least: int = 1
+    at_most: int | None = None
+
+
+@lru_cache(maxsize=4096)
+def _probabilities(population: int, categories: tuple[Category, ...], max_draws: int) -> tuple[float, ...]:
+    rest = population - sum(category.size for category in categories)
+    if rest < 0:
+        raise ValueError("Категории больше колоды.")
+    ks = np.arange(max_draws + 1)
+
+    log_total = np.zeros(max_draws + 1)  # лог-масштаб произведения
+    product = np.zeros(max_draws + 1)
+    product[0] = 1.0
+    factors = [(rest, 0, None)] + [(c.size, c.at_least, c.at_most) for c in categories]
+    for size, at_least, at_most in factors:
+        terms = log_comb(size, ks)
+        upper = size if at_most is None else at_most
+        terms = np.where((ks >= at_least) & (ks <= upper), terms, -np.inf)
+        if np.isneginf(terms).all():
+            return (0.0,) * (max_draws + 1)
+        scale = terms.max()
+        product = np.convolve(product, np.exp(terms - scale))[: max_draws + 1]
+        log_total += scale
+
+    with np.errstate(divide="ignore"):
+        log_ways = np.log(product) + log_total
+    probabilities = np.exp(log_ways - log_comb(population, ks))
+    return tuple(float(p) for p in np.clip(np.nan_to_num(probabilities), 0.0, 1.0))
+
+
+def probability_table(population: int, categories, draws) -> dict[int, float]:
+    """{d: P(все условия выполнены среди d верхних карт)} для каждого d из draws."""
+    draws = sorted(set(draws))
+    if not draws or draws[0] < 0 or draws[-1] > population:
+        raise ValueError(f"Число карт должно быть от 0 до {population}.")
+    table = _probabilities(population, tuple(categories), draws[-1])
+    return {d: table[d] for d in draws}
+
+
+def probability(population: int, categories, draws: int) -> float:
+    return probability_table(population, categories, [draws])[draws]
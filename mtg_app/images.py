@@ -0,0 +1,67 @@
+"""
+URL картинок карт пачкой, с кэшем на запись коллекции.
+
+Промахи кэша добираются одним запросом. Запись кэша сбрасывается
+сигналами, когда у печати меняется image_url (или у записи — печать),
+так что в кэше всегда версия, соответствующая текущей картинке.
+"""
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Card
+
+IMAGE_CACHE_TIMEOUT = 60 * 60 * 24
+# Поднять при изменении формата ответа: старые записи перестанут читаться
+IMAGE_CACHE_FORMAT = 1
+
+# Размеры, в которых Scryfall отдает картинки: .../{size}/front/...
+SCRYFALL_IMAGE_HOST = "cards.scryfall.io"
+IMAGE_VARIANTS = ("small", "normal", "large")
+
+
+def image_cache_key(card_id: int) -> str:
+    return f"mtg_app:card_image:v{IMAGE_CACHE_FORMAT}:{card_id}"
+
+
+def image_variants(image_url: str) -> dict | None:
+    """{"url", "small", "normal", "large"} для значения Printing.image_url."""
+    if not image_url:
+        return None
+    if not image_url.startswith(("http", "/")):
+        image_url = f"{settings.MEDIA_URL}{image_url}"
+
+    parts = image_url.split("/")
+    if SCRYFALL_IMAGE_HOST in image_url and len(parts) > 3 and parts[3] in IMAGE_VARIANTS:
+        variants = {size: "/".join([*parts[:3], size, *parts[4:]]) for size in IMAGE_VARIANTS}
+    else:
+        # Локальный файл скачивается в одном размере (large) — он же превью
+        variants = dict.fromkeys(IMAGE_VARIANTS, image_url)
+    return {"url": image_url, **variants}
+
+
+def card_image_urls(card_ids) -> dict[int, dict | None]:
+    """{card_id: варианты или None}; несуществующие id в ответ не попадают."""
+    card_ids = list(dict.fromkeys(card_ids))
+    keys = {image_cache_key(card_id): card_id for card_id in card_ids}
+    cached = cache.get_many(keys)
+    result = {keys[key]: value["images"] for key, value in cached.items()}
+
+    missing = [card_id for card_id in card_ids if card_id not in result]
+    if missing:
+        fresh = {
+            card_id: image_variants(image_url)
+            for card_id, image_url in Card.objects.filter(pk__in=missing).values_list("pk", "printing__image_url")
+        }
+        # Обертка {"images": ...}: иначе "нет картинки" (None) не отличить от промаха
+        cache.set_many(
+            {image_cache_key(card_id): {"images": images} for card_id, images in fresh.items()},
+            IMAGE_CACHE_TIMEOUT,
+        )
+        result.update(fresh)
+    return result
+
+
+def invalidate_card_images(card_ids) -> None:
+    cache.delete_many([image_cache_key(card_id) for card_id in card_ids])
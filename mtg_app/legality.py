@@ -0,0 +1,131 @@
+"""
+Легальность колод в форматах.
+
+У печати две битовые маски по FORMATS (models.py): где карта легальна и где
+ограничена одной копией, — заполняются из поля "legalities" Scryfall при
+импорте и обновлении цен. Проверка колоды — один запрос по DeckCard и один
+проход по строкам: размер колоды, лимит копий по названию (печати одной
+карты складываются), легальность и ограничения — проверкой бита.
+
+validate_decks работает сразу для любого числа колод, так что после смены
+банлиста все публичные колоды перепроверяются одной задачей
+(refresh_deck_legality), без цикла с запросами по колодам.
+"""
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+
+from .models import FORMATS, Deck, DeckCard, format_bit
+
+
+@dataclass(frozen=True)
+class FormatRules:
+    min_cards: int = 60
+    max_cards: int | None = None
+    max_copies: int = 4
+
+
+SINGLETON_100 = FormatRules(min_cards=100, max_cards=100, max_copies=1)
+FORMAT_RULES = {
+    "commander": SINGLETON_100,
+    "paupercommander": SINGLETON_100,
+    "duel": SINGLETON_100,
+    "predh": SINGLETON_100,
+    "brawl": SINGLETON_100,
+    "gladiator": SINGLETON_100,
+    "standardbrawl": FormatRules(min_cards=60, max_cards=60, max_copies=1),
+    "oathbreaker": FormatRules(min_cards=60, max_cards=60, max_copies=1),
+}
+DEFAULT_RULES = FormatRules()
+
+# "A deck can have any number of cards named ..." / "... up to seven cards named ..."
+ANY_NUMBER_RE = re.compile(r"any number of cards named", re.IGNORECASE)
+UP_TO_RE = re.compile(r"up to (\w+) cards named", re.IGNORECASE)
+NUMBER_WORDS = {"two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+
+
+def legality_bits(legalities: dict | None) -> tuple[int | None, int]:
+    """{"modern": "legal", "vintage": "restricted", ...} -> (legal_formats, restricted_formats)."""
+    if not legalities:
+        return None, 0
+    legal = restricted = 0
+    for index, name in enumerate(FORMATS):
+        status = legalities.get(name)
+        if status in ("legal", "restricted"):
+            legal |= 1 << index
+        if status == "restricted":
+            restricted |= 1 << index
+    return legal, restricted
+
+
+def copy_limit(type_line: str, oracle_text: str, default: int) -> int | None:
+    """Сколько копий карты можно положить; None — без ограничений."""
+    if ("Basic" in type_line and "Land" in type_line) or ANY_NUMBER_RE.search(oracle_text):
+        return None
+    match = UP_TO_RE.search(oracle_text)
+    if match:
+        return NUMBER_WORDS.get(match.group(1).lower(), default)
+    return default
+
+
+def validate_decks(deck_ids) -> dict[int, list[str]]:
+    """{deck_id: [нарушения]} — пустой список у легальных колод и колод без формата."""
+    formats = dict(Deck.objects.filter(pk__in=list(deck_ids)).values_list("pk", "format"))
+    rows = DeckCard.objects.filter(deck_id__in=[pk for pk, name in formats.items() if name]).values_list(
+        "deck_id", "quantity", "card__printing__name", "card__printing__type_line",
+        "card__printing__oracle_text", "card__printing__legal_formats", "card__printing__restricted_formats",
+    )
+
+    totals = defaultdict(int)
+    copies = defaultdict(int)          # (deck_id, название) -> копий всех печатей
+    cards = {}                         # (deck_id, название) -> (type_line, oracle, legal, restricted)
+    for deck_id, quantity, name, type_line, oracle_text, legal, restricted in rows.iterator():
+        totals[deck_id] += quantity
+        copies[deck_id, name] += quantity
+        known = cards.get((deck_id, name))
+        # Печати одной карты легальны одинаково; неизвестная легальность не перекрывает известную
+        if known is None or known[2] is None:
+            cards[deck_id, name] = (type_line, oracle_text, legal, restricted)
+
+    issues = {pk: [] for pk in formats}
+    for pk, format_name in formats.items():
+        if not format_name:
+            continue
+        rules = FORMAT_RULES.get(format_name, DEFAULT_RULES)
+        if totals[pk] < rules.min_cards:
+            issues[pk].append(f"Карт в колоде: {totals[pk]}, нужно не меньше {rules.min_cards}.")
+        if rules.max_cards is not None and totals[pk] > rules.max_cards:
+            issues[pk].append(f"Карт в колоде: {totals[pk]}, можно не больше {rules.max_cards}.")
+
+    for (pk, name), (type_line, oracle_text, legal, restricted) in sorted(cards.items()):
+        format_name = formats[pk]
+        rules = FORMAT_RULES.get(format_name, DEFAULT_RULES)
+        bit = format_bit(format_name)
+        if legal is None:
+            issues[pk].append(f"«{name}»: легальность неизвестна (нет данных каталога).")
+            continue
+        if not legal & bit:
+            issues[pk].append(f"«{name}» запрещена или не легальна в формате {format_name}.")
+            continue
+        limit = 1 if restricted & bit else copy_limit(type_line, oracle_text, rules.max_copies)
+        if limit is not None and copies[pk, name] > limit:
+            issues[pk].append(f"«{name}»: копий {copies[pk, name]}, можно не больше {limit}.")
+    return issues
+
+
+def validate_deck(deck: Deck) -> list[str]:
+    return validate_decks([deck.pk])[deck.pk]
+
+
+def refresh_deck_legality(deck_ids=None) -> dict[str, int]:
+    """Пересчитывает Deck.is_legal (по умолчанию — всех публичных колод с форматом) пачкой."""
+    if deck_ids is None:
+        deck_ids = Deck.objects.filter(is_private=False).exclude(format="").values_list("pk", flat=True)
+    issues = validate_decks(deck_ids)
+    legal = [pk for pk, found in issues.items() if not found]
+    illegal = [pk for pk, found in issues.items() if found]
+    Deck.objects.filter(pk__in=legal).exclude(format="").update(is_legal=True)
+    Deck.objects.filter(pk__in=illegal).update(is_legal=False)
+    return {"legal": len(legal), "illegal": len(illegal)}
@@ -0,0 +1,50 @@
+"""
+Разбор мана-стоимости ("{2}{U}{U}") в числовые колонки печати.
+
+Каждый цветной символ засчитывается своему цвету: гибридный {W/U} — обоим
+(как в аналитике колод), фирексийский {U/P} и {2/W} — своему цвету.
+X/Y/Z считаются отдельно, {C} — бесцветный символ, число — общая (generic)
+часть. У карт с несколькими сторонами ("{1}{R} // {2}{U}") стороны
+складываются. Колонки индексированы, так что "не меньше 2 синих символов"
+— обычный диапазонный запрос.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import asdict, dataclass
+
+SYMBOL_RE = re.compile(r"\{([^}]+)\}")
+PIP_COLORS = "WUBRGC"
+
+# Поля Printing, которые заполняются из mana_cost (см. Printing.save)
+MANA_FIELDS = ("pips_w", "pips_u", "pips_b", "pips_r", "pips_g", "pips_c", "generic_mana", "x_count")
+
+
+@dataclass(frozen=True)
+class ManaCost:
+    pips_w: int = 0
+    pips_u: int = 0
+    pips_b: int = 0
+    pips_r: int = 0
+    pips_g: int = 0
+    pips_c: int = 0
+    generic_mana: int = 0
+    x_count: int = 0
+
+    def as_fields(self) -> dict[str, int]:
+        return asdict(self)
+
+
+def parse_mana_cost(mana_cost: str) -> ManaCost:
+    counts = dict.fromkeys(MANA_FIELDS, 0)
+    for symbol in SYMBOL_RE.findall((mana_cost or "").upper()):
+        if symbol.isdigit():
+            counts["generic_mana"] += int(symbol)
+        elif symbol in ("X", "Y", "Z"):
+            counts["x_count"] += 1
+        else:
+            # {U}, {C}, {W/U}, {U/P}, {2/W}, {G/U/P}: каждому цвету символа по одному
+            for part in set(symbol.split("/")):
+                if part in PIP_COLORS:
+                    counts[f"pips_{part.lower()}"] += 1
+    return ManaCost(**counts)
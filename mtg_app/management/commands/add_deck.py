@@ -2,6 +2,7 @@ import os
 
 from django.core.management.base import BaseCommand, CommandError
 
+from mtg_app.fuzzy import suggest_card_names
 from mtg_app.models import Card, Deck
 
 
@@ -58,11 +59,20 @@ class Command(BaseCommand):
                     # Убираем лишние суффиксы вида " (foil)" и т.п.
                     card_name = card_name.split(" (")[0]
 
-                    # Ищем карту в базе
-                    card = Card.objects.filter(name__icontains=card_name).first()
+                    # Ищем карту в базе: точное совпадение, затем нечеткий поиск
+                    entries = Card.objects.select_related("printing")
+                    card = entries.filter(printing__name__iexact=card_name).first()
+                    if card is None:
+                        candidates = suggest_card_names(card_name, limit=1)
+                        if candidates:
+                            card = entries.filter(printing_id__in=candidates[0].printing_ids).first()
+                            if card:
+                                self.stdout.write(
+                                    f"'{card_name}' не найдена, используем похожую: {card.printing.name}"
+                                )
                     if card:
                         deck.cards.add(card)
-                        self.stdout.write(self.style.SUCCESS(f"Добавлена карта: {card.name}"))
+                        self.stdout.write(self.style.SUCCESS(f"Добавлена карта: {card.printing.name}"))
                     else:
                         self.stdout.write(self.style.WARNING(f"Карта не найдена: {card_name}"))
 
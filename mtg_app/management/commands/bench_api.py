@@ -0,0 +1,90 @@
+"""
+Нагрузочное сравнение развертываний AJAX API (sync WSGI против async ASGI).
+
+Пример — один и тот же код под двумя серверами:
+    gunicorn mtg_project.wsgi:application -w 4 --bind 127.0.0.1:8000
+    gunicorn mtg_project.asgi:application -w 4 -k uvicorn.workers.UvicornWorker --bind 127.0.0.1:8001
+    python manage.py bench_api wsgi=http://127.0.0.1:8000 asgi=http://127.0.0.1:8001 \\
+        --path /api/get_card_image/ --param id=1 --requests 2000 --concurrency 100
+"""
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _run_target(base_url: str, path: str, params: dict, cookies: dict, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    limit = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, cookies=cookies, limits=limits, timeout=30) as client:
+        async def one():
+            nonlocal errors
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, params=params)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - started)
+                errors += not ok
+
+        await one()  # прогрев соединения и кэшей воркера, в статистику не идет
+        latencies.clear()
+        errors = 0
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": _percentile(latencies, 95) * 1000,
+        "p99": _percentile(latencies, 99) * 1000,
+        "errors": errors,
+    }
+
+
+class Command(BaseCommand):
+    help = "Параллельные GET-запросы к API на нескольких развертываниях и сводка по задержкам."
+
+    def add_arguments(self, parser):
+        parser.add_argument("targets", nargs="+", help="label=base_url, например asgi=http://127.0.0.1:8001")
+        parser.add_argument("--path", default="/api/get_card_image/")
+        parser.add_argument("--param", action="append", default=[], help="key=value в query string")
+        parser.add_argument("--sessionid", help="Cookie сессии для login_required-эндпоинтов")
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            targets = dict(target.split("=", 1) for target in options["targets"])
+            params = dict(param.split("=", 1) for param in options["param"])
+        except ValueError:
+            raise CommandError("Ожидается формат label=url и key=value.")
+        cookies = {"sessionid": options["sessionid"]} if options["sessionid"] else {}
+
+        self.stdout.write(
+            f"{options['path']}: {options['requests']} запросов, {options['concurrency']} одновременно\n"
+            f"{'target':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"
+        )
+        for label, base_url in targets.items():
+            result = asyncio.run(
+                _run_target(base_url, options["path"], params, cookies, options["requests"], options["concurrency"])
+            )
+            self.stdout.write(
+                f"{label:<10}{result['rps']:>10.0f}{result['p50']:>10.1f}"
+                f"{result['p95']:>10.1f}{result['p99']:>10.1f}{result['errors']:>8}"
+            )
@@ -4,7 +4,7 @@ from decimal import Decimal
 import pandas as pd
 from django.core.management.base import BaseCommand
 
-from mtg_app.models import Card, Set
+from mtg_app.models import Card, Printing, Set
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 file_path = os.path.join(BASE_DIR, "mtg_app", "management", "commands", "my_cards.csv")
@@ -40,14 +40,20 @@ class Command(BaseCommand):
                 True if foil_value == "foil" else False
             )  # Преобразуем "foil" в True, а всё остальное в False
 
-            card, created = Card.objects.get_or_create(
+            printing, _ = Printing.objects.get_or_create(
                 scryfall_id=row["Scryfall ID"],
                 defaults={
                     "name": row["Name"],
                     "set": set_obj,
                     "collector_number": row["Collector number"],
-                    "foil": foil,  # <-- Теперь передаётся True/False
                     "rarity": row["Rarity"],
+                },
+            )
+            card, created = Card.objects.get_or_create(
+                printing=printing,
+                owner=None,
+                defaults={
+                    "foil": foil,  # <-- Теперь передаётся True/False
                     "quantity": row["Quantity"],
                     "purchase_price": purchase_price,
                     "language": row["Language"],
@@ -56,6 +62,6 @@ class Command(BaseCommand):
             )
 
             if created:
-                print(f"Добавлена карта: {card.name} ({card.set.name})")
+                print(f"Добавлена карта: {printing.name} ({printing.set.name})")
             else:
-                print(f"Карта уже существует: {card.name} ({card.set.name})")
+                print(f"Карта уже существует: {printing.name} ({printing.set.name})")
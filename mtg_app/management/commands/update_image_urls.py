@@ -2,7 +2,7 @@ import os
 
 from django.core.management.base import BaseCommand
 
-from mtg_app.models import Card
+from mtg_app.models import Printing
 
 
 class Command(BaseCommand):
@@ -12,8 +12,8 @@ class Command(BaseCommand):
         # Папка для сохранения изображений
         image_folder = os.path.join("mtg_app", "static", "mtg_app", "images", "cards")
 
-        # Получаем все карты из базы данных
-        cards = Card.objects.all()
+        # Картинка — свойство печати (общая для всех владельцев)
+        cards = Printing.objects.all()
 
         for card in cards:
             # Формируем имя файла на основе названия карты и номера коллекции
@@ -29,7 +29,7 @@ class Command(BaseCommand):
             if os.path.exists(full_path):
                 # Обновляем ссылку на изображение в базе данных
                 card.image_url = image_path
-                card.save()
+                card.save(update_fields=["image_url"])
                 self.stdout.write(
                     self.style.SUCCESS(
                         f"Обновлено изображение для карты: {card.name} (Number: {card.collector_number}) -> {image_path}"
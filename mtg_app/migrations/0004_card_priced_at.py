@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_app', '0003_card_market_price_currency_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='added_at',
+            field=models.DateTimeField(auto_now_add=True, null=True, verbose_name='Добавлена'),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='priced_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Цена обновлена'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.26 on 2026-10-19 07:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_app', '0004_card_priced_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Printing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scryfall_id', models.CharField(max_length=100, unique=True, verbose_name='Scryfall ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Название')),
+                ('collector_number', models.CharField(max_length=20, verbose_name='Коллекционный номер')),
+                ('rarity', models.CharField(max_length=50, verbose_name='Редкость')),
+                ('image_url', models.URLField(blank=True, max_length=500, verbose_name='Ссылка на изображение')),
+                ('cmc', models.FloatField(default=0.0, verbose_name='Мана-стоимость (CMC)')),
+                ('mana_cost', models.CharField(blank=True, max_length=50, verbose_name='Символы маны')),
+                ('type_line', models.CharField(blank=True, max_length=255, verbose_name='Тип карты')),
+                ('oracle_text', models.TextField(blank=True, verbose_name='Текст карты')),
+                ('colors', models.CharField(blank=True, max_length=50, verbose_name='Цвета (WUBRG)')),
+                ('market_price', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Рыночная цена')),
+                ('market_price_currency', models.CharField(default='USD', max_length=3, verbose_name='Валюта рынка')),
+                ('priced_at', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Цена обновлена')),
+                ('added_at', models.DateTimeField(auto_now_add=True, null=True, verbose_name='Добавлена')),
+                ('set', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='printings', to='mtg_app.set', verbose_name='Сет')),
+            ],
+            options={
+                'verbose_name': 'Печать карты',
+                'verbose_name_plural': 'Печати карт',
+            },
+        ),
+        # Каталожные поля карты временно допускают NULL: так миграция обратима
+        # (при откате они возвращаются пустыми и заполняются из печатей в 0006)
+        migrations.AlterField(
+            model_name='card',
+            name='scryfall_id',
+            field=models.CharField(max_length=100, null=True, unique=True, verbose_name='Scryfall ID'),
+        ),
+        migrations.AlterField(
+            model_name='card',
+            name='name',
+            field=models.CharField(max_length=200, null=True, verbose_name='Название'),
+        ),
+        migrations.AlterField(
+            model_name='card',
+            name='collector_number',
+            field=models.CharField(max_length=20, null=True, verbose_name='Коллекционный номер'),
+        ),
+        migrations.AlterField(
+            model_name='card',
+            name='rarity',
+            field=models.CharField(max_length=50, null=True, verbose_name='Редкость'),
+        ),
+        migrations.AlterField(
+            model_name='card',
+            name='set',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cards', to='mtg_app.set', verbose_name='Сет'),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='printing',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='mtg_app.printing', verbose_name='Печать'),
+        ),
+    ]
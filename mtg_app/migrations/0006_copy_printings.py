@@ -0,0 +1,49 @@
+from django.db import migrations
+
+CATALOG_FIELDS = (
+    "scryfall_id", "name", "set_id", "collector_number", "rarity", "image_url", "cmc", "mana_cost",
+    "type_line", "oracle_text", "colors", "market_price", "market_price_currency", "priced_at", "added_at",
+)
+BATCH_SIZE = 1000
+
+
+def copy_printings(apps, schema_editor):
+    """Каждая карта становится печатью (scryfall_id был уникален) + записью коллекции."""
+    Card = apps.get_model("mtg_app", "Card")
+    Printing = apps.get_model("mtg_app", "Printing")
+
+    cards = Card.objects.filter(printing__isnull=True).order_by("pk")
+    while True:
+        batch = list(cards[:BATCH_SIZE])
+        if not batch:
+            break
+        printings = Printing.objects.bulk_create(
+            [Printing(**{field: getattr(card, field) for field in CATALOG_FIELDS}) for card in batch]
+        )
+        by_scryfall_id = {p.scryfall_id: p.pk for p in printings if p.pk is not None}
+        if len(by_scryfall_id) < len(batch):  # backend не вернул pk из bulk_create
+            by_scryfall_id = dict(
+                Printing.objects.filter(scryfall_id__in=[c.scryfall_id for c in batch]).values_list("scryfall_id", "pk")
+            )
+        for card in batch:
+            card.printing_id = by_scryfall_id[card.scryfall_id]
+        Card.objects.bulk_update(batch, ["printing"])
+
+
+def restore_catalog_fields(apps, schema_editor):
+    Card = apps.get_model("mtg_app", "Card")
+    for card in Card.objects.select_related("printing").exclude(printing=None).iterator():
+        for field in CATALOG_FIELDS:
+            setattr(card, field, getattr(card.printing, field))
+        card.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_app', '0005_printing'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_printings, restore_catalog_fields),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.26 on 2026-10-19 07:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mtg_app', '0006_copy_printings'),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name='card', name='cmc'),
+        migrations.RemoveField(model_name='card', name='collector_number'),
+        migrations.RemoveField(model_name='card', name='colors'),
+        migrations.RemoveField(model_name='card', name='image_url'),
+        migrations.RemoveField(model_name='card', name='mana_cost'),
+        migrations.RemoveField(model_name='card', name='market_price'),
+        migrations.RemoveField(model_name='card', name='market_price_currency'),
+        migrations.RemoveField(model_name='card', name='name'),
+        migrations.RemoveField(model_name='card', name='oracle_text'),
+        migrations.RemoveField(model_name='card', name='priced_at'),
+        migrations.RemoveField(model_name='card', name='rarity'),
+        migrations.RemoveField(model_name='card', name='scryfall_id'),
+        migrations.RemoveField(model_name='card', name='set'),
+        migrations.RemoveField(model_name='card', name='type_line'),
+        migrations.AlterField(
+            model_name='card',
+            name='printing',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='mtg_app.printing', verbose_name='Печать'),
+        ),
+        migrations.AddConstraint(
+            model_name='card',
+            constraint=models.UniqueConstraint(fields=('owner', 'printing'), name='card_owner_printing_uniq'),
+        ),
+    ]
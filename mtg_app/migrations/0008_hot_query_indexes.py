@@ -0,0 +1,39 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_app', '0007_card_drop_catalog_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='printing',
+            name='set',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='printings', to='mtg_app.set', verbose_name='Сет'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['purchase_price', 'id'], name='card_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='printing',
+            index=models.Index(fields=['name'], name='printing_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='printing',
+            index=models.Index(fields=['set', 'name'], name='printing_set_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='printing',
+            index=models.Index(fields=['rarity', 'name'], name='printing_rarity_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='printing',
+            index=models.Index(fields=['cmc', 'name'], name='printing_cmc_name_idx'),
+        ),
+    ]
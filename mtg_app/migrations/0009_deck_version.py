@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_app', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deck',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_app', '0009_deck_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deck',
+            name='format',
+            field=models.CharField(blank=True, choices=[('standard', 'Standard'), ('future', 'Future'), ('historic', 'Historic'), ('timeless', 'Timeless'), ('gladiator', 'Gladiator'), ('pioneer', 'Pioneer'), ('explorer', 'Explorer'), ('modern', 'Modern'), ('legacy', 'Legacy'), ('pauper', 'Pauper'), ('vintage', 'Vintage'), ('penny', 'Penny'), ('commander', 'Commander'), ('oathbreaker', 'Oathbreaker'), ('standardbrawl', 'Standardbrawl'), ('brawl', 'Brawl'), ('alchemy', 'Alchemy'), ('paupercommander', 'Paupercommander'), ('duel', 'Duel'), ('oldschool', 'Oldschool'), ('premodern', 'Premodern'), ('predh', 'Predh')], max_length=20, verbose_name='Формат'),
+        ),
+        migrations.AddField(
+            model_name='deck',
+            name='is_legal',
+            field=models.BooleanField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='printing',
+            name='legal_formats',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Легальна в форматах'),
+        ),
+        migrations.AddField(
+            model_name='printing',
+            name='restricted_formats',
+            field=models.PositiveIntegerField(default=0, verbose_name='Ограничена в форматах'),
+        ),
+    ]
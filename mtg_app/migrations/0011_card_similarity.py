@@ -0,0 +1,21 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_app', '0010_legality'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True, verbose_name='Название')),
+                ('neighbors', models.JSONField(default=list, verbose_name='Похожие карты')),
+            ],
+        ),
+    ]
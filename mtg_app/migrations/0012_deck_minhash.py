@@ -0,0 +1,31 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_app', '0011_card_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeckSignature',
+            fields=[
+                ('deck', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='mtg_app.deck')),
+                ('version', models.PositiveIntegerField()),
+                ('minhash', models.BinaryField()),
+                ('archetype', models.PositiveBigIntegerField(blank=True, db_index=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DeckLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True)),
+                ('deck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='mtg_app.deck')),
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('mtg_app', '0012_deck_minhash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeIndexVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trade_index', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('collection_version', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TradeHave',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('quantity', models.PositiveIntegerField()),
+                ('market_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trade_haves', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WishlistItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Название')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='Количество')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wishlist', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'owner'], name='wishlist_name_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='wishlistitem',
+            constraint=models.UniqueConstraint(fields=('owner', 'name'), name='wishlist_owner_name_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='tradehave',
+            index=models.Index(fields=['name', 'owner'], name='tradehave_name_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tradehave',
+            constraint=models.UniqueConstraint(fields=('owner', 'name'), name='tradehave_owner_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_app', '0013_trades'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printing',
+            name='generic_mana',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Общая мана'),
+        ),
+        migrations.AddField(
+            model_name='printing',
+            name='pips_b',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Символов B'),
+        ),
+        migrations.AddField(
+            model_name='printing',
+            name='pips_c',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Символов C'),
+        ),
+        migrations.AddField(
+            model_name='printing',
+            name='pips_g',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Символов G'),
+        ),
+        migrations.AddField(
+            model_name='printing',
+            name='pips_r',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Символов R'),
+        ),
+        migrations.AddField(
+            model_name='printing',
+            name='pips_u',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Символов U'),
+        ),
+        migrations.AddField(
+            model_name='printing',
+            name='pips_w',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Символов W'),
+        ),
+        migrations.AddField(
+            model_name='printing',
+            name='x_count',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Символов X'),
+        ),
+        migrations.AddIndex(
+            model_name='printing',
+            index=models.Index(fields=['pips_w'], name='printing_pips_w_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='printing',
+            index=models.Index(fields=['pips_u'], name='printing_pips_u_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='printing',
+            index=models.Index(fields=['pips_b'], name='printing_pips_b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='printing',
+            index=models.Index(fields=['pips_r'], name='printing_pips_r_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='printing',
+            index=models.Index(fields=['pips_g'], name='printing_pips_g_idx'),
+        ),
+    ]
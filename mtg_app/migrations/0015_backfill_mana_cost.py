@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from mtg_app.mana import parse_mana_cost
+
+
+def backfill_mana_cost(apps, schema_editor):
+    """Различных мана-стоимостей немного — по одному UPDATE на каждую, а не на печать."""
+    Printing = apps.get_model("mtg_app", "Printing")
+    costs = Printing.objects.exclude(mana_cost="").values_list("mana_cost", flat=True).distinct().order_by()
+    for mana_cost in list(costs):
+        Printing.objects.filter(mana_cost=mana_cost).update(**parse_mana_cost(mana_cost).as_fields())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mtg_app", "0014_mana_cost_columns"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_mana_cost, migrations.RunPython.noop),
+    ]
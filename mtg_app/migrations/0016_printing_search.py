@@ -0,0 +1,69 @@
+# Generated by Django 4.2.26 on 2026-10-19 04:46
+
+from django.db import migrations, models
+
+# Полнотекстовый индекс печатей для поиска (mtg_app/search.py). SQL зафиксирован здесь:
+# миграция не должна зависеть от кода приложения, который будет меняться
+FTS_TABLE = "mtg_app_printing_fts"
+TEXT_COLUMNS = ("name", "type_line", "oracle_text")
+
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, type_line, oracle_text, content='mtg_app_printing', content_rowid='id')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON mtg_app_printing BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, type_line, oracle_text)
+        VALUES (new.id, new.name, new.type_line, new.oracle_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON mtg_app_printing BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, type_line, oracle_text)
+        VALUES ('delete', old.id, old.name, old.type_line, old.oracle_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, type_line, oracle_text
+    ON mtg_app_printing BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, type_line, oracle_text)
+        VALUES ('delete', old.id, old.name, old.type_line, old.oracle_text);
+        INSERT INTO {FTS_TABLE}(rowid, name, type_line, oracle_text)
+        VALUES (new.id, new.name, new.type_line, new.oracle_text);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    *(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}" for suffix in ("ai", "ad", "au")),
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+POSTGRES_CREATE = [
+    f"CREATE INDEX IF NOT EXISTS printing_{column}_fts_idx ON mtg_app_printing "
+    f"USING gin (to_tsvector('simple', {column}))"
+    for column in TEXT_COLUMNS
+]
+POSTGRES_DROP = [f"DROP INDEX IF EXISTS printing_{column}_fts_idx" for column in TEXT_COLUMNS]
+
+
+def _run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            cursor.execute(sql)
+
+
+def create_fulltext_index(apps, schema_editor):
+    """FTS5 с триггерами (SQLite) или GIN-индексы to_tsvector (PostgreSQL) по name/type_line/oracle_text."""
+    _run(schema_editor, {"sqlite": SQLITE_CREATE, "postgresql": POSTGRES_CREATE})
+
+
+def remove_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_DROP, "postgresql": POSTGRES_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mtg_app', '0015_backfill_mana_cost'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='printing',
+            index=models.Index(fields=['market_price'], name='printing_price_idx'),
+        ),
+        migrations.RunPython(create_fulltext_index, remove_fulltext_index),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def merge_ownerless_duplicates(apps, schema_editor):
+    """Записи без владельца с одной печатью сливаются в самую раннюю: количества суммируются, колоды переносятся."""
+    Card = apps.get_model("mtg_app", "Card")
+    DeckCard = apps.get_model("mtg_app", "DeckCard")
+    printing_ids = (
+        Card.objects.filter(owner__isnull=True).values("printing_id").annotate(n=Count("pk")).filter(n__gt=1)
+        .values_list("printing_id", flat=True).order_by()
+    )
+    for printing_id in list(printing_ids):
+        keep, *duplicates = Card.objects.filter(owner__isnull=True, printing_id=printing_id).order_by("pk")
+        for duplicate in duplicates:
+            for item in DeckCard.objects.filter(card=duplicate):
+                merged = DeckCard.objects.filter(deck_id=item.deck_id, card=keep).update(
+                    quantity=F("quantity") + item.quantity
+                )
+                if merged:
+                    item.delete()
+                else:
+                    item.card = keep
+                    item.save(update_fields=["card"])
+            keep.quantity += duplicate.quantity
+            duplicate.delete()
+        keep.save(update_fields=["quantity"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mtg_app", "0016_printing_search"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_ownerless_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="card",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("owner__isnull", True)), fields=("printing",), name="card_ownerless_printing_uniq"
+            ),
+        ),
+    ]
@@ -6,6 +6,8 @@ from django.core.files.storage import default_storage
 from django.db import models
 from django.templatetags.static import static
 
+from .mana import MANA_FIELDS, parse_mana_cost
+
 User = get_user_model()
 
 class Set(models.Model):
@@ -21,37 +23,126 @@ class Set(models.Model):
 
     @property
     def card_count(self) -> int:
-        return self.cards.count()
+        return Card.objects.filter(printing__set=self).count()
+
+# Форматы Scryfall (ключи "legalities"); номер в кортеже — номер бита в
+# Printing.legal_formats/restricted_formats, поэтому новые форматы только в конец
+FORMATS = (
+    "standard", "future", "historic", "timeless", "gladiator", "pioneer", "explorer", "modern",
+    "legacy", "pauper", "vintage", "penny", "commander", "oathbreaker", "standardbrawl", "brawl",
+    "alchemy", "paupercommander", "duel", "oldschool", "premodern", "predh",
+)
+
+
+def format_bit(format_name: str) -> int:
+    return 1 << FORMATS.index(format_name)
+
+
+class Printing(models.Model):
+    """Каталог: конкретная печать карты (Scryfall). Общая для всех пользователей."""
 
-class Card(models.Model):
     scryfall_id = models.CharField(max_length=100, unique=True, verbose_name="Scryfall ID")
     name = models.CharField(max_length=200, verbose_name="Название")
-    set = models.ForeignKey(Set, on_delete=models.CASCADE, verbose_name="Сет", related_name="cards")
+    # Отдельный индекс по set не нужен: его покрывает printing_set_name_idx
+    set = models.ForeignKey(
+        Set, on_delete=models.CASCADE, verbose_name="Сет", related_name="printings", db_index=False
+    )
     collector_number = models.CharField(max_length=20, verbose_name="Коллекционный номер")
-    foil = models.BooleanField(default=False, verbose_name="Фоил")
     rarity = models.CharField(max_length=50, verbose_name="Редкость")
-    quantity = models.PositiveIntegerField(default=1, verbose_name="Количество") # Общее кол-во в коллекции
-    purchase_price = models.DecimalField(
-        max_digits=10, decimal_places=2, default=0, verbose_name="Цена покупки"
-    )
-    language = models.CharField(max_length=50, blank=True, verbose_name="Язык")
-    condition = models.CharField(max_length=50, blank=True, verbose_name="Состояние")
     image_url = models.URLField(max_length=500, blank=True, verbose_name="Ссылка на изображение")
-    owner = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name="cards", null=True, blank=True
-    )
     cmc = models.FloatField(default=0.0, verbose_name="Мана-стоимость (CMC)")
     mana_cost = models.CharField(max_length=50, blank=True, verbose_name="Символы маны")
     type_line = models.CharField(max_length=255, blank=True, verbose_name="Тип карты")
     oracle_text = models.TextField(blank=True, verbose_name="Текст карты")
     colors = models.CharField(max_length=50, blank=True, verbose_name="Цвета (WUBRG)")
     market_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Рыночная цена")
-    purchase_price_currency = models.CharField(max_length=3, default="RUB", verbose_name="Валюта покупки")
     market_price_currency = models.CharField(max_length=3, default="USD", verbose_name="Валюта рынка")
+    # Для планировщика обновления цен: когда цена обновлялась и когда печать появилась в каталоге
+    priced_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name="Цена обновлена")
+    added_at = models.DateTimeField(auto_now_add=True, null=True, verbose_name="Добавлена")
+    # Битовые маски по FORMATS: легальна (в т.ч. ограниченно) / ограничена одной копией.
+    # NULL — легальность еще не загружена из Scryfall
+    legal_formats = models.PositiveIntegerField(null=True, blank=True, verbose_name="Легальна в форматах")
+    restricted_formats = models.PositiveIntegerField(default=0, verbose_name="Ограничена в форматах")
+    # Разобранная mana_cost (mana.parse_mana_cost) — заполняется в save()
+    pips_w = models.PositiveSmallIntegerField(default=0, verbose_name="Символов W")
+    pips_u = models.PositiveSmallIntegerField(default=0, verbose_name="Символов U")
+    pips_b = models.PositiveSmallIntegerField(default=0, verbose_name="Символов B")
+    pips_r = models.PositiveSmallIntegerField(default=0, verbose_name="Символов R")
+    pips_g = models.PositiveSmallIntegerField(default=0, verbose_name="Символов G")
+    pips_c = models.PositiveSmallIntegerField(default=0, verbose_name="Символов C")
+    generic_mana = models.PositiveSmallIntegerField(default=0, verbose_name="Общая мана")
+    x_count = models.PositiveSmallIntegerField(default=0, verbose_name="Символов X")
+
+    class Meta:
+        verbose_name = "Печать карты"
+        verbose_name_plural = "Печати карт"
+        # Фильтры card_list + сортировка по названию (см. tests/test_query_plans.py)
+        indexes = [
+            models.Index(fields=["name"], name="printing_name_idx"),
+            models.Index(fields=["set", "name"], name="printing_set_name_idx"),
+            models.Index(fields=["rarity", "name"], name="printing_rarity_name_idx"),
+            models.Index(fields=["cmc", "name"], name="printing_cmc_name_idx"),
+            # "не меньше N символов цвета" — диапазон по одной колонке
+            *(models.Index(fields=[f"pips_{c}"], name=f"printing_pips_{c}_idx") for c in "wubrg"),
+            # usd>5 в поиске (search.py); текстовые поля — в полнотекстовом индексе
+            models.Index(fields=["market_price"], name="printing_price_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.name
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значение из БД: кэш картинок (signals.invalidate_printing_images) сбрасывается только при смене
+        instance._loaded_image_url = instance.__dict__.get("image_url")
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "mana_cost" in update_fields:
+            for field, value in parse_mana_cost(self.mana_cost).as_fields().items():
+                setattr(self, field, value)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, *MANA_FIELDS}
+        super().save(*args, **kwargs)
+
+
+class Card(models.Model):
+    """Запись коллекции: сколько копий печати есть у пользователя и за сколько куплены."""
+
+    printing = models.ForeignKey(
+        Printing, on_delete=models.CASCADE, related_name="entries", verbose_name="Печать"
+    )
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="cards", null=True, blank=True
+    )
+    foil = models.BooleanField(default=False, verbose_name="Фоил")
+    quantity = models.PositiveIntegerField(default=1, verbose_name="Количество") # Общее кол-во в коллекции
+    purchase_price = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, verbose_name="Цена покупки"
+    )
+    purchase_price_currency = models.CharField(max_length=3, default="RUB", verbose_name="Валюта покупки")
+    language = models.CharField(max_length=50, blank=True, verbose_name="Язык")
+    condition = models.CharField(max_length=50, blank=True, verbose_name="Состояние")
+    added_at = models.DateTimeField(auto_now_add=True, null=True, verbose_name="Добавлена")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "printing"], name="card_owner_printing_uniq"),
+            # NULL != NULL: без этого записи без владельца дублировались бы по печати
+            models.UniqueConstraint(
+                fields=["printing"], condition=models.Q(owner__isnull=True), name="card_ownerless_printing_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["purchase_price", "id"], name="card_price_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return self.printing.name
+
     # (Функция image_src() была здесь, но она не используется в шаблонах, 
     # которые мы сделали, поэтому я ее убрал, чтобы не было ошибок 'posixpath')
     # Если она вам нужна, убедитесь, что импорты posixpath и т.д. есть вверху
@@ -65,6 +156,13 @@ class Deck(models.Model):
     )
     is_private = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Растет при каждом изменении состава (см. decks.bump_deck_version) — ключ кэша аналитики
+    version = models.PositiveIntegerField(default=0, editable=False)
+    format = models.CharField(
+        max_length=20, blank=True, choices=[(name, name.capitalize()) for name in FORMATS], verbose_name="Формат"
+    )
+    # Результат последней проверки legality.refresh_deck_legality; NULL — состав менялся после нее
+    is_legal = models.BooleanField(null=True, editable=False)
     
     # --- ОСТАВЛЕНА ТОЛЬКО ОДНА ПРАВИЛЬНАЯ СВЯЗЬ ---
     cards = models.ManyToManyField(
@@ -77,6 +175,13 @@ class Deck(models.Model):
     def __str__(self) -> str:
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значение из БД: сигнал сбрасывает покрытие публичных колод только при смене приватности
+        instance._loaded_is_private = instance.__dict__.get("is_private")
+        return instance
+
     def get_total_quantity(self):
         total = 0
         for item in self.deckcard_set.all():
@@ -92,4 +197,73 @@ class DeckCard(models.Model):
         unique_together = ('deck', 'card') 
 
     def __str__(self):
-        return f"{self.quantity}x {self.card.name}"
\ No newline at end of file
+        return f"{self.quantity}x {self.card.printing.name}"
+
+
+class DeckSignature(models.Model):
+    """MinHash-сигнатура состава публичной колоды (см. deck_similarity.py)."""
+
+    deck = models.OneToOneField(Deck, on_delete=models.CASCADE, primary_key=True, related_name="signature")
+    version = models.PositiveIntegerField()  # Deck.version, по которой посчитана сигнатура
+    minhash = models.BinaryField()
+    # Архетип — pk младшей колоды кластера (cluster_archetypes); NULL — не кластеризована
+    archetype = models.PositiveBigIntegerField(null=True, blank=True, db_index=True)
+
+
+class DeckLSHBucket(models.Model):
+    """Ключ LSH-корзины (полоса сигнатуры + ее значения) — колоды с общим ключом вероятно похожи."""
+
+    deck = models.ForeignKey(Deck, on_delete=models.CASCADE, related_name="lsh_buckets")
+    key = models.BigIntegerField(db_index=True)
+
+
+class CardSimilarity(models.Model):
+    """Похожие по тексту карты (см. recommender.py); строка на название карты."""
+
+    name = models.CharField(max_length=200, unique=True, verbose_name="Название")
+    # [[название, сходство], ...] по убыванию сходства
+    neighbors = models.JSONField(default=list, verbose_name="Похожие карты")
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class WishlistItem(models.Model):
+    """Карта, которую пользователь хочет получить в обмен (любая печать с этим названием)."""
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="wishlist")
+    name = models.CharField(max_length=200, verbose_name="Название")
+    quantity = models.PositiveIntegerField(default=1, verbose_name="Количество")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "name"], name="wishlist_owner_name_uniq"),
+        ]
+        indexes = [models.Index(fields=["name", "owner"], name="wishlist_name_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.quantity}x {self.name}"
+
+
+class TradeHave(models.Model):
+    """Индекс обмена: сколько копий карты у пользователя свободно (коллекция минус колоды).
+    Пересчитывается trades.refresh_trade_index, вручную не редактируется."""
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="trade_haves")
+    name = models.CharField(max_length=200)
+    quantity = models.PositiveIntegerField()
+    market_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "name"], name="tradehave_owner_name_uniq"),
+        ]
+        indexes = [models.Index(fields=["name", "owner"], name="tradehave_name_idx")]
+
+
+class TradeIndexVersion(models.Model):
+    """Версия коллекции (coverage.bump_collection_version), по которой построены TradeHave пользователя."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="trade_index")
+    collection_version = models.PositiveIntegerField()
+
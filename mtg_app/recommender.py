@@ -0,0 +1,193 @@
+"""
+Похожие карты по тексту правил.
+
+Документ карты — type_line + oracle_text (собственное название заменено на
+CARDNAME, чтобы "When X enters..." у разных карт совпадало). По всем
+названиям каталога строится разреженная TF-IDF матрица со строками единичной
+длины, так что косинусное сходство — просто X @ X.T. Соседи считаются
+офлайн (задача Celery) блоками строк, top-k через argpartition, и
+сохраняются в CardSimilarity — страница карты читает одну строку по
+уникальному индексу.
+
+Новые карты добавляются без перестройки: их тексты переводятся в векторы
+уже обученным словарем (IDF не пересчитывается), для них считаются соседи,
+а списки старых карт обновляются только там, где новая карта сильнее
+текущего k-го соседа. Индекс (словарь, матрица, названия, порог k-го
+соседа) хранится в файле SIMILAR_CARDS_INDEX_PATH; дрейф IDF снимает
+еженедельная полная перестройка.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from .models import Card, CardSimilarity, Printing
+
+BLOCK_ROWS = 512  # строк в блоке X @ X.T: блок (512 × N) float32 — ~60 МБ на 30k карт
+
+
+@dataclass
+class SimilarityIndex:
+    vectorizer: TfidfVectorizer
+    matrix: sp.csr_matrix   # (N, V) L2-нормированные строки
+    names: list[str]
+    kth: np.ndarray         # (N,) сходство k-го соседа; новая карта сильнее — попадает в список
+
+
+def card_document(name: str, type_line: str, oracle_text: str) -> str:
+    return f"{type_line}\n{oracle_text.replace(name, 'CARDNAME') if name else oracle_text}"
+
+
+def _catalog(exclude=()) -> tuple[list[str], list[str]]:
+    """Названия и документы каталога (одна печать на название; без текста — еще не обогащены)."""
+    rows = (
+        Printing.objects.exclude(Q(oracle_text="") & Q(type_line=""))
+        .order_by("name", "pk")
+        .values_list("name", "type_line", "oracle_text")
+    )
+    skip = set(exclude)
+    names, documents = [], []
+    for name, type_line, oracle_text in rows.iterator():
+        if name in skip or (names and names[-1] == name):
+            continue
+        names.append(name)
+        documents.append(card_document(name, type_line, oracle_text))
+    return names, documents
+
+
+def _blocks(query: sp.csr_matrix, corpus: sp.csr_matrix, offset: int | None = 0):
+    """(start, плотный блок сходства) по BLOCK_ROWS строк query; offset — где query лежит
+    в corpus (сходство карты с собой зануляется), None — query не входит в corpus."""
+    corpus_t = corpus.T.tocsc()
+    for start in range(0, query.shape[0], BLOCK_ROWS):
+        stop = min(start + BLOCK_ROWS, query.shape[0])
+        scores = (query[start:stop] @ corpus_t).toarray()
+        if offset is not None:
+            scores[np.arange(stop - start), np.arange(offset + start, offset + stop)] = 0.0
+        yield start, scores
+
+
+def _best(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """(n, k) индексы и сходства лучших столбцов каждой строки, по убыванию."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64), np.empty((scores.shape[0], 0))
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-top, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+def _neighbor_list(names: list[str], idx: np.ndarray, scores: np.ndarray) -> list:
+    return [[names[j], round(float(s), 4)] for j, s in zip(idx, scores, strict=True) if s > 0]
+
+
+def _kth(neighbors: list, k: int) -> float:
+    return neighbors[-1][1] if len(neighbors) >= k else 0.0
+
+
+def _save_neighbors(neighbors: dict[str, list]) -> None:
+    CardSimilarity.objects.bulk_create(
+        [CardSimilarity(name=name, neighbors=items) for name, items in neighbors.items()],
+        batch_size=1000, update_conflicts=True, unique_fields=["name"], update_fields=["neighbors"],
+    )
+
+
+def load_index() -> SimilarityIndex | None:
+    try:
+        return joblib.load(settings.SIMILAR_CARDS_INDEX_PATH)
+    except FileNotFoundError:
+        return None
+
+
+def save_index(index: SimilarityIndex) -> None:
+    path = settings.SIMILAR_CARDS_INDEX_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    joblib.dump(index, tmp)
+    os.replace(tmp, path)  # воркер, читающий индекс, не увидит полузаписанный файл
+
+
+def build_similar_cards(k: int | None = None) -> dict[str, int]:
+    """Полная перестройка: словарь, матрица и соседи всех карт каталога."""
+    k = k or settings.SIMILAR_CARDS_TOP_K
+    names, documents = _catalog()
+    if not names:
+        return {"cards": 0, "updated": 0}
+    vectorizer = TfidfVectorizer(sublinear_tf=True, ngram_range=(1, 2), stop_words="english", dtype=np.float32)
+    matrix = vectorizer.fit_transform(documents).tocsr()
+
+    neighbors = {}
+    for start, scores in _blocks(matrix, matrix):
+        idx, top = _best(scores, k)
+        for row in range(scores.shape[0]):
+            neighbors[names[start + row]] = _neighbor_list(names, idx[row], top[row])
+
+    kth = np.array([_kth(neighbors[name], k) for name in names], dtype=np.float32)
+    with transaction.atomic():
+        CardSimilarity.objects.exclude(name__in=names).delete()
+        _save_neighbors(neighbors)
+    save_index(SimilarityIndex(vectorizer, matrix, names, kth))
+    return {"cards": len(names), "updated": len(names)}
+
+
+def update_similar_cards(k: int | None = None) -> dict[str, int]:
+    """Добавляет в индекс карты каталога, которых в нем еще нет; без индекса — полная перестройка."""
+    k = k or settings.SIMILAR_CARDS_TOP_K
+    index = load_index()
+    if index is None:
+        return build_similar_cards(k)
+    new_names, documents = _catalog(exclude=index.names)
+    if not new_names:
+        return {"cards": len(index.names), "updated": 0}
+
+    old_count = len(index.names)
+    new_matrix = index.vectorizer.transform(documents).astype(np.float32).tocsr()
+    corpus = sp.vstack([index.matrix, new_matrix]).tocsr()
+    names = index.names + new_names
+
+    neighbors = {}
+    candidates = {}  # индекс старой карты -> [(новая карта, сходство)], сильнее ее k-го соседа
+    for start, scores in _blocks(new_matrix, corpus, offset=old_count):
+        idx, top = _best(scores, k)
+        for row in range(scores.shape[0]):
+            neighbors[new_names[start + row]] = _neighbor_list(names, idx[row], top[row])
+        rows, cols = np.nonzero(scores[:, :old_count] > index.kth[None, :])
+        for row, col in zip(rows.tolist(), cols.tolist(), strict=True):
+            candidates.setdefault(col, []).append([new_names[start + row], round(float(scores[row, col]), 4)])
+
+    kth = np.concatenate([index.kth, np.array([_kth(neighbors[name], k) for name in new_names], dtype=np.float32)])
+    existing = dict(
+        CardSimilarity.objects.filter(name__in=[index.names[col] for col in candidates]).values_list("name", "neighbors")
+    )
+    for col, items in candidates.items():
+        name = index.names[col]
+        merged = sorted(existing.get(name, []) + items, key=lambda item: -item[1])[:k]
+        neighbors[name] = merged
+        kth[col] = _kth(merged, k)
+
+    _save_neighbors(neighbors)
+    save_index(SimilarityIndex(index.vectorizer, corpus, names, kth))
+    return {"cards": len(names), "updated": len(neighbors)}
+
+
+def similar_cards(name: str, limit: int | None = None) -> list[dict]:
+    """Соседи карты для страницы: [{"name", "score", "card_id"}]; card_id — запись коллекции, если есть."""
+    neighbors = CardSimilarity.objects.filter(name=name).values_list("neighbors", flat=True).first()
+    if not neighbors:
+        return []
+    neighbors = neighbors[: limit or settings.SIMILAR_CARDS_TOP_K]
+    entries = dict(
+        Card.objects.filter(printing__name__in=[n for n, _ in neighbors])
+        .order_by("-pk")
+        .values_list("printing__name", "pk")
+    )
+    return [{"name": n, "score": score, "card_id": entries.get(n)} for n, score in neighbors]
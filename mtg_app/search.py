@@ -0,0 +1,439 @@
+"""
+Язык запросов в стиле Scryfall: t:creature c<=ub cmc<=3 o:deathtouch r:mythic s:thb usd>5.
+
+Строка разбирается в дерево (parse_query): пробел — AND, or — OR, "-" —
+отрицание, скобки группируют. Дерево компилируется в Q над Printing
+(compile_query; prefix="printing__" — над записями коллекции):
+  * название (слово без ключа), t:/type:, o:/oracle: — полнотекстовый индекс
+    (FTS5 в SQLite, GIN по to_tsvector в PostgreSQL — миграция 0016);
+    совпадение по словам, а не по подстроке; слово без ключа — по префиксу;
+  * c:/color: — колонки pips_* (цвет по символам мана-стоимости, гибридные
+    символы — обоим цветам): c:ub — есть U и B, c<=ub — нет других цветов,
+    c=ub — ровно U и B, c:c — бесцветные;
+  * cmc/mv, usd — диапазон по индексам cmc и market_price (usd — только
+    цены в долларах); r:/rarity: — IN по индексу редкости, s:/set:/e: — по
+    индексу сета.
+
+Планировщик оценивает долю печатей под каждым условием — по статистике
+каталога (несколько сгруппированных запросов) и числу совпадений в
+полнотекстовом индексе, все в кэше до смены версии каталога — и ставит в AND
+сначала самые избирательные условия, в OR — самые вероятные.
+"""
+from __future__ import annotations
+
+import hashlib
+import operator
+import re
+from dataclasses import dataclass
+from functools import reduce
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+
+from .fuzzy import INDEX_VERSION_KEY
+from .models import Printing, Set
+
+STATS_CACHE_TIMEOUT = 60 * 60
+FTS_TABLE = "mtg_app_printing_fts"
+FTS_COUNT_LIMIT = 10_000  # точнее для оценки не нужно, а запрос остается дешевым
+PRICE_STEPS = (0.25, 1, 2, 5, 10, 20, 50, 100)
+
+# Редкости в порядке Scryfall (для r>=rare и т.п.)
+RARITIES = ("common", "uncommon", "rare", "special", "mythic", "bonus")
+RARITY_ALIASES = {name[0]: name for name in RARITIES} | {name: name for name in RARITIES}
+COLOR_ALIASES = {
+    "white": "w", "blue": "u", "black": "b", "red": "r", "green": "g", "colorless": "c",
+}
+
+KEYS = {
+    "t": "type", "type": "type",
+    "o": "oracle", "oracle": "oracle",
+    "c": "color", "color": "color",
+    "cmc": "cmc", "mv": "cmc", "manavalue": "cmc",
+    "r": "rarity", "rarity": "rarity",
+    "s": "set", "set": "set", "e": "set", "edition": "set",
+    "usd": "usd",
+}
+NUMERIC_LOOKUPS = {":": "exact", "=": "exact", "<": "lt", "<=": "lte", ">": "gt", ">=": "gte"}
+
+TOKEN_RE = re.compile(
+    r'\s*(?:(?P<paren>[()])|(?P<neg>-)(?=\S)'
+    r'|(?:(?P<key>[a-zA-Z]+)(?P<op><=|>=|!=|[:=<>]))?(?:"(?P<quoted>[^"]*)"|(?P<word>[^\s()"]+)))'
+)
+WORD_RE = re.compile(r"\w+")
+
+
+class SearchSyntaxError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Term:
+    kind: str            # name/type/oracle/color/cmc/rarity/set/usd
+    op: str
+    value: object
+    text: str            # как терм записан в запросе
+
+
+@dataclass(frozen=True)
+class Not:
+    child: object
+
+
+@dataclass(frozen=True)
+class And:
+    children: tuple
+
+
+@dataclass(frozen=True)
+class Or:
+    children: tuple
+
+
+@dataclass
+class Predicate:
+    q: Q
+    selectivity: float   # оценка доли печатей, 0..1
+    text: str
+
+
+# --- Разбор ---------------------------------------------------------------
+
+def _tokens(text: str) -> list[tuple]:
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise SearchSyntaxError(f"Не удалось разобрать запрос с позиции {pos + 1}: «{text[pos:pos + 20]}».")
+        pos = match.end()
+        if match["paren"]:
+            tokens.append((match["paren"],))
+        elif match["neg"]:
+            tokens.append(("-",))
+        elif not match["key"] and match["word"] and match["word"].lower() in ("or", "and"):
+            tokens.append((match["word"].lower(),))
+        else:
+            value = match["quoted"] if match["quoted"] is not None else match["word"]
+            tokens.append(("term", match["key"], match["op"], value, match.group().strip()))
+    return tokens
+
+
+def _words(value: str, text: str) -> tuple[str, ...]:
+    words = tuple(WORD_RE.findall(value.lower()))
+    if not words:
+        raise SearchSyntaxError(f"«{text}»: нечего искать.")
+    return words
+
+
+def _number(value: str, text: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        raise SearchSyntaxError(f"«{text}»: ожидалось число.") from None
+
+
+def _term(key: str | None, op: str | None, value: str, text: str) -> Term:
+    if key is None:
+        return Term("name", ":", _words(value, text), text)
+    kind = KEYS.get(key.lower())
+    if kind is None:
+        raise SearchSyntaxError(f"«{text}»: неизвестный ключ «{key}».")
+    if kind in ("type", "oracle", "set") and op not in (":", "=", "!="):
+        raise SearchSyntaxError(f"«{text}»: для «{key}» подходят только «:», «=» и «!=».")
+    if kind in ("type", "oracle"):
+        return Term(kind, op, _words(value, text), text)
+    if kind == "set":
+        return Term(kind, op, value.lower(), text)
+    if kind in ("cmc", "usd"):
+        return Term(kind, op, _number(value, text), text)
+    if kind == "rarity":
+        rarity = RARITY_ALIASES.get(value.lower())
+        if rarity is None:
+            raise SearchSyntaxError(f"«{text}»: неизвестная редкость «{value}».")
+        return Term(kind, op, rarity, text)
+    colors = COLOR_ALIASES.get(value.lower(), value.lower())
+    if not colors or set(colors) - set("wubrgc") or ("c" in colors and len(colors) > 1):
+        raise SearchSyntaxError(f"«{text}»: цвета задаются буквами WUBRG или C (бесцветные).")
+    return Term(kind, op, frozenset(colors) - {"c"}, text)
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens, self.pos = tokens, 0
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        self.pos += 1
+        return self.tokens[self.pos - 1]
+
+    def expr(self):
+        children = [self.conjunction()]
+        while self.peek() == "or":
+            self.take()
+            children.append(self.conjunction())
+        return children[0] if len(children) == 1 else Or(tuple(children))
+
+    def conjunction(self):
+        children = []
+        while self.peek() not in (None, ")", "or"):
+            if self.peek() == "and":
+                self.take()
+                continue
+            children.append(self.unary())
+        if not children:
+            raise SearchSyntaxError("Пустое условие: проверьте «or» и скобки.")
+        return children[0] if len(children) == 1 else And(tuple(children))
+
+    def unary(self):
+        token = self.take()
+        if token[0] == "-":
+            if self.peek() in (None, ")", "or", "and"):
+                raise SearchSyntaxError("После «-» должно идти условие.")
+            return Not(self.unary())
+        if token[0] == "(":
+            node = self.expr()
+            if self.peek() != ")":
+                raise SearchSyntaxError("Не закрыта скобка.")
+            self.take()
+            return node
+        return _term(*token[1:])
+
+
+def parse_query(text: str):
+    """Дерево запроса (Term/And/Or/Not); SearchSyntaxError — с объяснением для пользователя."""
+    tokens = _tokens(text or "")
+    if not tokens:
+        raise SearchSyntaxError("Пустой запрос.")
+    parser = _Parser(tokens)
+    node = parser.expr()
+    if parser.peek() is not None:
+        raise SearchSyntaxError("Лишняя закрывающая скобка.")
+    return node
+
+
+# --- Полнотекстовый индекс ------------------------------------------------
+
+_SQLITE_TRIGGERS = {
+    f"{FTS_TABLE}_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON mtg_app_printing BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, name, type_line, oracle_text)
+            VALUES (new.id, new.name, new.type_line, new.oracle_text);
+        END""",
+    f"{FTS_TABLE}_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON mtg_app_printing BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, type_line, oracle_text)
+            VALUES ('delete', old.id, old.name, old.type_line, old.oracle_text);
+        END""",
+    f"{FTS_TABLE}_au": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, type_line, oracle_text
+        ON mtg_app_printing BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, type_line, oracle_text)
+            VALUES ('delete', old.id, old.name, old.type_line, old.oracle_text);
+            INSERT INTO {FTS_TABLE}(rowid, name, type_line, oracle_text)
+            VALUES (new.id, new.name, new.type_line, new.oracle_text);
+        END""",
+}
+
+
+def restore_fulltext_triggers(conn=connection) -> bool:
+    """Возвращает триггеры FTS5 (SQLite), если их нет; True — если индекс пересобран.
+    Сам индекс создает миграция 0016; перестройка таблицы печатей последующими
+    миграциями удаляет триггеры, поэтому функция вызывается после каждого migrate.
+    Если таблицы печатей или индекса нет (миграции откатаны) — ничего не делает."""
+    if conn.vendor != "sqlite":
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master WHERE name IN ('mtg_app_printing', %s) "
+            "OR (type = 'trigger' AND tbl_name = 'mtg_app_printing')",
+            [FTS_TABLE],
+        )
+        existing = {name for _, name in cursor.fetchall()}
+        if not {"mtg_app_printing", FTS_TABLE} <= existing or set(_SQLITE_TRIGGERS) <= existing:
+            return False
+        for sql in _SQLITE_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def _fulltext_sql(column: str, words: tuple[str, ...], prefix: bool) -> tuple[str, str] | None:
+    """(условие WHERE над индексом, параметр) — печати, где words идут подряд в column."""
+    if connection.vendor == "sqlite":
+        match = f'{column} : "{" ".join(words)}"' + (" *" if prefix else "")
+        return f"{FTS_TABLE} MATCH %s", match
+    if connection.vendor == "postgresql":
+        query = " <-> ".join(words) + (":*" if prefix else "")
+        return f"to_tsvector('simple', {column}) @@ to_tsquery('simple', %s)", query
+    return None
+
+
+def _fulltext_source() -> str:
+    return FTS_TABLE if connection.vendor == "sqlite" else "mtg_app_printing"
+
+
+def _fulltext_ids(column: str, words: tuple[str, ...], prefix: bool) -> RawSQL | None:
+    sql = _fulltext_sql(column, words, prefix)
+    if sql is None:
+        return None
+    condition, param = sql
+    key = "rowid" if connection.vendor == "sqlite" else "id"
+    return RawSQL(f"SELECT {key} FROM {_fulltext_source()} WHERE {condition}", [param])
+
+
+# --- Оценки ---------------------------------------------------------------
+
+def catalog_stats() -> dict:
+    """Распределения каталога для планировщика: четыре запроса раз на версию каталога."""
+    key = f"mtg_app:search_stats:{cache.get(INDEX_VERSION_KEY, 0)}"
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+    totals = Printing.objects.aggregate(
+        total=Count("pk"),
+        **{f"pips_{c}": Count("pk", filter=Q(**{f"pips_{c}__gte": 1})) for c in "wubrg"},
+        **{f"usd_{i}": Count("pk", filter=Q(market_price__gt=step, market_price_currency="USD"))
+           for i, step in enumerate(PRICE_STEPS)},
+    )
+    stats = {
+        **totals,
+        "rarity": dict(Printing.objects.values_list("rarity").annotate(n=Count("pk")).order_by()),
+        "set": {code.lower(): n for code, n in
+                Printing.objects.values_list("set__code").annotate(n=Count("pk")).order_by()},
+        "cmc": dict(Printing.objects.values_list("cmc").annotate(n=Count("pk")).order_by()),
+    }
+    cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def _fulltext_count(column: str, words: tuple[str, ...], prefix: bool) -> int | None:
+    sql = _fulltext_sql(column, words, prefix)
+    if sql is None:
+        return None
+    condition, param = sql
+    digest = hashlib.md5(f"{column}:{int(prefix)}:{' '.join(words)}".encode()).hexdigest()
+    key = f"mtg_app:search_fts:{cache.get(INDEX_VERSION_KEY, 0)}:{digest}"
+    count = cache.get(key)
+    if count is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM (SELECT 1 FROM {_fulltext_source()} WHERE {condition} LIMIT %s) AS matches",
+                [param, FTS_COUNT_LIMIT],
+            )
+            count = cursor.fetchone()[0]
+        cache.set(key, count, STATS_CACHE_TIMEOUT)
+    return count
+
+
+def _ratio(count: float, stats: dict) -> float:
+    return min(1.0, count / stats["total"]) if stats["total"] else 1.0
+
+
+# --- Компиляция -----------------------------------------------------------
+
+def _compare(op: str, left, right) -> bool:
+    return {
+        ":": operator.eq, "=": operator.eq, "!=": operator.ne,
+        "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    }[op](left, right)
+
+
+def _lookup(prefix: str, field: str, op: str, value) -> Q:
+    if op == "!=":
+        return ~Q(**{f"{prefix}{field}": value})
+    return Q(**{f"{prefix}{field}__{NUMERIC_LOOKUPS[op]}": value})
+
+
+def _text_predicate(term: Term, prefix: str, stats: dict) -> tuple[Q, float]:
+    column = {"name": "name", "type": "type_line", "oracle": "oracle_text"}[term.kind]
+    match_prefix = term.kind == "name"
+    ids = _fulltext_ids(column, term.value, match_prefix)
+    if ids is None:  # СУБД без полнотекстового индекса: подстрока
+        q = Q(**{f"{prefix}{column}__icontains": " ".join(term.value)})
+        selectivity = 0.1
+    else:
+        q = Q(**{f"{prefix}id__in": ids})
+        selectivity = _ratio(_fulltext_count(column, term.value, match_prefix), stats)
+    if term.op == "!=":
+        return ~q, 1.0 - selectivity
+    return q, selectivity
+
+
+def _color_predicate(term: Term, prefix: str, stats: dict) -> tuple[Q, float]:
+    colors = term.value
+    share = {c: _ratio(stats[f"pips_{c}"], stats) for c in "wubrg"}
+    has = reduce(operator.and_, (Q(**{f"{prefix}pips_{c}__gte": 1}) for c in sorted(colors)), Q())
+    only = reduce(operator.and_, (Q(**{f"{prefix}pips_{c}": 0}) for c in "wubrg" if c not in colors), Q())
+    p_has = reduce(operator.mul, (share[c] for c in colors), 1.0)
+    p_only = reduce(operator.mul, (1.0 - share[c] for c in "wubrg" if c not in colors), 1.0)
+    op = "=" if term.op == ":" and not colors else term.op  # c:c — ровно бесцветные
+    return {
+        ":": (has, p_has),
+        ">=": (has, p_has),
+        "=": (has & only, p_has * p_only),
+        "!=": (~(has & only), 1.0 - p_has * p_only),
+        "<=": (only, p_only),
+        ">": (has & ~only, p_has * (1.0 - p_only)),
+        "<": (only & ~has, p_only * (1.0 - p_has)),
+    }[op]
+
+
+def _term_predicate(term: Term, prefix: str, stats: dict) -> tuple[Q, float]:
+    if term.kind in ("name", "type", "oracle"):
+        return _text_predicate(term, prefix, stats)
+    if term.kind == "color":
+        return _color_predicate(term, prefix, stats)
+    if term.kind == "cmc":
+        count = sum(n for cmc, n in stats["cmc"].items() if _compare(term.op, cmc, term.value))
+        return _lookup(prefix, "cmc", term.op, term.value), _ratio(count, stats)
+    if term.kind == "rarity":
+        chosen = [r for r in RARITIES if _compare(term.op, RARITIES.index(r), RARITIES.index(term.value))]
+        count = sum(stats["rarity"].get(r, 0) for r in chosen)
+        return Q(**{f"{prefix}rarity__in": chosen}), _ratio(count, stats)
+    if term.kind == "set":
+        q = Q(**{f"{prefix}set__in": Set.objects.filter(code__iexact=term.value)})
+        selectivity = _ratio(stats["set"].get(term.value, 0), stats)
+        return (~q, 1.0 - selectivity) if term.op == "!=" else (q, selectivity)
+    # usd: доля дороже ближайшей ступени снизу — грубая, но монотонная оценка
+    above = next((stats[f"usd_{i}"] for i in reversed(range(len(PRICE_STEPS))) if PRICE_STEPS[i] <= term.value),
+                 stats["total"])
+    if term.op in (">", ">="):
+        estimate = _ratio(above, stats)
+    elif term.op in ("<", "<="):
+        estimate = 1.0 - _ratio(above, stats)
+    else:
+        estimate = 0.99 if term.op == "!=" else 0.01
+    q = _lookup(prefix, "market_price", term.op, term.value) & Q(**{f"{prefix}market_price_currency": "USD"})
+    return q, estimate
+
+
+def _plan(node, prefix: str, stats: dict) -> Predicate:
+    if isinstance(node, Term):
+        q, selectivity = _term_predicate(node, prefix, stats)
+        return Predicate(q, min(1.0, max(0.0, selectivity)), node.text)
+    if isinstance(node, Not):
+        child = _plan(node.child, prefix, stats)
+        return Predicate(~child.q, 1.0 - child.selectivity, f"-{child.text}")
+    children = [_plan(child, prefix, stats) for child in node.children]
+    if isinstance(node, And):
+        # Самые избирательные условия — первыми: их проверка отсекает больше строк
+        children.sort(key=lambda p: p.selectivity)
+        selectivity = reduce(operator.mul, (p.selectivity for p in children), 1.0)
+        return Predicate(reduce(operator.and_, (p.q for p in children)), selectivity,
+                         " ".join(p.text for p in children))
+    children.sort(key=lambda p: -p.selectivity)
+    selectivity = min(1.0, sum(p.selectivity for p in children))
+    return Predicate(reduce(operator.or_, (p.q for p in children)), selectivity,
+                     "(" + " or ".join(p.text for p in children) + ")")
+
+
+def compile_query(query, prefix: str = "") -> Predicate:
+    """Predicate для строки или дерева запроса; условия внутри AND/OR упорядочены планировщиком,
+    Predicate.text — запрос в порядке выполнения."""
+    node = parse_query(query) if isinstance(query, str) else query
+    return _plan(node, prefix, catalog_stats())
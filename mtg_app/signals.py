@@ -0,0 +1,88 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .coverage import bump_collection_version, bump_public_decks_version
+from .decks import bump_deck_version
+from .facets import bump_cards_version
+from .fuzzy import bump_index_version
+from .images import invalidate_card_images
+from .models import Card, Deck, DeckCard, Printing
+from .search import restore_fulltext_triggers
+
+
+@receiver(post_save, sender=Printing)
+@receiver(post_delete, sender=Printing)
+def invalidate_card_name_index(sender, update_fields=None, **kwargs):
+    if update_fields and "name" not in update_fields:
+        return
+    # Индекс названий перестроится лениво при следующем поиске
+    bump_index_version()
+
+
+@receiver(post_save, sender=Printing)
+def invalidate_printing_images(sender, instance, created=False, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None:
+        if "image_url" not in update_fields:
+            return
+    elif getattr(instance, "_loaded_image_url", None) == instance.image_url:
+        return  # Полное сохранение без смены картинки (цены, обогащение)
+    instance._loaded_image_url = instance.image_url
+    invalidate_card_images(instance.entries.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)  # в т.ч. каскадом при удалении печати
+def invalidate_entry_image(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or (update_fields and "printing" not in update_fields):
+        return
+    invalidate_card_images([instance.pk])
+
+
+@receiver(post_save, sender=DeckCard)
+@receiver(post_delete, sender=DeckCard)
+def bump_deck_version_on_change(sender, instance, **kwargs):
+    # Владелец нужен индексу обмена, приватность — покрытию. Колода удалена каскадом —
+    # ее отметит сигнал Deck
+    if DeckCard._meta.get_field("deck").is_cached(instance):
+        owner_id, is_private = instance.deck.owner_id, instance.deck.is_private
+    else:
+        owner_id, is_private = (
+            Deck.objects.filter(pk=instance.deck_id).values_list("owner_id", "is_private").first() or (None, None)
+        )
+    bump_deck_version(instance.deck_id, owner_id, is_private)
+
+
+@receiver(post_save, sender=Card)
+@receiver(post_delete, sender=Card)
+def bump_collection_version_on_change(sender, instance, **kwargs):
+    bump_collection_version(instance.owner_id)
+    bump_cards_version()
+
+
+@receiver(post_save, sender=Deck)
+def bump_public_decks_on_deck_save(sender, instance, created=False, **kwargs):
+    # Покрытие считается по публичным колодам: сбрасываем, только если колода стала
+    # публичной/приватной (Deck.from_db запоминает прежнее значение)
+    was_private = getattr(instance, "_loaded_is_private", instance.is_private)
+    if not created and was_private != instance.is_private:
+        bump_public_decks_version()
+    instance._loaded_is_private = instance.is_private
+    bump_collection_version(instance.owner_id)
+
+
+@receiver(post_delete, sender=Deck)
+def bump_public_decks_on_deck_delete(sender, instance, **kwargs):
+    # Удаленная колода освобождает карты владельца для обмена
+    if not instance.is_private:
+        bump_public_decks_version()
+    bump_collection_version(instance.owner_id)
+
+
+@receiver(post_migrate, dispatch_uid="mtg_app_fulltext_index")
+def restore_fulltext_index(sender, using="default", **kwargs):
+    # SQLite пересоздает таблицу при изменении полей — вместе с ней пропадают триггеры FTS
+    if sender.name == "mtg_app":
+        restore_fulltext_triggers(connections[using])
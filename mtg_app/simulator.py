@@ -0,0 +1,253 @@
+"""
+Goldfish-симулятор колоды: стартовая рука, муллиганы и добор по ходам.
+
+Колода разворачивается в массив библиотеки (по элементу на копию карты),
+каждое испытание — случайная перестановка. Нужны только верхние 7 + ходы
+карт, поэтому вместо полного shuffle берется argpartition по случайным
+ключам: O(trials × library) без сортировки всей строки. Муллиганы (London)
+разыгрываются векторно: на каждой итерации перемешиваются только руки,
+которые еще не оставлены.
+
+Результат — вероятности по ходам: дропы земель, доступность цветов,
+конкретные карты. Кэшируется по (колода, Deck.version, параметры).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+from django.core.cache import cache
+
+from .analytics import PIP_COLORS
+from .models import Deck, DeckCard
+
+SIMULATION_CACHE_TIMEOUT = 60 * 60 * 24
+HAND_SIZE = 7
+MAX_TRIALS = 500_000
+# Работа и память растут как испытания × размер библиотеки: общий объем прогона
+# ограничен, а считается он пачками (ключи float32 + индексы int64 — ~12 байт на ячейку)
+MAX_SIMULATION_CELLS = 10_000_000
+BATCH_CELLS = 2_000_000
+MAX_TURNS = 10
+COLORS = PIP_COLORS[:5]  # WUBRG; бесцветная мана для доступности цветов не нужна
+BASIC_LAND_COLORS = {"Plains": "W", "Island": "U", "Swamp": "B", "Mountain": "R", "Forest": "G"}
+
+
+@dataclass(frozen=True)
+class MulliganRules:
+    """London mulligan: оставляем руку с keep_min..keep_max землями из 7,
+    после max_mulligans оставляем любую; под низ убираем так, чтобы земель
+    в руке было как можно ближе к bottom_target_lands."""
+
+    keep_min_lands: int = 2
+    keep_max_lands: int = 5
+    max_mulligans: int = 2
+    bottom_target_lands: int = 3
+
+
+@dataclass
+class Library:
+    cards: np.ndarray      # (L,) индекс уникальной карты для каждой копии
+    card_ids: np.ndarray   # (U,) Card.pk
+    is_land: np.ndarray    # (U,) bool
+    produces: np.ndarray   # (U, 5) bool — какие цвета WUBRG дает земля
+    colors: tuple          # цвета, которые нужны заклинаниям колоды
+
+
+def land_colors(type_line: str, oracle_text: str) -> set[str]:
+    """Цвета, которые дает земля: базовые типы + символы маны в тексте."""
+    if "any color" in oracle_text or "any one color" in oracle_text:
+        return set(COLORS)
+    produced = {color for land_type, color in BASIC_LAND_COLORS.items() if land_type in type_line}
+    return produced | {color for color in COLORS if f"{{{color}}}" in oracle_text}
+
+
+def load_library(deck: Deck) -> Library:
+    rows = list(
+        DeckCard.objects.filter(deck=deck)
+        .order_by("card_id")
+        .values_list("card_id", "quantity", "card__printing__type_line",
+                     "card__printing__oracle_text", "card__printing__mana_cost")
+    )
+    card_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    quantities = np.array([row[1] for row in rows], dtype=np.int64)
+    is_land = np.array(["Land" in row[2] for row in rows], dtype=bool)
+    produces = np.array(
+        [[color in land_colors(row[2], row[3]) if land else False for color in COLORS]
+         for row, land in zip(rows, is_land, strict=True)],
+        dtype=bool,
+    ).reshape(len(rows), len(COLORS))
+    needed = tuple(color for color in COLORS if any(color in row[4] for row, land in zip(rows, is_land, strict=True) if not land))
+    return Library(np.repeat(np.arange(len(rows)), quantities), card_ids, is_land, produces, needed)
+
+
+def _top_k(rng: np.random.Generator, n: int, size: int, k: int) -> np.ndarray:
+    """(n, k) позиций — первые k карт n независимых перестановок библиотеки."""
+    keys = rng.random((n, size), dtype=np.float32)
+    if k < size:
+        idx = np.argpartition(keys, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(size), (n, size)).copy()
+    order = np.take_along_axis(keys, idx, axis=1).argsort(axis=1)
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def _bottom_mask(is_land_hand: np.ndarray, mulligans: np.ndarray, target: int) -> np.ndarray:
+    """(n, 7) bool — какие карты руки уходят под низ после `mulligans` муллиганов."""
+    lands = is_land_hand.sum(axis=1)
+    spells = HAND_SIZE - lands
+    lands_out = np.clip(lands - target, np.maximum(mulligans - spells, 0), np.minimum(mulligans, lands))
+    spells_out = mulligans - lands_out
+    # Убираем с конца руки: порядок случайный, так что это случайный выбор
+    land_rank = np.cumsum(is_land_hand[:, ::-1], axis=1)[:, ::-1]
+    spell_rank = np.cumsum(~is_land_hand[:, ::-1], axis=1)[:, ::-1]
+    return (is_land_hand & (land_rank <= lands_out[:, None])) | (~is_land_hand & (spell_rank <= spells_out[:, None]))
+
+
+def simulate_counts(library: Library, trials: int, turns: int, on_play: bool,
+                    rules: MulliganRules, targets: tuple, seed) -> dict[str, np.ndarray]:
+    """Суммы по испытаниям (не вероятности) — чтобы части из пула процессов складывались."""
+    rng = np.random.default_rng(seed)
+    size = len(library.cards)
+    depth = min(HAND_SIZE + turns, size)
+
+    drawn = np.empty((trials, depth), dtype=np.int64)
+    mulligans = np.zeros(trials, dtype=np.int64)
+    active = np.arange(trials)
+    for attempt in range(rules.max_mulligans + 1):
+        cards = library.cards[_top_k(rng, len(active), size, depth)]
+        lands = library.is_land[cards[:, :HAND_SIZE]].sum(axis=1)
+        keep = (lands >= rules.keep_min_lands) & (lands <= rules.keep_max_lands)
+        if attempt == rules.max_mulligans:
+            keep[:] = True
+        drawn[active[keep]] = cards[keep]
+        mulligans[active[keep]] = attempt
+        active = active[~keep]
+
+    hand, draws = drawn[:, :HAND_SIZE], drawn[:, HAND_SIZE:]
+    kept = ~_bottom_mask(library.is_land[hand], mulligans, rules.bottom_target_lands)
+    # Сколько карт добрано к ходу t: на игре первый ход без добора
+    draws_by_turn = np.clip(np.arange(1, turns + 1) - (1 if on_play else 0), 0, draws.shape[1])
+
+    def by_turn(in_hand: np.ndarray, per_draw: np.ndarray, reduce) -> np.ndarray:
+        """(trials, turns, ...) — значение по руке и накопленное по добору."""
+        if per_draw.shape[1]:
+            cumulative = reduce.accumulate(per_draw, axis=1)
+            padded = np.concatenate([np.zeros_like(cumulative[:, :1]), cumulative], axis=1)
+        else:
+            padded = np.zeros((trials, 1) + per_draw.shape[2:], dtype=per_draw.dtype)
+        return reduce(in_hand[:, None], padded[:, draws_by_turn])
+
+    land_hand = (library.is_land[hand] & kept).sum(axis=1)
+    lands = by_turn(land_hand, library.is_land[draws].astype(np.int64), np.add)
+    colors = by_turn((library.produces[hand] & kept[..., None]).any(axis=1), library.produces[draws], np.logical_or)
+    needed = [COLORS.index(color) for color in library.colors]
+
+    counts = {
+        "trials": np.array(trials),
+        "hand_size": np.bincount(HAND_SIZE - mulligans, minlength=HAND_SIZE + 1),
+        "opening_lands": np.bincount(land_hand, minlength=HAND_SIZE + 1),
+        "land_drops": (lands >= np.arange(1, turns + 1)).sum(axis=0),
+        "lands_total": lands.sum(axis=0),
+        "colors": colors.sum(axis=0),
+        "all_colors": colors[..., needed].all(axis=2).sum(axis=0),
+    }
+    for card_id in targets:
+        position = np.searchsorted(library.card_ids, card_id)
+        found = by_turn(((hand == position) & kept).any(axis=1), draws == position, np.logical_or)
+        counts[f"card:{card_id}"] = found.sum(axis=0)
+    return counts
+
+
+def _simulate_part(args) -> dict[str, np.ndarray]:
+    """Часть испытаний пачками по BATCH_CELLS ячеек — пиковая память не зависит от trials."""
+    library, trials, turns, on_play, rules, targets, seed = args
+    batch = max(1, BATCH_CELLS // len(library.cards))
+    sizes = [min(batch, trials - start) for start in range(0, trials, batch)] or [0]
+    results = [
+        simulate_counts(library, size, turns, on_play, rules, targets, batch_seed)
+        for size, batch_seed in zip(sizes, seed.spawn(len(sizes)), strict=True)
+    ]
+    return {key: sum(result[key] for result in results) for key in results[0]}
+
+
+def run_simulation(library: Library, *, trials: int = 100_000, turns: int = 6, on_play: bool = True,
+                   rules: MulliganRules = MulliganRules(), card_ids=(), seed: int = 0, workers: int = 1) -> dict:
+    """Вероятности по ходам. workers > 1 — испытания делятся между процессами
+    с независимыми потоками случайных чисел (SeedSequence.spawn)."""
+    if len(library.cards) < HAND_SIZE:
+        raise ValueError(f"В колоде меньше {HAND_SIZE} карт.")
+    if not 0 <= rules.max_mulligans < HAND_SIZE:
+        raise ValueError(f"Муллиганов может быть от 0 до {HAND_SIZE - 1}.")
+    in_deck = set(library.card_ids.tolist())
+    targets = tuple(card_id for card_id in card_ids if card_id in in_deck)
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    parts = [trials // workers + (i < trials % workers) for i in range(workers)]
+    jobs = [(library, part, turns, on_play, rules, targets, s) for part, s in zip(parts, seeds, strict=True)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_part, jobs))
+    else:
+        results = [_simulate_part(jobs[0])]
+    totals = {key: sum(result[key] for result in results) for key in results[0]}
+
+    def per_turn(values) -> dict:
+        return {str(turn): round(float(value) / trials, 4) for turn, value in enumerate(values, start=1)}
+
+    def distribution(values) -> dict:
+        return {str(k): round(float(v) / trials, 4) for k, v in enumerate(values) if v}
+
+    return {
+        "trials": trials,
+        "turns": turns,
+        "on_play": on_play,
+        "library_size": len(library.cards),
+        "lands": int(library.is_land[library.cards].sum()),
+        "hand_size": distribution(totals["hand_size"]),
+        "opening_lands": distribution(totals["opening_lands"]),
+        "land_drops": per_turn(totals["land_drops"]),
+        "lands_avg": per_turn(totals["lands_total"]),
+        "colors": {color: per_turn(totals["colors"][:, COLORS.index(color)]) for color in library.colors},
+        "all_colors": per_turn(totals["all_colors"]),
+        "cards": {str(card_id): per_turn(totals[f"card:{card_id}"]) for card_id in targets},
+    }
+
+
+def simulation_cache_key(deck: Deck, params: dict) -> str:
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+    return f"mtg_app:deck_simulation:{deck.pk}:v{deck.version}:{digest}"
+
+
+def max_trials(library_size: int) -> int:
+    return max(1, min(MAX_TRIALS, MAX_SIMULATION_CELLS // max(library_size, 1)))
+
+
+def simulate_deck(deck: Deck, *, trials: int = 100_000, turns: int = 6, on_play: bool = True,
+                  rules: MulliganRules = MulliganRules(), card_ids=(), workers: int = 1) -> dict:
+    """Кэшированный прогон; seed фиксирован, так что кэш и пересчет совпадают.
+    Запрошенные параметры приводятся к каноническим (испытаний не больше max_trials,
+    только карты колоды): произвольные ?cards= и огромные trials не обходят кэш и не
+    запускают новый прогон."""
+    params = {"trials": trials, "turns": turns, "on_play": on_play, "rules": asdict(rules),
+              "cards": tuple(sorted(set(card_ids)))}
+    key = simulation_cache_key(deck, params)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    library = load_library(deck)
+    in_deck = set(library.card_ids.tolist())
+    canonical = {**params, "trials": min(trials, max_trials(len(library.cards))),
+                 "cards": tuple(card_id for card_id in params["cards"] if card_id in in_deck)}
+    canonical_key = simulation_cache_key(deck, canonical)
+    result = cache.get(canonical_key)
+    if result is None:
+        result = run_simulation(library, trials=canonical["trials"], turns=turns, on_play=on_play,
+                                rules=rules, card_ids=canonical["cards"], workers=workers)
+        cache.set(canonical_key, result, SIMULATION_CACHE_TIMEOUT)
+    if key != canonical_key:
+        cache.set(key, result, SIMULATION_CACHE_TIMEOUT)
+    return result
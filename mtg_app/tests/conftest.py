@@ -0,0 +1,44 @@
+from math import comb
+
+import pytest
+from django.core.cache import cache
+
+from mtg_app.models import Card, Deck, DeckCard, Printing, Set
+
+
+@pytest.fixture
+def hypergeom_at_least():
+    """Точная вероятность вытянуть не меньше at_least из successes за draws карт колоды population."""
+    def at_least(successes, population, draws, at_least):
+        return sum(comb(successes, k) * comb(population - successes, draws - k)
+                   for k in range(at_least, draws + 1)) / comb(population, draws)
+    return at_least
+
+
+@pytest.fixture
+def make_catalog(db):
+    """Каталог сета M19: {название: поля печати} -> {название: запись коллекции без владельца}."""
+    def make(specs):
+        cache.clear()
+        m19 = Set.objects.create(code="M19", name="Core 2019")
+        return {
+            name: Card.objects.create(
+                printing=Printing.objects.create(
+                    scryfall_id=name, name=name, set=m19, collector_number=str(i), **fields
+                )
+            )
+            for i, (name, fields) in enumerate(specs.items())
+        }
+    return make
+
+
+@pytest.fixture
+def make_deck(db):
+    """Колода из {название: количество} записей каталога; kwargs — поля Deck."""
+    def make(catalog, quantities, **kwargs):
+        deck = Deck.objects.create(**{"name": "Deck", **kwargs})
+        DeckCard.objects.bulk_create(
+            DeckCard(deck=deck, card=catalog[name], quantity=quantity) for name, quantity in quantities.items()
+        )
+        return deck
+    return make
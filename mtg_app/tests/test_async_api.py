@@ -0,0 +1,106 @@
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient
+from django.urls import reverse
+
+from mtg_app.models import Card, Deck, DeckCard, Printing, Set
+
+
+@pytest.fixture
+def deck_setup(db):
+    User = get_user_model()
+    owner = User.objects.create(username="owner")
+    printing = Printing.objects.create(
+        scryfall_id="bolt-1", name="Lightning Bolt", set=Set.objects.create(code="M10", name="Magic 2010"),
+        collector_number="146", image_url="cards/bolt.jpg",
+    )
+    return {
+        "owner": owner,
+        "stranger": User.objects.create(username="stranger"),
+        "card": Card.objects.create(printing=printing, owner=owner),
+        "deck": Deck.objects.create(name="Burn", owner=owner),
+    }
+
+
+def _client(user=None):
+    client = AsyncClient()
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+@async_to_sync
+async def _request(client, method, *args, **kwargs):
+    # AsyncClient.get/post в Django 4.2 не помечены как корутины — ждем явно
+    return await getattr(client, method)(*args, **kwargs)
+
+
+@pytest.mark.django_db
+def test_get_card_image(deck_setup, settings):
+    client = _client()
+    url = reverse("mtg_app:get_card_image")
+
+    response = _request(client, "get", url, {"id": deck_setup["card"].pk})
+    assert response.json() == {"url": f"{settings.MEDIA_URL}cards/bolt.jpg"}
+    assert _request(client, "get", url, {"id": 999}).json() == {"url": None}
+
+
+@pytest.mark.django_db
+def test_user_decks_require_login(deck_setup):
+    url = reverse("mtg_app:get_user_decks")
+
+    assert _request(_client(), "get", url).status_code == 302
+    response = _request(_client(deck_setup["owner"]), "get", url)
+    assert response.json() == {"decks": [{"id": deck_setup["deck"].pk, "name": "Burn"}]}
+
+
+@pytest.mark.django_db
+def test_add_card_to_deck(deck_setup):
+    url = reverse("mtg_app:add_card_to_deck")
+    data = {"card_id": deck_setup["card"].pk, "deck_id": deck_setup["deck"].pk}
+    client = _client(deck_setup["owner"])
+
+    assert _request(client, "get", url).status_code == 405
+    for _ in range(2):
+        assert _request(client, "post", url, data).json()["status"] == "success"
+    assert DeckCard.objects.get().quantity == 2
+
+    assert _request(_client(deck_setup["stranger"]), "post", url, data).status_code == 403
+    missing = _request(client, "post", url, {**data, "card_id": 999})
+    assert missing.status_code == 404
+    foreign = Card.objects.create(printing=deck_setup["card"].printing, owner=deck_setup["stranger"])
+    assert _request(client, "post", url, {**data, "card_id": foreign.pk}).status_code == 404
+
+
+@pytest.mark.django_db
+def test_bulk_add_cards_to_deck(deck_setup, django_assert_max_num_queries):
+    owner, deck = deck_setup["owner"], deck_setup["deck"]
+    other = Card.objects.create(
+        printing=Printing.objects.create(scryfall_id="shock-1", name="Shock", set=deck_setup["card"].printing.set, collector_number="1"),
+        owner=owner,
+    )
+    DeckCard.objects.create(deck=deck, card=deck_setup["card"], quantity=2)
+    url = reverse("mtg_app:add_cards_to_deck")
+    client = _client(owner)
+
+    def post(payload):
+        return _request(client, "post", url, json.dumps(payload), content_type="application/json")
+
+    bolt, shock = deck_setup["card"].pk, other.pk
+    payload = {"deck_id": deck.pk, "cards": [{"card_id": bolt, "quantity": 2}, {"card_id": shock, "quantity": 4}, {"card_id": shock}]}
+    with django_assert_max_num_queries(11):  # сессия/пользователь + проверки + вставка, UPDATE, версия колоды, итоги
+        response = post(payload)
+    assert response.json()["deck"]["total_cards"] == 9
+    assert sorted(map(tuple, (c.values() for c in response.json()["cards"]))) == [(bolt, 4), (shock, 5)]
+
+    assert post({**payload, "cards": [{"card_id": 999}]}).json()["missing"] == [999]
+    foreign = Card.objects.create(printing=other.printing, owner=deck_setup["stranger"])
+    assert post({**payload, "cards": [{"card_id": foreign.pk}]}).json()["missing"] == [foreign.pk]
+    assert post({**payload, "cards": [{"card_id": bolt, "quantity": 0}]}).status_code == 400
+    assert post({"deck_id": deck.pk}).status_code == 400
+    stranger = _request(_client(deck_setup["stranger"]), "post", url, json.dumps(payload), content_type="application/json")
+    assert stranger.status_code == 403
+    assert dict(DeckCard.objects.values_list("card_id", "quantity")) == {bolt: 4, shock: 5}
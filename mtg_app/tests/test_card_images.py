@@ -0,0 +1,85 @@
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from mtg_app.images import card_image_urls, image_variants
+from mtg_app.models import Card, Printing, Set
+
+SCRYFALL_URL = "https://cards.scryfall.io/large/front/a/b/abc.jpg?1562"
+
+
+@pytest.fixture
+def cards(db):
+    cache.clear()
+    m19 = Set.objects.create(code="M19", name="Core 2019")
+    image_urls = ["cards/shock.jpg", SCRYFALL_URL, ""]
+    return [
+        Card.objects.create(
+            printing=Printing.objects.create(
+                scryfall_id=f"id-{i}", name=f"Card {i}", set=m19, collector_number=str(i), image_url=url
+            )
+        )
+        for i, url in enumerate(image_urls)
+    ]
+
+
+def test_image_variants(settings):
+    assert image_variants("") is None
+    assert image_variants("cards/shock.jpg")["small"] == f"{settings.MEDIA_URL}cards/shock.jpg"
+    variants = image_variants(SCRYFALL_URL)
+    assert variants["url"] == SCRYFALL_URL
+    assert variants["small"] == "https://cards.scryfall.io/small/front/a/b/abc.jpg?1562"
+
+
+@pytest.mark.django_db
+def test_batch_resolves_in_one_query_then_from_cache(cards, django_assert_num_queries):
+    ids = [card.pk for card in cards] + [999]
+    with django_assert_num_queries(1):
+        first = card_image_urls(ids)
+    assert set(first) == {card.pk for card in cards}
+    assert first[cards[2].pk] is None
+
+    with django_assert_num_queries(0):
+        assert card_image_urls(ids[:-1]) == first
+
+
+@pytest.mark.django_db
+def test_image_change_invalidates_cached_entry(cards):
+    card = cards[0]
+    card_image_urls([card.pk])
+
+    printing = card.printing
+    printing.image_url = SCRYFALL_URL
+    printing.save(update_fields=["image_url"])
+    assert card_image_urls([card.pk])[card.pk]["url"] == SCRYFALL_URL
+
+    card.delete()
+    assert card_image_urls([card.pk]) == {}
+
+
+@pytest.mark.django_db
+def test_full_save_invalidates_only_on_image_change(cards, django_assert_num_queries):
+    card_image_urls([card.pk for card in cards])
+    printing = Printing.objects.get(pk=cards[1].printing_id)
+    printing.market_price = 3
+    printing.save()  # цены/обогащение: картинка та же — кэш цел
+    with django_assert_num_queries(0):
+        card_image_urls([cards[1].pk])
+
+    printing.image_url = "cards/other.jpg"
+    printing.save()
+    assert card_image_urls([cards[1].pk])[cards[1].pk]["url"].endswith("cards/other.jpg")
+
+
+@pytest.mark.django_db
+def test_card_images_endpoint(cards):
+    client = Client()
+    url = reverse("mtg_app:get_card_images")
+
+    response = client.get(url, {"ids": ",".join(str(card.pk) for card in cards)})
+    images = response.json()["images"]
+    assert images[str(cards[1].pk)]["normal"] == "https://cards.scryfall.io/normal/front/a/b/abc.jpg?1562"
+    assert images[str(cards[2].pk)] is None
+    assert client.get(url, {"ids": "1,x"}).status_code == 400
+    assert client.get(reverse("mtg_app:get_card_image"), {"id": cards[1].pk}).json() == {"url": SCRYFALL_URL}
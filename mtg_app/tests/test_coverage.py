@@ -0,0 +1,137 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from mtg_app.coverage import collection_coverage, compute_coverage, missing_cards
+from mtg_app.decks import add_cards_to_deck
+from mtg_app.models import Card, Deck, DeckCard, Printing, Set
+
+
+@pytest.fixture
+def world(db):
+    cache.clear()
+    User = get_user_model()
+    author, player = User.objects.create_user("author"), User.objects.create_user("player", password="pw")
+    m19 = Set.objects.create(code="M19", name="Core 2019")
+    m20 = Set.objects.create(code="M20", name="Core 2020")
+
+    def printing(name, set_obj, price):
+        return Printing.objects.create(scryfall_id=f"{name}-{set_obj.code}", name=name, set=set_obj,
+                                       collector_number="1", market_price=Decimal(price))
+
+    bolt19, bolt20 = printing("Lightning Bolt", m19, "2.00"), printing("Lightning Bolt", m20, "1.00")
+    mountain, titan = printing("Mountain", m19, "0.10"), printing("Inferno Titan", m19, "5.00")
+    author_cards = {p.pk: Card.objects.create(printing=p, owner=author, quantity=20)
+                    for p in (bolt19, mountain, titan)}
+
+    def deck(name, quantities, **kwargs):
+        d = Deck.objects.create(name=name, owner=author, **kwargs)
+        DeckCard.objects.bulk_create(DeckCard(deck=d, card=author_cards[p.pk], quantity=q) for p, q in quantities)
+        return d
+
+    decks = {
+        "burn": deck("Burn", [(bolt19, 4), (mountain, 16)]),
+        "titan": deck("Titan", [(titan, 4), (mountain, 16)]),
+        "secret": deck("Secret", [(bolt19, 4)], is_private=True),
+    }
+    # У игрока Bolt из другого сета — по названию он засчитывается
+    Card.objects.create(printing=bolt20, owner=player, quantity=3)
+    Card.objects.create(printing=mountain, owner=player, quantity=16)
+    return {"player": player, "decks": decks, "bolt20": bolt20, "titan": titan}
+
+
+@pytest.mark.django_db
+def test_compute_coverage(world):
+    result = compute_coverage({"Lightning Bolt": 3, "Mountain": 16})
+    burn, titan = world["decks"]["burn"], world["decks"]["titan"]
+    assert result == [
+        {"deck_id": burn.pk, "total": 20, "owned": 19, "completion": 95.0, "missing_cards": 1, "missing_cost": 2.0},
+        {"deck_id": titan.pk, "total": 20, "owned": 16, "completion": 80.0, "missing_cards": 1, "missing_cost": 20.0},
+    ]
+    assert compute_coverage({})[0]["completion"] == 0.0
+
+
+@pytest.mark.django_db
+def test_coverage_cached_until_collection_or_decks_change(
+    world, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    player = world["player"]
+    assert collection_coverage(player)[0]["completion"] == 95.0
+    with django_assert_num_queries(0):
+        collection_coverage(player)
+
+    Card.objects.create(printing=world["titan"], owner=player, quantity=4)
+    assert collection_coverage(player)[0] == {**collection_coverage(player)[0], "deck_id": world["decks"]["titan"].pk,
+                                              "completion": 100.0}
+
+    with django_capture_on_commit_callbacks(execute=True):  # версии колоды растут после коммита
+        DeckCard.objects.filter(deck=world["decks"]["titan"]).delete()
+    assert [item["deck_id"] for item in collection_coverage(player)] == [world["decks"]["burn"].pk]
+
+    secret = world["decks"]["secret"]
+    secret.is_private = False
+    secret.save()
+    assert {item["deck_id"] for item in collection_coverage(player)} == {world["decks"]["burn"].pk, secret.pk}
+
+
+@pytest.mark.django_db
+def test_buildable_page_and_missing_cards(world):
+    client = Client()
+    client.force_login(world["player"])
+    response = client.get(reverse("mtg_app:buildable_decks"))
+    assert [row["deck"].name for row in response.context["rows"]] == ["Burn", "Titan"]
+
+    assert missing_cards(world["player"], world["decks"]["burn"]) == [{"name": "Lightning Bolt", "need": 4, "have": 3}]
+    detail = client.get(reverse("mtg_app:deck_detail", args=[world["decks"]["burn"].pk]))
+    assert detail.context["missing"] == [{"name": "Lightning Bolt", "need": 4, "have": 3}]
+
+
+@pytest.mark.django_db
+def test_private_deck_changes_keep_coverage_cache(
+    world, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    player, secret = world["player"], world["decks"]["secret"]
+    collection_coverage(player)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        DeckCard.objects.filter(deck=secret).update(quantity=2)
+        DeckCard.objects.filter(deck=secret).get().save()
+        secret = Deck.objects.get(pk=secret.pk)
+        secret.name = "Still secret"
+        secret.save()
+    with django_assert_num_queries(0):
+        collection_coverage(player)
+
+
+@pytest.mark.django_db
+def test_missing_cards_cached_by_collection_and_deck_version(world, django_assert_num_queries):
+    player, burn = world["player"], world["decks"]["burn"]
+    missing_cards(player, burn)
+    with django_assert_num_queries(0):
+        assert missing_cards(player, burn) == [{"name": "Lightning Bolt", "need": 4, "have": 3}]
+
+    Card.objects.filter(owner=player, printing=world["bolt20"]).get().delete()
+    assert missing_cards(player, burn) == [{"name": "Lightning Bolt", "need": 4, "have": 0}]
+
+    DeckCard.objects.filter(deck=burn, card__printing__name="Lightning Bolt").get().delete()
+    burn.refresh_from_db()
+    assert missing_cards(player, burn) == []
+
+
+@pytest.mark.django_db
+def test_deck_change_bumps_versions_after_commit(world, django_capture_on_commit_callbacks):
+    player, burn = world["player"], world["decks"]["burn"]
+    before = collection_coverage(player)
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        add_cards_to_deck(burn, {DeckCard.objects.filter(deck=burn).first().card_id: 4})
+        # До коммита версии прежние: пересчет по старым строкам не попадет под новую версию
+        assert collection_coverage(player) == before
+    assert len(callbacks) == 1
+
+    callbacks[0]()
+    assert collection_coverage(player) != before
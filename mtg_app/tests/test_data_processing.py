@@ -114,7 +114,7 @@ class ProcessCSVCommandTests(TestCase):  # ✅ Inherit from Django's TestCase
         )
 
         call_command("process_uploaded_csv", self.temp_csv_path)
-        self.assertTrue(Card.objects.filter(scryfall_id="abc123").exists())
+        self.assertTrue(Card.objects.filter(printing__scryfall_id="abc123").exists())
         self.assertTrue(Set.objects.filter(code="LEA").exists())
 
     def test_error_if_file_not_found(self):
@@ -193,7 +193,7 @@ class ProcessCSVCommandTests(TestCase):  # ✅ Inherit from Django's TestCase
         ]
 
         call_command("process_uploaded_csv", self.temp_csv_path)
-        card = Card.objects.get(scryfall_id="scry007")
-        self.assertIn("Fallback Card", card.name)
+        card = Card.objects.get(printing__scryfall_id="scry007")
+        self.assertIn("Fallback Card", card.printing.name)
         # Add more assertions here, e.g., to check if the image was "downloaded" (mocked)
         # and associated with the card object if your model stores image paths/data.
@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+import pytest
+
+from mtg_app.analytics import compute_deck_analytics, deck_analytics, public_deck_analytics
+from mtg_app.decks import add_cards_to_deck
+from mtg_app.models import Deck, DeckCard
+
+CARDS = {
+    # name: (cmc, mana_cost, type_line, market_price)
+    "Mountain": (0, "", "Basic Land — Mountain", "0.10"),
+    "Lightning Bolt": (1, "{R}", "Instant", "1.50"),
+    "Boros Charm": (2, "{R}{W}", "Instant", "0.75"),
+    "Figure of Destiny": (1, "{R/W}", "Creature — Kithkin Spirit", "4.00"),
+    "Inferno Titan": (6, "{4}{R}{R}", "Creature — Giant", "2.00"),
+    "Emrakul, the Aeons Torn": (15, "{15}", "Legendary Creature — Eldrazi", "35.00"),
+}
+
+
+@pytest.fixture
+def catalog(make_catalog):
+    return make_catalog({
+        name: {"cmc": cmc, "mana_cost": mana_cost, "type_line": type_line, "market_price": Decimal(price)}
+        for name, (cmc, mana_cost, type_line, price) in CARDS.items()
+    })
+
+
+@pytest.mark.django_db
+def test_compute_deck_analytics(catalog, make_deck):
+    deck = make_deck(catalog, {"Mountain": 20, "Lightning Bolt": 4, "Boros Charm": 4, "Figure of Destiny": 2,
+                           "Inferno Titan": 1, "Emrakul, the Aeons Torn": 1})
+    empty = Deck.objects.create(name="Empty")
+
+    result = compute_deck_analytics([deck.pk, empty.pk])
+    stats = result[deck.pk]
+
+    assert stats["total_cards"] == 32 and stats["lands"] == 20
+    assert stats["mana_curve"] == {"0": 0, "1": 6, "2": 4, "3": 0, "4": 0, "5": 0, "6+": 2}
+    assert stats["avg_cmc"] == round((4 + 8 + 2 + 6 + 15) / 12, 2)
+    assert stats["color_pips"] == {"W": 4 + 2, "U": 0, "B": 0, "R": 4 + 4 + 2 + 2, "G": 0, "C": 0}
+    assert stats["types"]["Creature"] == 4 and stats["types"]["Instant"] == 8
+    assert stats["price"]["total"] == 2.0 + 6.0 + 3.0 + 8.0 + 2.0 + 35.0
+    assert stats["price"]["max"] == 35.0
+    assert stats["price"]["buckets"] == {"<1": 24, "1–5": 7, "5–20": 0, "20+": 1}
+    assert result[empty.pk]["total_cards"] == 0 and result[empty.pk]["avg_cmc"] == 0
+
+
+@pytest.mark.django_db
+def test_analytics_cached_by_deck_version(catalog, django_assert_num_queries, make_deck):
+    deck = make_deck(catalog, {"Lightning Bolt": 4})
+    assert deck_analytics(deck)["total_cards"] == 4
+    with django_assert_num_queries(0):
+        assert deck_analytics(deck)["total_cards"] == 4
+
+    add_cards_to_deck(deck, {catalog["Boros Charm"].pk: 2})
+    deck.refresh_from_db()
+    assert deck_analytics(deck)["total_cards"] == 6
+
+    DeckCard.objects.filter(deck=deck, card=catalog["Lightning Bolt"]).get().delete()  # сигнал DeckCard
+    deck.refresh_from_db()
+    assert deck_analytics(deck)["total_cards"] == 2
+
+
+@pytest.mark.django_db
+def test_public_deck_analytics_in_one_pass(catalog, django_assert_num_queries, make_deck):
+    public = [make_deck(catalog, {"Lightning Bolt": i + 1}) for i in range(5)]
+    make_deck(catalog, {"Inferno Titan": 1}, is_private=True)
+
+    with django_assert_num_queries(2):  # версии колод + состав всех колод
+        result = public_deck_analytics()
+    assert {deck_id: stats["total_cards"] for deck_id, stats in result.items()} == {
+        deck.pk: i + 1 for i, deck in enumerate(public)
+    }
+    with django_assert_num_queries(1):
+        public_deck_analytics()
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from mtg_app.models import FORMATS, Card, Deck, DeckCard, Printing, Set
+
+
+@pytest.fixture
+def editor(db):
+    owner = get_user_model().objects.create(username="owner")
+    m19 = Set.objects.create(code="m19", name="Core 2019")
+    cards = [
+        Card.objects.create(
+            printing=Printing.objects.create(scryfall_id=f"id-{i}", name=f"Card {i:03}", set=m19, collector_number=str(i)),
+            owner=owner,
+        )
+        for i in range(200)
+    ]
+    deck = Deck.objects.create(name="Burn", owner=owner)
+    for card in cards[:60]:
+        DeckCard.objects.create(deck=deck, card=card, quantity=1)
+    client = Client()
+    client.force_login(owner)
+    return {"client": client, "deck": deck, "cards": cards}
+
+
+@pytest.mark.django_db
+def test_edit_page_renders_only_selected_cards(editor, django_assert_max_num_queries):
+    with django_assert_max_num_queries(6):
+        response = editor["client"].get(reverse("mtg_app:deck_edit", args=[editor["deck"].pk]))
+
+    html = response.content.decode()
+    # выбранная карта + пустой вариант; в шаблоне новой строки — только пустой; плюс список форматов колоды
+    assert html.count("<option") == 2 * 60 + 1 + len(FORMATS) + 1
+    assert "Card 059 (M19)" in html
+    assert "Card 150" not in html
+
+
+@pytest.mark.django_db
+def test_save_changes_applies_only_diff(editor):
+    deck, cards, client = editor["deck"], editor["cards"], editor["client"]
+    url = reverse("mtg_app:deck_save_changes", args=[deck.pk])
+    payload = {
+        "deck": {"name": "Mono Red", "description": "", "is_private": True},
+        "changes": [
+            {"card_id": cards[0].pk, "quantity": 4},    # изменили количество
+            {"card_id": cards[1].pk, "quantity": 0},    # убрали
+            {"card_id": cards[100].pk, "quantity": 2},  # добавили
+        ],
+    }
+
+    response = client.post(url, json.dumps(payload), content_type="application/json")
+    assert response.json()["deck"] == {"id": deck.pk, "total_cards": 64, "unique_cards": 60}
+    deck.refresh_from_db()
+    assert (deck.name, deck.is_private) == ("Mono Red", True)
+    quantities = dict(deck.deckcard_set.values_list("card_id", "quantity"))
+    assert (quantities[cards[0].pk], quantities[cards[100].pk], quantities[cards[2].pk]) == (4, 2, 1)
+    assert cards[1].pk not in quantities
+
+    bad = {"changes": [{"card_id": cards[0].pk, "quantity": -1}]}
+    assert client.post(url, json.dumps(bad), content_type="application/json").status_code == 400
+    missing = {"changes": [{"card_id": 10**6, "quantity": 1}]}
+    assert client.post(url, json.dumps(missing), content_type="application/json").json()["missing"] == [10**6]
+
+    stranger = Client()
+    stranger.force_login(get_user_model().objects.create(username="stranger"))
+    assert stranger.post(url, json.dumps(payload), content_type="application/json").status_code == 403
+
+
+@pytest.mark.django_db
+def test_deck_card_autocomplete(editor):
+    response = editor["client"].get(reverse("mtg_app:deck_card_autocomplete"), {"q": "card 15"})
+
+    results = response.json()["results"]
+    assert [r["text"] for r in results[:2]] == ["Card 150 (M19)", "Card 151 (M19)"]
+    assert len(results) == 10
+
+
+@pytest.mark.django_db
+def test_add_deck_formset_still_saves(editor):
+    card = editor["cards"][5]
+    response = editor["client"].post(reverse("mtg_app:add_deck"), {
+        "name": "New", "description": "",
+        "deck_cards-TOTAL_FORMS": "1", "deck_cards-INITIAL_FORMS": "0",
+        "deck_cards-0-card": card.pk, "deck_cards-0-quantity": "3",
+    })
+
+    assert response.status_code == 302
+    assert Deck.objects.get(name="New").deckcard_set.get().quantity == 3
+
+
+@pytest.mark.django_db
+def test_editor_accepts_only_own_cards(editor):
+    deck, client = editor["deck"], editor["client"]
+    stranger = get_user_model().objects.create(username="stranger")
+    foreign = Card.objects.create(printing=editor["cards"][150].printing, owner=stranger)
+
+    results = client.get(reverse("mtg_app:deck_card_autocomplete"), {"q": "card 150"}).json()["results"]
+    assert [r["id"] for r in results] == [editor["cards"][150].pk]
+    assert Client().get(reverse("mtg_app:deck_card_autocomplete"), {"q": "card"}).status_code == 302
+
+    url = reverse("mtg_app:deck_save_changes", args=[deck.pk])
+    payload = {"changes": [{"card_id": foreign.pk, "quantity": 1}]}
+    response = client.post(url, json.dumps(payload), content_type="application/json")
+    assert response.status_code == 404 and response.json()["missing"] == [foreign.pk]
+
+    response = client.post(reverse("mtg_app:add_deck"), {
+        "name": "Stolen", "description": "",
+        "deck_cards-TOTAL_FORMS": "1", "deck_cards-INITIAL_FORMS": "0",
+        "deck_cards-0-card": foreign.pk, "deck_cards-0-quantity": "1",
+    })
+    assert response.status_code == 200 and not Deck.objects.filter(name="Stolen").exists()
+    assert not DeckCard.objects.filter(card=foreign).exists()
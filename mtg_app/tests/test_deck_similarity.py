@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from mtg_app.deck_similarity import (
+    NUM_PERM, cluster_archetypes, deck_elements, minhash, refresh_deck_signatures, similar_decks, similarity,
+)
+from mtg_app.models import Card, Deck, DeckCard, DeckLSHBucket, DeckSignature, Printing, Set
+
+
+def test_minhash_estimates_jaccard():
+    a = [f"card {i}" for i in range(100)]
+    b = [f"card {i}" for i in range(50, 150)]  # Жаккар = 50 / 150
+    sig_a, sig_b = minhash(a), minhash(b)
+    assert sig_a.shape == (NUM_PERM,) and minhash([]) is None
+    assert float(similarity(sig_a, sig_b[None, :])[0]) == pytest.approx(1 / 3, abs=0.1)
+    assert float(similarity(sig_a, minhash(list(reversed(a)))[None, :])[0]) == 1.0
+
+
+def test_deck_elements_cap_copies():
+    assert deck_elements({"Mountain": 20, "Bolt": 2}) == ["Mountain#0", "Mountain#1", "Mountain#2", "Mountain#3",
+                                                          "Bolt#0", "Bolt#1"]
+
+
+@pytest.fixture
+def decks(db):
+    m19 = Set.objects.create(code="M19", name="Core 2019")
+    cards = [
+        Card.objects.create(printing=Printing.objects.create(scryfall_id=f"c{i}", name=f"Card {i}", set=m19,
+                                                             collector_number=str(i)))
+        for i in range(60)
+    ]
+
+    def make(name, card_range, **kwargs):
+        deck = Deck.objects.create(name=name, **kwargs)
+        DeckCard.objects.bulk_create(DeckCard(deck=deck, card=cards[i], quantity=4) for i in card_range)
+        return deck
+
+    return {
+        "burn": make("Burn", range(0, 15)),
+        "burn2": make("Burn 2", list(range(0, 13)) + [40, 41]),
+        "burn3": make("Burn 3", list(range(1, 15)) + [42]),
+        "elves": make("Elves", range(20, 35)),
+        "elves2": make("Elves 2", list(range(20, 34)) + [50]),
+        "private": make("Secret Burn", range(0, 15), is_private=True),
+        "empty": Deck.objects.create(name="Empty"),
+    }
+
+
+@pytest.mark.django_db
+def test_refresh_indexes_only_stale_public_decks(decks, django_assert_max_num_queries):
+    assert refresh_deck_signatures()["updated"] == 5
+    assert DeckLSHBucket.objects.count() == 5 * 32
+    assert refresh_deck_signatures()["updated"] == 0
+
+    DeckCard.objects.filter(deck=decks["elves2"]).first().delete()  # версия колоды растет
+    assert refresh_deck_signatures()["updated"] == 1
+    assert DeckLSHBucket.objects.filter(deck=decks["elves2"]).count() == 32
+
+    Deck.objects.filter(pk=decks["elves2"].pk).update(is_private=True)
+    assert refresh_deck_signatures()["removed"] == 1
+    assert not DeckLSHBucket.objects.filter(deck=decks["elves2"]).exists()
+
+
+@pytest.mark.django_db
+def test_similar_decks_from_lsh_candidates(decks, django_assert_num_queries):
+    refresh_deck_signatures()
+    with django_assert_num_queries(3):  # состав колоды, кандидаты с сигнатурами, колоды
+        result = similar_decks(decks["private"])
+    assert [deck.name for deck, _ in result][:1] == ["Burn"]
+    assert {deck.name for deck, _ in result} <= {"Burn", "Burn 2", "Burn 3"}
+    assert result[0][1] == 1.0
+    assert similar_decks(decks["empty"]) == []
+
+
+@pytest.mark.django_db
+def test_cluster_archetypes(decks):
+    refresh_deck_signatures()
+    assert cluster_archetypes() == {"decks": 5, "archetypes": 2}
+    archetypes = dict(DeckSignature.objects.values_list("deck_id", "archetype"))
+    assert archetypes[decks["burn2"].pk] == archetypes[decks["burn3"].pk] == decks["burn"].pk
+    assert archetypes[decks["elves2"].pk] == decks["elves"].pk
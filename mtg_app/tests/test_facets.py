@@ -0,0 +1,74 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from mtg_app.facets import compute_facets, filter_key
+from mtg_app.models import Card, Printing, Set
+
+
+@pytest.fixture
+def collection(db):
+    user = get_user_model().objects.create_user("mage", password="x")
+    thb = Set.objects.create(code="thb", name="Theros Beyond Death")
+    m20 = Set.objects.create(code="m20", name="Core Set 2020")
+    rows = [
+        ("Grim Flayer", thb, "mythic", "BG", 2, "Creature — Human Warrior"),
+        ("Typhoid Rats", m20, "common", "B", 1, "Creature — Rat"),
+        ("Counterspell", m20, "uncommon", "U", 2, "Instant"),
+        ("Sol Ring", thb, "uncommon", "", 1, "Artifact"),
+        ("Ugin", m20, "mythic", "", 8, "Legendary Planeswalker — Ugin"),
+    ]
+    for i, (name, set_obj, rarity, colors, cmc, type_line) in enumerate(rows):
+        printing = Printing.objects.create(
+            scryfall_id=f"id-{i}", name=name, set=set_obj, collector_number=str(i), rarity=rarity,
+            colors=colors, cmc=cmc, type_line=type_line,
+        )
+        Card.objects.create(owner=user, printing=printing, quantity=2)
+    return {"thb": thb, "m20": m20}
+
+
+@pytest.mark.django_db
+def test_compute_facets_in_two_queries(collection):
+    with CaptureQueriesContext(connection) as captured:
+        facets = compute_facets(Card.objects.all())
+    assert len(captured) == 2
+    assert [(code, n) for _, code, _, n in facets["set"]] == [("m20", 3), ("thb", 2)]
+    assert facets["rarity"] == [["common", 1], ["uncommon", 2], ["mythic", 2]]
+    assert [(code, n) for code, _, n in facets["color"]] == [("U", 1), ("B", 2), ("G", 1), ("C", 2)]
+    assert facets["cmc"] == [["1", "1", 2], ["2", "2", 2], ["7+", ">=7", 1]]
+    assert facets["type"] == [["Creature", 2], ["Instant", 1], ["Artifact", 1], ["Planeswalker", 1]]
+
+
+def test_filter_key_is_normalized():
+    names = ["q", "rarity", "colors"]
+    assert filter_key(QueryDict("rarity=rare&q=t:creature%20%20o:flying&sort=price"), names) == \
+        filter_key(QueryDict("q=t:creature+o:flying&colors=&rarity=rare"), names)
+    assert filter_key(QueryDict("colors=U&colors=B"), names) == filter_key(QueryDict("colors=B&colors=U"), names)
+    assert filter_key(QueryDict("rarity=rare"), names) != filter_key(QueryDict("rarity=common"), names)
+
+
+@pytest.mark.django_db
+def test_card_list_facets_follow_filter_and_cache(client, collection):
+    url = reverse("mtg_app:card_list")
+    response = client.get(url, {"set": collection["m20"].pk})
+    groups = {group["title"]: group["items"] for group in response.context["facets"]}
+    assert [(item["label"], item["count"]) for item in groups["Редкость"]] == [
+        ("common", 1), ("uncommon", 1), ("mythic", 1)
+    ]
+    assert groups["Сет"][0]["active"]
+    assert "rarity=mythic" in groups["Редкость"][-1]["query"]
+
+    # Тот же фильтр в другом порядке/с сортировкой — из кэша, без запросов фасетов
+    with CaptureQueriesContext(connection) as captured:
+        client.get(url, {"sort": "price", "set": collection["m20"].pk})
+    assert not any("GROUP BY" in query["sql"] for query in captured.captured_queries)
+
+    # Новая запись коллекции сбрасывает кэш
+    other = get_user_model().objects.create_user("other", password="x")
+    Card.objects.create(owner=other, printing=Printing.objects.get(name="Ugin"))
+    response = client.get(url, {"set": collection["m20"].pk})
+    groups = {group["title"]: group["items"] for group in response.context["facets"]}
+    assert groups["Редкость"][-1]["count"] == 2
@@ -0,0 +1,74 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from forum.models import Post, Thread
+
+
+def _make_thread(title, author, replies):
+    thread = Thread.objects.create(title=title, author=author)
+    for i in range(replies):
+        poster = User.objects.create(username=f"{title}-{i}")
+        Post.objects.create(thread=thread, author=poster, content=f"reply {i}")
+    return thread
+
+
+@pytest.mark.django_db
+def test_post_signals_maintain_thread_counters():
+    author = User.objects.create(username="author")
+    thread = _make_thread("t", author, 3)
+    thread.refresh_from_db()
+    assert thread.post_count == 3
+    assert thread.last_post_author.username == "t-2"
+
+    thread.posts.order_by("-id").first().delete()
+    thread.refresh_from_db()
+    assert thread.post_count == 2
+    assert thread.last_post_author.username == "t-1"
+
+
+@pytest.mark.django_db
+def test_deleting_thread_skips_counter_recompute():
+    author = User.objects.create(username="author")
+    threads = [_make_thread(title, author, 3) for title in ("a", "b")]
+    with CaptureQueriesContext(connection) as captured:
+        threads[0].delete()
+        Thread.objects.filter(pk=threads[1].pk).delete()
+    assert not Thread.objects.exists() and not Post.objects.exists()
+    assert not any('UPDATE "forum_thread"' in query["sql"] for query in captured.captured_queries)
+
+
+@pytest.mark.django_db
+def test_thread_list_orders_by_last_activity_and_paginates():
+    author = User.objects.create(username="author")
+    threads = [_make_thread(f"t{i}", author, 0) for i in range(25)]
+    Post.objects.create(thread=threads[0], author=author, content="bump")
+
+    client = Client()
+    response = client.get(reverse("forum:thread_list"))
+    page = response.context["page"]
+    assert page.items[0] == threads[0]
+    assert len(page.items) == 20 and page.has_next
+
+    response = client.get(reverse("forum:thread_list"), {"cursor": page.next_cursor})
+    assert len(response.context["threads"]) == 5
+    assert not response.context["page"].has_next
+
+
+@pytest.mark.django_db
+def test_thread_detail_query_count_is_constant():
+    author = User.objects.create(username="author")
+    small = _make_thread("small", author, 2)
+    large = _make_thread("large", author, 60)
+    client = Client()
+
+    with CaptureQueriesContext(connection) as small_ctx:
+        client.get(reverse("forum:thread_detail", kwargs={"pk": small.pk}))
+    with CaptureQueriesContext(connection) as large_ctx:
+        response = client.get(reverse("forum:thread_detail", kwargs={"pk": large.pk}))
+
+    assert len(large_ctx.captured_queries) == len(small_ctx.captured_queries)
+    assert response.context["page"].has_next
@@ -0,0 +1,53 @@
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.urls import reverse
+
+from mtg_app.fuzzy import CardNameIndex, normalize_name
+from mtg_app.models import Card, Deck, Printing, Set
+
+
+def test_normalize_name():
+    assert normalize_name("Jötun Grunt") == "jotun grunt"
+    assert normalize_name("Urza's Saga") == normalize_name("Urzas  saga")
+    assert normalize_name("Fire // Ice") == "fire ice"
+
+
+def test_index_ranks_typos():
+    index = CardNameIndex(
+        [(1, "Lightning Bolt"), (2, "Lightning Helix"), (3, "Counterspell"), (4, "Fire // Ice")]
+    )
+    candidates = index.search("Lightnig Bolt")
+    assert candidates[0].name == "Lightning Bolt"
+    assert candidates[0].printing_ids == (1,)
+    assert index.search("counterspel")[0].name == "Counterspell"
+    # Лицевая сторона split-карты находит всю карту
+    assert index.search("Ice")[0].name == "Fire // Ice"
+    assert index.search("zzzz") == []
+
+
+@pytest.mark.django_db
+def test_card_autocomplete_did_you_mean():
+    test_set = Set.objects.create(code="M10", name="Magic 2010")
+    printing = Printing.objects.create(
+        scryfall_id="fuzzy-001", name="Lightning Bolt", set=test_set, collector_number="146"
+    )
+    response = Client().get(reverse("mtg_app:card_autocomplete"), {"q": "Lightnig Blot"})
+    data = response.json()
+    assert data["did_you_mean"] == ["Lightning Bolt"]
+    assert data["results"][0]["id"] == printing.id
+
+
+@pytest.mark.django_db
+def test_add_deck_uses_fuzzy_fallback(tmp_path):
+    test_set = Set.objects.create(code="M10", name="Magic 2010")
+    printing = Printing.objects.create(
+        scryfall_id="fuzzy-002", name="Lightning Bolt", set=test_set, collector_number="146"
+    )
+    Card.objects.create(printing=printing)
+    deck_file = tmp_path / "deck.txt"
+    deck_file.write_text("4 Lightnig Bolt\n")
+
+    call_command("add_deck", "--deck_file", str(deck_file), "--deck_name", "Burn")
+
+    assert Deck.objects.get(name="Burn").cards.filter(printing__name="Lightning Bolt").exists()
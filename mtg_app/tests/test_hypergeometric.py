@@ -0,0 +1,91 @@
+from math import comb, log
+
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from mtg_app.decks import deck_composition
+from mtg_app.hypergeometric import Category, log_comb, probability, probability_table
+from mtg_app.models import Card, Deck, DeckCard, Printing, Set
+
+
+def test_log_comb_matches_math_comb():
+    assert float(log_comb(250, 40)) == pytest.approx(log(comb(250, 40)))
+    assert log_comb(5, [-1, 6]).tolist() == [float("-inf")] * 2
+
+
+def test_single_category_matches_exact_formula(hypergeom_at_least):
+    table = probability_table(60, [Category(24, at_least=3)], range(7, 14))
+    for draws, p in table.items():
+        assert p == pytest.approx(hypergeom_at_least(24, 60, draws, 3), rel=1e-9)
+    # Большая колода: без лог-пространства C(250, 100) не влез бы в float
+    assert probability(250, [Category(4)], 100) == pytest.approx(1 - comb(246, 100) / comb(250, 100), rel=1e-9)
+
+
+def test_multiple_categories_and_upper_bound():
+    # 2+ из 4 и 1..2 из 8 в 10 картах из 40 — прямой перебор
+    expected = sum(
+        comb(4, a) * comb(8, b) * comb(28, 10 - a - b)
+        for a in range(2, 5) for b in range(1, 3) if a + b <= 10
+    ) / comb(40, 10)
+    assert probability(40, [Category(4, 2), Category(8, 1, 2)], 10) == pytest.approx(expected, rel=1e-9)
+    assert probability(40, [Category(4, 5)], 10) == 0.0
+    assert probability(40, [], 0) == 1.0
+    with pytest.raises(ValueError):
+        probability(40, [Category(4)], 41)
+
+
+@pytest.fixture
+def deck(db):
+    cache.clear()
+    m19 = Set.objects.create(code="M19", name="Core 2019")
+    deck = Deck.objects.create(name="Mono Red")
+    cards = {}
+    for i, (name, type_line, quantity) in enumerate([("Mountain", "Basic Land — Mountain", 24),
+                                                      ("Lightning Bolt", "Instant", 4),
+                                                      ("Shock", "Instant", 32)]):
+        printing = Printing.objects.create(scryfall_id=name, name=name, set=m19, collector_number=str(i),
+                                           type_line=type_line)
+        cards[name] = Card.objects.create(printing=printing)
+        DeckCard.objects.create(deck=deck, card=cards[name], quantity=quantity)
+    return deck, cards
+
+
+@pytest.mark.django_db
+def test_odds_endpoint_turn_table(deck):
+    deck, cards = deck
+    url = reverse("mtg_app:deck_odds", args=[deck.pk])
+    data = Client().get(url, {"cat": ["lands:3", f"{cards['Lightning Bolt'].pk}"], "turns": 3, "on_play": 0}).json()
+
+    assert data["population"] == 60
+    assert [c["size"] for c in data["categories"]] == [24, 4]
+    assert list(data["turns"]) == ["1", "2", "3"] and list(data["draws"]) == ["8", "9", "10"]
+    expected = sum(
+        comb(24, a) * comb(4, b) * comb(32, 10 - a - b) for a in range(3, 11) for b in range(1, 5) if a + b <= 10
+    ) / comb(60, 10)
+    assert data["turns"]["3"] == pytest.approx(expected, abs=1e-6)
+
+
+@pytest.mark.django_db
+def test_odds_endpoint_rejects_bad_categories(deck):
+    deck, cards = deck
+    url = reverse("mtg_app:deck_odds", args=[deck.pk])
+    client = Client()
+    mountain = cards["Mountain"].pk
+    assert client.get(url, {"cat": ["lands", f"{mountain}"]}).status_code == 400
+    assert client.get(url, {"cat": "999999"}).status_code == 400
+    assert client.get(url, {"cat": "lands", "draws": "61"}).status_code == 400
+    assert client.get(url, {"cat": "x"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_composition_cached_by_version(deck, django_assert_num_queries):
+    deck, cards = deck
+    assert deck_composition(deck)["lands"] == [cards["Mountain"].pk]
+    with django_assert_num_queries(0):
+        deck_composition(deck)
+
+    DeckCard.objects.filter(deck=deck, card=cards["Shock"]).delete()
+    deck.refresh_from_db()
+    assert sum(deck_composition(deck)["cards"].values()) == 28
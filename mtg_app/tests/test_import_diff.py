@@ -0,0 +1,89 @@
+from unittest import mock
+
+import pytest
+from django.urls import reverse
+
+from data_processing.diff import compute_import_diff, prepare_preview
+from data_processing.models import ImportRun
+from data_processing.services import apply_import_diff
+from mtg_app.models import Card, Printing, Set
+from mtg_app.tests.test_import_run import _fake_session, _write_csv
+
+ROW = {"Set code": "M19", "Set name": "Core 2019", "Collector number": "1", "Image URL": ""}
+
+
+@pytest.fixture
+def collection(db):
+    m19 = Set.objects.create(code="M19", name="Core 2019")
+    shock = Printing.objects.create(scryfall_id="shock-1", name="Shock", set=m19, collector_number="156")
+    opt = Printing.objects.create(scryfall_id="opt-1", name="Opt", set=m19, collector_number="65")
+    Card.objects.create(printing=shock, quantity=2)
+    Card.objects.create(printing=opt, quantity=4)
+    return m19
+
+
+def test_diff_classifies_rows(tmp_path, collection):
+    csv_path = tmp_path / "cards.csv"
+    _write_csv(csv_path, [
+        {**ROW, "Name": "Shock", "Quantity": "3", "Scryfall ID": "shock-1"},
+        {**ROW, "Name": "Opt", "Quantity": "4", "Scryfall ID": "opt-1"},
+        {**ROW, "Name": "Duress", "Quantity": "1", "Scryfall ID": "duress-1"},
+        {**ROW, "Name": "Duress", "Quantity": "2", "Scryfall ID": "duress-1"},
+        {**ROW, "Name": "", "Scryfall ID": "broken"},
+    ])
+
+    diff = compute_import_diff(str(csv_path))
+
+    assert diff.summary == {
+        "total_rows": 5, "create": 1, "update": 1, "unchanged": 1, "errors": 1,
+        "merged_duplicates": 1, "quantity_delta": 4,
+    }
+    assert diff.errors == [{"row": 6, "message": "Нет ID, Имени или Кода Сета. Пропуск."}]
+    assert [(row_num, row["scryfall id"], row["quantity"]) for row_num, row in diff.planned_rows()] == [
+        (2, "shock-1", "3"), (4, "duress-1", "3"),
+    ]
+    assert Card.objects.get(printing__scryfall_id="shock-1").quantity == 2  # dry-run ничего не пишет
+
+
+def test_apply_reuses_stored_diff(tmp_path, settings, collection):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    csv_path = tmp_path / "cards.csv"
+    _write_csv(csv_path, [
+        {**ROW, "Name": "Shock", "Quantity": "3", "Scryfall ID": "shock-1"},
+        {**ROW, "Name": "Opt", "Quantity": "4", "Scryfall ID": "opt-1"},
+        {**ROW, "Name": "Duress", "Quantity": "1", "Scryfall ID": "duress-1"},
+        {**ROW, "Name": "", "Scryfall ID": "broken"},
+    ])
+    run = ImportRun.objects.create(file_name="cards.csv", status=ImportRun.Status.PREVIEW)
+    with open(csv_path, "rb") as f:
+        run.source_file.save("cards.csv", f)
+    prepare_preview(run)
+
+    with mock.patch("data_processing.diff.read_csv_frame") as read_csv, \
+            mock.patch("data_processing.services._session_with_retries", return_value=_fake_session()):
+        counters = apply_import_diff.apply(args=(run.pk,), kwargs={"throttle_sec": 0}).get()
+    read_csv.assert_not_called()
+
+    assert counters["created"] == 1 and counters["updated"] == 1
+    assert counters["errors"] == 1  # ошибка разбора из dry-run не теряется
+    assert Card.objects.get(printing__scryfall_id="shock-1").quantity == 3
+    assert Card.objects.get(printing__scryfall_id="duress-1").quantity == 1
+    run.refresh_from_db()
+    assert run.status == ImportRun.Status.SUCCESS
+    assert run.errors == [{"row": 5, "message": "Нет ID, Имени или Кода Сета. Пропуск."}]
+    assert not run.diff_file and not run.source_file
+
+
+def test_apply_is_queued_once(client, django_user_model, collection):
+    client.force_login(django_user_model.objects.create_user("staff", password="pw", is_staff=True))
+    run = ImportRun.objects.create(file_name="cards.csv", status=ImportRun.Status.PREVIEW)
+    url = reverse("data_processing:import_preview", args=[run.pk])
+
+    with mock.patch("data_processing.views.apply_import_diff.delay", return_value=mock.Mock(id="task-1")) as delay:
+        assert client.post(url, {"action": "apply"}).status_code == 302
+        # Параллельный запрос уже прочитал run в статусе PREVIEW, но применять не должен
+        with mock.patch("data_processing.views.get_object_or_404", return_value=run):
+            assert client.post(url, {"action": "apply"}).status_code == 302
+    delay.assert_called_once_with(run.pk)
+    run.refresh_from_db()
+    assert run.status == ImportRun.Status.PENDING and run.task_id == "task-1"
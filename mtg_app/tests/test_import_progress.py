@@ -0,0 +1,67 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import AsyncClient
+from django.urls import reverse
+
+from data_processing.progress import ProgressPublisher, add_progress, progress_key, read_progress
+
+
+def test_progress_publisher_throttles_by_rows():
+    cache.clear()
+    publisher = ProgressPublisher("task-throttle", total=1000, min_interval=3600, every_rows=200)
+    published = sum(publisher.update(i) for i in range(1, 1001))
+    assert published == 5
+    assert read_progress("task-throttle")["current"] == 1000
+
+    publisher.finish({"created": 3})
+    assert read_progress("task-throttle")["results"] == {"created": 3}
+
+
+def test_parallel_progress_does_not_go_backwards():
+    cache.clear()
+    add_progress("task-chunks", 100, total=300)
+    add_progress("task-chunks", 100, total=300)
+    # Часть, посчитавшая 100 строк, записала свой снимок последней
+    cache.set(progress_key("task-chunks"), {"state": "PROGRESS", "current": 100, "total": 300})
+    assert read_progress("task-chunks")["current"] == 200
+
+    add_progress("task-chunks", 150, total=300)
+    assert read_progress("task-chunks")["current"] == 300
+
+
+@async_to_sync
+async def _get(client, url):
+    return await client.get(url)
+
+
+@async_to_sync
+async def _read_stream(response):
+    # Поток — асинхронный генератор (ASGI), читаем его так же, как uvicorn
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+@pytest.mark.django_db
+def test_import_progress_stream_sends_final_event_once():
+    cache.clear()
+    user = User.objects.create_user(username="importer", password="pass")
+    client = AsyncClient()
+    client.force_login(user)
+    session = client.session
+    session["csv_import_task_id"] = "task-sse"
+    session.save()
+
+    cache.set(
+        progress_key("task-sse"),
+        {"state": "SUCCESS", "current": 2, "total": 2, "results": {"created": 2}},
+    )
+    url = reverse("data_processing:import_progress_stream")
+
+    response = _get(client, url)
+    body = _read_stream(response).decode()
+    assert response["Content-Type"] == "text/event-stream"
+    assert '"state": "SUCCESS"' in body
+
+    assert _get(client, url).status_code == 204
+    assert "csv_import_task_id" not in client.session
@@ -0,0 +1,155 @@
+import csv
+from unittest import mock
+
+import pytest
+from celery import signature
+
+from data_processing.models import ImportRun
+from data_processing.progress import read_progress
+from data_processing.services import (
+    CANONICAL_FIELD_MAP, _fan_out_rows, _make_ctx, _new_counters, process_uploaded_csv,
+)
+from data_processing.telemetry import ImportTelemetry
+from mtg_app.models import Card
+
+HEADERS = ["Name", "Set code", "Set name", "Collector number", "Quantity", "Scryfall ID", "Image URL"]
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=HEADERS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _fake_session():
+    session = mock.MagicMock()
+    api = mock.MagicMock()
+    api.json.return_value = {"cmc": 1.0, "mana_cost": "{R}", "type_line": "Instant", "colors": ["R"]}
+    image = mock.MagicMock(content=b"img", headers={"Content-Type": "image/png"})
+    session.get.side_effect = lambda url, timeout: api if "api.scryfall.com" in url else image
+    return session
+
+
+@pytest.mark.django_db
+def test_import_records_run_ledger(tmp_path, settings):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    csv_path = tmp_path / "cards.csv"
+    _write_csv(
+        csv_path,
+        [
+            {"Name": "Shock", "Set code": "M19", "Set name": "Core 2019", "Collector number": "156",
+             "Quantity": "2", "Scryfall ID": "shock-1", "Image URL": "https://img.example/shock.png"},
+            {"Name": "", "Set code": "M19", "Scryfall ID": "broken"},
+        ],
+    )
+
+    with mock.patch("data_processing.services._session_with_retries", return_value=_fake_session()), \
+            mock.patch("mtg_app.signals.bump_index_version") as bump_index_version:
+        counters = process_uploaded_csv.apply(
+            args=(str(csv_path),), kwargs={"throttle_sec": 0}
+        ).get()
+
+    assert counters["created"] == 1 and counters["errors"] == 1
+    assert counters["downloaded"] == 1 and counters["skipped_img_missing"] == 0
+    printing = Card.objects.get(printing__scryfall_id="shock-1").printing
+    assert printing.cmc == 1.0 and printing.pips_r == 1
+    # Индекс названий сбрасывает только создание печати, не обогащение и картинка
+    assert bump_index_version.call_count == 1
+
+    run = ImportRun.objects.get()
+    assert run.status == ImportRun.Status.SUCCESS
+    assert run.total_rows == run.processed_rows == 2
+    assert set(run.stage_timings) == {"parse", "db_write", "enrichment", "image_download"}
+    assert run.http_calls == {"scryfall_api": 1, "image_download": 1}
+    assert run.errors[0]["row"] == 3
+
+
+@pytest.mark.django_db
+def test_import_resumes_from_checkpoint(tmp_path, settings):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.IMPORT_CHUNK_SIZE = 1
+    csv_path = tmp_path / "cards.csv"
+    row = {"Set code": "M19", "Set name": "Core 2019", "Image URL": "https://img.example/x.png"}
+    rows = [
+        {**row, "Name": "Shock", "Collector number": "156", "Quantity": "2", "Scryfall ID": "shock-1"},
+        {**row, "Name": "Opt", "Collector number": "65", "Quantity": "1", "Scryfall ID": "opt-1"},
+        {**row, "Name": "Shock", "Collector number": "156", "Quantity": "3", "Scryfall ID": "shock-1"},
+    ]
+    _write_csv(csv_path, rows)
+
+    # Первая строка уже была записана до "падения" воркера
+    with mock.patch("data_processing.services._session_with_retries", return_value=_fake_session()):
+        process_uploaded_csv.apply(args=(str(csv_path),), kwargs={"throttle_sec": 0})
+    run = ImportRun.objects.get()
+    ImportRun.objects.filter(pk=run.pk).update(
+        status=ImportRun.Status.RUNNING, committed_rows=1, processed_rows=1,
+        counters={"created": 1},
+    )
+    Card.objects.filter(printing__scryfall_id="shock-1").update(quantity=2)
+    Card.objects.filter(printing__scryfall_id="opt-1").delete()
+    _write_csv(csv_path, rows)  # успешный импорт удалил файл
+
+    with mock.patch("data_processing.services._session_with_retries", return_value=_fake_session()):
+        counters = process_uploaded_csv.apply(
+            args=(str(csv_path),), kwargs={"throttle_sec": 0, "import_run_id": run.pk}
+        ).get()
+
+    run.refresh_from_db()
+    assert run.status == ImportRun.Status.SUCCESS
+    assert run.resumed_from == 1 and run.processed_rows == 3
+    assert counters["created"] == 2
+    assert Card.objects.get(printing__scryfall_id="shock-1").quantity == 5
+    assert not csv_path.exists()
+
+
+@pytest.mark.django_db
+def test_large_import_fans_out_and_merges_results(tmp_path, settings):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.IMPORT_PARALLEL_THRESHOLD = 3
+    settings.IMPORT_PART_SIZE = 2
+    csv_path = tmp_path / "cards.csv"
+    row = {"Set code": "M19", "Set name": "Core 2019", "Image URL": "https://img.example/x.png"}
+    _write_csv(
+        csv_path,
+        [
+            {**row, "Name": "Shock", "Collector number": "156", "Quantity": "2", "Scryfall ID": "shock-1"},
+            {**row, "Name": "Opt", "Collector number": "65", "Quantity": "1", "Scryfall ID": "opt-1"},
+            {**row, "Name": "Shock", "Collector number": "156", "Quantity": "3", "Scryfall ID": "shock-1"},
+            {**row, "Name": "Duress", "Set code": "XLN", "Collector number": "105", "Scryfall ID": "duress-1"},
+            {**row, "Name": "", "Scryfall ID": "broken"},
+        ],
+    )
+
+    with mock.patch("data_processing.services._session_with_retries", return_value=_fake_session()):
+        counters = process_uploaded_csv.apply(
+            args=(str(csv_path),), kwargs={"throttle_sec": 0}
+        ).get()
+
+    assert counters["created"] == 3 and counters["errors"] == 1
+    assert counters["merged_duplicates"] == 1
+    assert Card.objects.get(printing__scryfall_id="shock-1").quantity == 5
+    assert Card.objects.get(printing__scryfall_id="duress-1").printing.set.code == "XLN"
+
+    run = ImportRun.objects.get()
+    assert run.status == ImportRun.Status.SUCCESS
+    assert run.processed_rows == 5
+    assert [e["row"] for e in run.errors] == [6]
+    assert run.http_calls["image_download"] == 3
+
+
+@pytest.mark.django_db
+def test_failed_fan_out_marks_run_failed(tmp_path, settings):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    run = ImportRun.objects.create(file_name="big.csv", status=ImportRun.Status.RUNNING, total_rows=4)
+    ctx = _make_ctx(CANONICAL_FIELD_MAP, _new_counters(), ImportTelemetry(), 0)
+    fan_out = _fan_out_rows(run, [], ctx, "progress-1")
+
+    # Errback callback'а chord'а срабатывает, если упала любая часть
+    errback = signature(fan_out.body.options["link_error"][0])
+    errback.apply(args=("part-1",))
+
+    run.refresh_from_db()
+    assert run.status == ImportRun.Status.FAILURE and run.finished_at
+    assert run.counters["errors"] == 1 and "part-1" in run.errors[-1]["message"]
+    assert read_progress("progress-1")["state"] == "FAILURE"
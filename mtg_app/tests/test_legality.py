@@ -0,0 +1,113 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from mtg_app.legality import copy_limit, legality_bits, refresh_deck_legality, validate_deck, validate_decks
+from mtg_app.models import Card, Deck, DeckCard, Printing, format_bit
+
+ALL_LEGAL = {"standard": "legal", "modern": "legal", "legacy": "legal", "vintage": "legal", "commander": "legal"}
+
+
+def test_legality_bits():
+    legal, restricted = legality_bits({"modern": "legal", "vintage": "restricted", "legacy": "banned",
+                                       "standard": "not_legal"})
+    assert legal == format_bit("modern") | format_bit("vintage")
+    assert restricted == format_bit("vintage")
+    assert legality_bits({}) == (None, 0)
+
+
+def test_copy_limit():
+    assert copy_limit("Basic Snow Land — Island", "", 4) is None
+    assert copy_limit("Creature — Rat", "A deck can have any number of cards named Relentless Rats.", 4) is None
+    assert copy_limit("Creature — Dwarf", "A deck can have up to seven cards named Seven Dwarves.", 4) == 7
+    assert copy_limit("Instant", "", 1) == 1
+
+
+@pytest.fixture
+def catalog(make_catalog):
+    specs = {
+        "Mountain": ("Basic Land — Mountain", "", ALL_LEGAL),
+        "Lightning Bolt": ("Instant", "", {**ALL_LEGAL, "standard": "not_legal"}),
+        "Ponder": ("Sorcery", "", {**ALL_LEGAL, "modern": "banned", "vintage": "restricted"}),
+        "Shock": ("Instant", "", ALL_LEGAL),
+        "Mystery": ("Instant", "", None),
+    }
+    cards = make_catalog({
+        name: dict(zip(("type_line", "oracle_text", "legal_formats", "restricted_formats"),
+                       (type_line, oracle_text, *legality_bits(legalities))))
+        for name, (type_line, oracle_text, legalities) in specs.items()
+    })
+    # Вторая печать Shock — копии складываются по названию
+    shock = cards["Shock"].printing
+    reprint = Printing.objects.create(scryfall_id="Shock-2", name="Shock", set=shock.set, collector_number="99",
+                                      type_line="Instant", legal_formats=legality_bits(ALL_LEGAL)[0])
+    cards["Shock (reprint)"] = Card.objects.create(printing=reprint)
+    return cards
+
+
+@pytest.mark.django_db
+def test_validate_deck_reports_each_rule(catalog, make_deck):
+    legal = make_deck(catalog, {"Mountain": 48, "Lightning Bolt": 4, "Ponder": 4, "Shock": 2, "Shock (reprint)": 2},
+                      format="legacy")
+    assert validate_deck(legal) == []
+
+    modern = make_deck(catalog, {"Mountain": 40, "Ponder": 1, "Shock": 3, "Shock (reprint)": 3}, format="modern")
+    assert validate_deck(modern) == [
+        "Карт в колоде: 47, нужно не меньше 60.",
+        "«Ponder» запрещена или не легальна в формате modern.",
+        "«Shock»: копий 6, можно не больше 4.",
+    ]
+
+    vintage = make_deck(catalog, {"Mountain": 56, "Ponder": 2, "Mystery": 2}, format="vintage")
+    assert validate_deck(vintage) == [
+        "«Mystery»: легальность неизвестна (нет данных каталога).",
+        "«Ponder»: копий 2, можно не больше 1.",
+    ]
+
+    commander = make_deck(catalog, {"Mountain": 98, "Shock": 1, "Shock (reprint)": 1}, format="commander")
+    assert validate_deck(commander) == ["«Shock»: копий 2, можно не больше 1."]
+    assert validate_deck(Deck.objects.create(name="Casual")) == []
+
+
+@pytest.mark.django_db
+def test_refresh_public_decks_in_one_batch(catalog, django_assert_num_queries, make_deck):
+    decks = [make_deck(catalog, {"Mountain": 56, "Lightning Bolt": 4}, format="legacy") for _ in range(5)]
+    banned = make_deck(catalog, {"Mountain": 56, "Lightning Bolt": 4}, format="standard")
+    private = make_deck(catalog, {"Mountain": 1}, format="legacy", is_private=True)
+
+    with django_assert_num_queries(5):  # id колод, форматы, состав, два UPDATE
+        assert refresh_deck_legality() == {"legal": 5, "illegal": 1}
+    assert set(Deck.objects.filter(is_legal=True).values_list("pk", flat=True)) == {d.pk for d in decks}
+    banned.refresh_from_db()
+    private.refresh_from_db()
+    assert banned.is_legal is False and private.is_legal is None
+
+    # Изменение состава сбрасывает результат проверки
+    DeckCard.objects.filter(deck=decks[0], card=catalog["Mountain"]).update(quantity=10)
+    DeckCard.objects.get(deck=decks[0], card=catalog["Lightning Bolt"]).save()
+    decks[0].refresh_from_db()
+    assert decks[0].is_legal is None
+    assert validate_decks([decks[0].pk]) == {decks[0].pk: ["Карт в колоде: 14, нужно не меньше 60."]}
+
+
+@pytest.mark.django_db
+def test_deck_detail_shows_issues(catalog, make_deck):
+    deck = make_deck(catalog, {"Mountain": 56, "Lightning Bolt": 4}, format="standard")
+    response = Client().get(reverse("mtg_app:deck_detail", args=[deck.pk]))
+    assert response.context["legality_issues"] == ["«Lightning Bolt» запрещена или не легальна в формате standard."]
+    assert "не легальна" in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_deck_list_filters_by_legality(catalog, make_deck):
+    legal = make_deck(catalog, {"Mountain": 56, "Lightning Bolt": 4}, format="legacy")
+    banned = make_deck(catalog, {"Mountain": 56, "Lightning Bolt": 4}, format="standard")
+    unchecked = make_deck(catalog, {"Mountain": 60}, format="modern")
+    refresh_deck_legality([legal.pk, banned.pk])
+
+    client, url = Client(), reverse("mtg_app:deck_list")
+    assert [d.pk for d in client.get(url, {"legal": "1"}).context["decks"]] == [legal.pk]
+    assert [d.pk for d in client.get(url, {"legal": "0"}).context["decks"]] == [banned.pk]
+    response = client.get(url)
+    assert {d.pk for d in response.context["decks"]} == {legal.pk, banned.pk, unchecked.pk}
+    assert "Legacy: легальна" in response.content.decode()
@@ -0,0 +1,61 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from mtg_app.mana import ManaCost, parse_mana_cost
+from mtg_app.models import Card, Printing, Set
+
+
+@pytest.mark.parametrize("cost, expected", [
+    ("", ManaCost()),
+    ("{2}{U}{U}", ManaCost(pips_u=2, generic_mana=2)),
+    ("{X}{X}{R}", ManaCost(pips_r=1, x_count=2)),
+    ("{W/U}{W/U}", ManaCost(pips_w=2, pips_u=2)),
+    ("{1}{B/P}", ManaCost(pips_b=1, generic_mana=1)),
+    ("{2/W}{2/W}", ManaCost(pips_w=2)),
+    ("{G/U/P}", ManaCost(pips_g=1, pips_u=1)),
+    ("{C}{C}{10}", ManaCost(pips_c=2, generic_mana=10)),
+    ("{1}{R} // {2}{U}", ManaCost(pips_r=1, pips_u=1, generic_mana=3)),
+])
+def test_parse_mana_cost(cost, expected):
+    assert parse_mana_cost(cost) == expected
+
+
+def _printing(set_obj, name, cost, cmc):
+    return Printing.objects.create(
+        scryfall_id=f"id-{name}", name=name, set=set_obj, collector_number=name, mana_cost=cost, cmc=cmc
+    )
+
+
+@pytest.mark.django_db
+def test_save_fills_pip_columns():
+    set_obj = Set.objects.create(code="tst", name="Test")
+    printing = _printing(set_obj, "Counterspell", "{U}{U}", 2)
+    printing.refresh_from_db()
+    assert (printing.pips_u, printing.generic_mana) == (2, 0)
+
+    printing.mana_cost = "{3}{W}"
+    printing.save(update_fields=["mana_cost"])
+    printing.refresh_from_db()
+    assert (printing.pips_w, printing.pips_u, printing.generic_mana) == (1, 0, 3)
+
+
+@pytest.mark.django_db
+def test_card_list_cmc_range_and_pips(client):
+    user = get_user_model().objects.create_user("mage", password="x")
+    set_obj = Set.objects.create(code="tst", name="Test")
+    for name, cost, cmc in [("Bolt", "{R}", 1), ("Counterspell", "{U}{U}", 2),
+                            ("Cancel", "{1}{U}{U}", 3), ("Inspiration", "{3}{U}", 4)]:
+        Card.objects.create(owner=user, printing=_printing(set_obj, name, cost, cmc))
+
+    def names(**params):
+        response = client.get(reverse("mtg_app:card_list"), params)
+        assert response.status_code == 200
+        return sorted(card.printing.name for card in response.context["cards"])
+
+    assert names(cmc="2") == ["Counterspell"]
+    assert names(cmc="<=2") == ["Bolt", "Counterspell"]
+    assert names(cmc=">3") == ["Inspiration"]
+    assert names(cmc="2-3") == ["Cancel", "Counterspell"]
+    assert names(pips_u=2) == ["Cancel", "Counterspell"]
+    assert names(pips_u=1, cmc="<4") == ["Cancel", "Counterspell"]
@@ -3,10 +3,11 @@ from unittest import mock  # Для мокирования
 import pandas as pd  # Убедитесь, что pandas установлен в окружении тестов
 import pytest
 from django.core.management import call_command
+from django.db import IntegrityError, transaction
 from django.test import Client
 from django.urls import NoReverseMatch, reverse
 
-from mtg_app.models import Card, Deck, Set
+from mtg_app.models import Card, Deck, Printing, Set
 
 
 @pytest.fixture
@@ -17,25 +18,65 @@ def client():
 @pytest.mark.django_db
 def test_card_creation():
     """
-    Тестирует создание объекта Card с правильной связью на Set.
+    Тестирует создание записи коллекции (Card) поверх печати (Printing) с правильной связью на Set.
     """
     test_set = Set.objects.create(code="LEA", name="Alpha")
-    card = Card.objects.create(
+    printing = Printing.objects.create(
         scryfall_id="scry-test-001",
         name="Black Lotus",
         set=test_set,
         collector_number="1",
-        foil=False,
         rarity="Rare",
+        image_url="http://example.com/black_lotus.jpg",
+    )
+    card = Card.objects.create(
+        printing=printing,
+        foil=False,
         quantity=1,
         purchase_price="0",
         language="English",
         condition="Near Mint",
-        image_url="http://example.com/black_lotus.jpg",
     )
     assert Card.objects.count() == 1
     # Используем переменную card, чтобы избежать F841
-    assert Card.objects.filter(pk=card.pk, name="Black Lotus").exists()
+    assert Card.objects.filter(pk=card.pk, printing__name="Black Lotus").exists()
+    assert card.printing.name == "Black Lotus" and card.printing.set == test_set
+
+
+@pytest.mark.django_db
+def test_ownerless_card_is_unique_per_printing():
+    test_set = Set.objects.create(code="LEA", name="Alpha")
+    printing = Printing.objects.create(scryfall_id="lotus", name="Black Lotus", set=test_set, collector_number="1")
+    Card.objects.create(printing=printing)
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Card.objects.create(printing=printing)
+    # get_or_create (import_cards, process_uploaded_csv) находит существующую запись
+    assert not Card.objects.get_or_create(printing=printing, owner=None)[1]
+
+
+@pytest.mark.django_db
+def test_add_card_view_owns_entry_and_rejects_duplicate(client, django_user_model):
+    user = django_user_model.objects.create_user("mage", password="pw")
+    other = django_user_model.objects.create_user("other", password="pw")
+    test_set = Set.objects.create(code="LEA", name="Alpha")
+    printings = [
+        Printing.objects.create(scryfall_id=f"p-{i}", name=f"Card {i}", set=test_set, collector_number=str(i))
+        for i in range(3)
+    ]
+    client.force_login(user)
+    url = reverse("mtg_app:add_card")
+
+    page = client.get(url).content.decode()
+    assert "Card 2" not in page and 'data-autocomplete-url="/' in page  # каталог не рендерится целиком
+
+    data = {"printing": printings[0].pk, "quantity": 2, "purchase_price": "0", "purchase_price_currency": "RUB",
+            "owner": other.pk}
+    assert client.post(url, data).status_code == 302
+    assert Card.objects.get(printing=printings[0]).owner == user  # owner из запроса игнорируется
+
+    response = client.post(url, data)
+    assert response.status_code == 200 and response.context["form"].errors["printing"]
+    assert Card.objects.filter(printing=printings[0]).count() == 1
 
 
 @pytest.mark.django_db
@@ -133,9 +174,9 @@ def test_import_cards_command(mock_read_csv, tmp_path):
     call_command("import_cards")
 
     # Проверяем, что карта была создана на основе мокированных данных
-    assert Card.objects.filter(name="Test Card From Mock").exists()
-    created_card = Card.objects.get(name="Test Card From Mock")
-    assert created_card.set.code == "LEA"
+    assert Card.objects.filter(printing__name="Test Card From Mock").exists()
+    created_card = Card.objects.get(printing__name="Test Card From Mock")
+    assert created_card.printing.set.code == "LEA"
     assert created_card.foil is False  # так как "false"
 
     # Убедимся, что mock_read_csv действительно вызывался
@@ -154,17 +195,12 @@ def test_update_images_command(mock_os_path_exists):
 
     test_set = Set.objects.create(code="LEA", name="Alpha")
     # Создаём карту с пустым URL — команда должна его обновить
-    card = Card.objects.create(
+    card = Printing.objects.create(
         scryfall_id="scry-image-001",
         name="Test Image Card",
         set=test_set,
         collector_number="imgtst",
-        foil=False,
         rarity="Rare",
-        quantity=1,
-        purchase_price="0",
-        language="English",
-        condition="Near Mint",
         image_url="",
     )
 
@@ -187,19 +223,24 @@ def test_add_deck_command(tmp_path):
     deck_file.write_text("1 Black Lotus\n")
 
     test_set, _ = Set.objects.get_or_create(code="LEA", defaults={"name": "Alpha"})
-    Card.objects.get_or_create(
+    printing, _ = Printing.objects.get_or_create(
         name="Black Lotus",
         set=test_set,
         defaults={
             "scryfall_id": "unique-scryfall-id-for-black-lotus-in-deck-test",
             "collector_number": "1",
-            "foil": False,
             "rarity": "Rare",
+            "image_url": "http://example.com/image.jpg",
+        },
+    )
+    Card.objects.get_or_create(
+        printing=printing,
+        defaults={
+            "foil": False,
             "quantity": 1,
             "purchase_price": "0",
             "language": "English",
             "condition": "Near Mint",
-            "image_url": "http://example.com/image.jpg",
         },
     )
 
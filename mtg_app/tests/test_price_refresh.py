@@ -0,0 +1,57 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from data_processing.tasks import cards_due_for_pricing, refresh_card_prices
+from mtg_app.models import Printing, Set
+
+
+def _printing(m19, scryfall_id, *, price="0", priced_days_ago=None, added_days_ago=60):
+    now = timezone.now()
+    printing = Printing.objects.create(
+        scryfall_id=scryfall_id, name=scryfall_id, set=m19, collector_number="1",
+        market_price=Decimal(price),
+        priced_at=now - timedelta(days=priced_days_ago) if priced_days_ago is not None else None,
+    )
+    Printing.objects.filter(pk=printing.pk).update(added_at=now - timedelta(days=added_days_ago))
+    return printing
+
+
+@pytest.mark.django_db
+def test_due_cards_are_prioritized_by_tier():
+    m19 = Set.objects.create(code="M19", name="Core 2019")
+    _printing(m19, "bulk-fresh", price="0.10", priced_days_ago=10)   # дешевая, месяц еще не прошел
+    _printing(m19, "bulk-stale", price="0.10", priced_days_ago=40)
+    _printing(m19, "normal-stale", price="3", priced_days_ago=8)
+    _printing(m19, "hot-stale", price="50", priced_days_ago=2)
+    _printing(m19, "hot-fresh", price="50", priced_days_ago=0)
+    _printing(m19, "new-card", price="0.10", priced_days_ago=2, added_days_ago=1)
+    _printing(m19, "never")
+
+    due = list(cards_due_for_pricing().values_list("scryfall_id", flat=True))
+
+    assert due == ["never", "hot-stale", "new-card", "normal-stale", "bulk-stale"]
+
+
+@pytest.mark.django_db
+def test_refresh_respects_request_budget(settings):
+    settings.PRICE_REFRESH_BUDGET = 1
+    m19 = Set.objects.create(code="M19", name="Core 2019")
+    for i in range(80):
+        _printing(m19, f"card-{i:02d}")
+
+    session = mock.MagicMock()
+    session.post.return_value.json.side_effect = lambda: {
+        "data": [{"id": ident["id"], "prices": {"usd": "1.50"}} for ident in session.post.call_args.kwargs["json"]["identifiers"]][:-1]
+    }
+    with mock.patch("data_processing.tasks._session_with_retries", return_value=session), \
+            mock.patch("data_processing.tasks.time.sleep"):
+        result = refresh_card_prices()
+
+    assert session.post.call_count == 1
+    assert result == "Updated: 74, Errors: 0, Requests: 1"
+    assert Printing.objects.filter(priced_at__isnull=False).count() == 75  # без цены — тоже помечены
+    assert Printing.objects.filter(market_price=Decimal("1.50"), market_price_currency="USD").count() == 74
@@ -0,0 +1,49 @@
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+from data_processing.models import ImportRun
+from data_processing.services import process_uploaded_csv
+from mtg_app.models import Card, Deck, DeckCard, Printing, Set
+from mtg_app.tests.test_import_run import _fake_session, _write_csv
+
+
+@pytest.mark.django_db
+def test_two_owners_share_one_printing(tmp_path, settings):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    row = {"Name": "Shock", "Set code": "M19", "Set name": "Core 2019", "Collector number": "156",
+           "Scryfall ID": "shock-1", "Image URL": ""}
+    User = get_user_model()
+
+    for username, quantity in (("alice", "2"), ("bob", "3")):
+        csv_path = tmp_path / f"{username}.csv"
+        _write_csv(csv_path, [{**row, "Quantity": quantity}])
+        run = ImportRun.objects.create(user=User.objects.create(username=username))
+        with mock.patch("data_processing.services._session_with_retries", return_value=_fake_session()):
+            process_uploaded_csv.apply(args=(str(csv_path),), kwargs={"throttle_sec": 0, "import_run_id": run.pk})
+
+    printing = Printing.objects.get()
+    assert printing.cmc == 1.0  # обогащение пишет в общий каталог
+    assert dict(printing.entries.values_list("owner__username", "quantity")) == {"alice": 2, "bob": 3}
+
+
+@pytest.mark.django_db
+def test_collection_pages_render(django_assert_max_num_queries):
+    m19 = Set.objects.create(code="M19", name="Core 2019")
+    deck = Deck.objects.create(name="Burn")
+    for i in range(5):
+        printing = Printing.objects.create(scryfall_id=f"id-{i}", name=f"Card {i}", set=m19, collector_number=str(i))
+        DeckCard.objects.create(deck=deck, card=Card.objects.create(printing=printing))
+    client = Client()
+
+    with django_assert_max_num_queries(7):  # из них 2 — фасеты (facets.compute_facets)
+        assert client.get(reverse("mtg_app:card_list"), {"sort": "alphabetical"}).status_code == 200
+    card = Card.objects.first()
+    assert client.get(reverse("mtg_app:card_detail", args=[card.pk])).status_code == 200
+    assert client.get(reverse("mtg_app:set_detail", args=[m19.pk])).status_code == 200
+    assert client.get(reverse("mtg_app:set_list")).context["sets"][0].total_cards == 5
+    with django_assert_max_num_queries(5):
+        assert client.get(reverse("mtg_app:deck_detail", args=[deck.pk])).status_code == 200
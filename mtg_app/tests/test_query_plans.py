@@ -0,0 +1,146 @@
+"""
+Регрессия планов запросов для горячих страниц.
+
+Каждая комбинация view/фильтр/сортировка выполняется через тестовый клиент,
+SQL перехватывается и прогоняется через EXPLAIN. Тест падает, если план
+деградировал до полного сканирования таблицы или сортировки без индекса:
+  * SQLite — "SCAN <таблица>" без индекса, "USE TEMP B-TREE FOR ORDER BY";
+  * PostgreSQL — "Seq Scan" / "Sort" при выключенных enable_seqscan/enable_sort
+    (если узел остался, значит, подходящего индекса нет вовсе).
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from forum.models import Post, Thread
+from mtg_app.models import Card, Printing, Set
+from mtg_app.search import catalog_stats
+from mtg_app.views import CARD_SORTS
+
+HOT_TABLES = ("mtg_app_card", "mtg_app_printing", "forum_thread", "forum_post")
+
+
+@dataclass
+class PlanCase:
+    url_name: str
+    params: dict = field(default_factory=dict)
+    args: tuple = ()
+    # Полный проход по таблице допустим, когда страница по смыслу выводит её целиком
+    allow_full_scan: bool = False
+    # Сортировка по полю карты после выборки по индексу печати: отсортировать
+    # узкое подмножество дешевле, чем идти по индексу цены с проверкой фильтра
+    allow_sort: bool = False
+
+    @property
+    def id(self) -> str:
+        extra = ",".join(f"{k}={v}" for k, v in self.params.items())
+        return f"{self.url_name}[{extra}]"
+
+
+def _card_list_cases():
+    filters = {"set": "{set}", "rarity": "rare", "cmc": "2", "name_search": "{printing}"}
+    for sort in ["", *CARD_SORTS]:
+        on_card = sort.startswith("price") or not sort
+        yield PlanCase("mtg_app:card_list", {"sort": sort}, allow_full_scan=True)
+        for name, value in filters.items():
+            yield PlanCase("mtg_app:card_list", {name: value, "sort": sort}, allow_sort=on_card)
+        # Запрос идет от полнотекстового индекса: найденное сортируется после выборки
+        yield PlanCase("mtg_app:card_list", {"q": "o:deathtouch cmc<=3", "sort": sort}, allow_sort=True)
+
+
+CASES = [
+    *_card_list_cases(),
+    *(PlanCase("mtg_app:set_detail", {"sort": sort}, args=("{set}",), allow_sort=not sort or sort.startswith("price"))
+      for sort in ["", *CARD_SORTS]),
+    PlanCase("forum:thread_list"),
+    PlanCase("forum:thread_detail", args=("{thread}",)),
+]
+
+
+def _explain_sqlite(sql: str) -> list[str]:
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def _explain_postgres(sql: str) -> list[str]:
+    def walk(node):
+        relation = node.get("Relation Name", "")
+        yield f"{node['Node Type']} {relation}".strip()
+        for child in node.get("Plans", []):
+            yield from walk(child)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("SET LOCAL enable_sort = off")
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql)
+        plan = cursor.fetchone()[0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return list(walk(plan[0]["Plan"]))
+
+
+def plan_problems(sql: str, case: PlanCase) -> list[str]:
+    if connection.vendor == "sqlite":
+        steps = _explain_sqlite(sql)
+        full_scan = re.compile(rf"^SCAN ({'|'.join(HOT_TABLES)})$")
+        sort = "USE TEMP B-TREE FOR ORDER BY"
+    elif connection.vendor == "postgresql":
+        steps = _explain_postgres(sql)
+        full_scan = re.compile(rf"^Seq Scan ({'|'.join(HOT_TABLES)})$")
+        sort = "Sort"
+    else:
+        pytest.skip(f"EXPLAIN для {connection.vendor} не поддержан")
+
+    problems = []
+    if not case.allow_full_scan:
+        problems += [step for step in steps if full_scan.match(step)]
+    if not case.allow_sort:
+        problems += [step for step in steps if step == sort]
+    return problems
+
+
+@pytest.fixture
+def hot_data(db):
+    user = get_user_model().objects.create(username="planner")
+    sets = [Set.objects.create(code=f"S{i}", name=f"Set {i}") for i in range(3)]
+    printings = [
+        Printing.objects.create(
+            scryfall_id=f"p-{i}", name=f"Card {i}", set=sets[i % 3], collector_number=str(i),
+            rarity=("common", "rare")[i % 2], cmc=i % 6,
+        )
+        for i in range(30)
+    ]
+    for printing in printings:
+        Card.objects.create(printing=printing, owner=user, quantity=1 + printing.pk % 3)
+    catalog_stats()  # статистика планировщика поиска — раз на версию каталога, не в горячем пути
+    thread = Thread.objects.create(title="Plans", author=user)
+    for i in range(5):
+        Post.objects.create(thread=thread, author=user, content=f"post {i}")
+    return {"set": sets[0].pk, "printing": printings[0].pk, "thread": thread.pk}
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case.id)
+def test_hot_query_plans(case, hot_data):
+    params = {k: str(v).format(**hot_data) for k, v in case.params.items() if v != ""}
+    args = [str(a).format(**hot_data) for a in case.args]
+
+    with CaptureQueriesContext(connection) as captured:
+        response = Client().get(reverse(case.url_name, args=args), params)
+    assert response.status_code == 200
+
+    hot_queries = [
+        q["sql"] for q in captured.captured_queries
+        if q["sql"].lstrip().upper().startswith("SELECT") and any(t in q["sql"] for t in HOT_TABLES)
+    ]
+    assert hot_queries
+    failures = {sql: problems for sql in hot_queries if (problems := plan_problems(sql, case))}
+    assert not failures, "\n\n".join(f"{sql}\n  -> {problems}" for sql, problems in failures.items())
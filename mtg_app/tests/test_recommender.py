@@ -0,0 +1,75 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from mtg_app import recommender
+from mtg_app.models import Card, CardSimilarity, Printing, Set
+
+CATALOG = {
+    "Lightning Bolt": ("Instant", "Lightning Bolt deals 3 damage to any target."),
+    "Chain Lightning": ("Sorcery", "Chain Lightning deals 3 damage to any target."),
+    "Lava Spike": ("Sorcery — Arcane", "Lava Spike deals 3 damage to target player or planeswalker."),
+    "Llanowar Elves": ("Creature — Elf Druid", "{T}: Add {G}."),
+    "Elvish Mystic": ("Creature — Elf Druid", "{T}: Add {G}."),
+    "Counterspell": ("Instant", "Counter target spell."),
+    "Cancel": ("Instant", "Counter target spell."),
+}
+
+
+@pytest.fixture
+def catalog(db, settings, tmp_path):
+    settings.SIMILAR_CARDS_INDEX_PATH = tmp_path / "similar_cards.joblib"
+    settings.SIMILAR_CARDS_TOP_K = 2
+    m19 = Set.objects.create(code="M19", name="Core 2019")
+    for i, (name, (type_line, oracle_text)) in enumerate(CATALOG.items()):
+        printing = Printing.objects.create(scryfall_id=name, name=name, set=m19, collector_number=str(i),
+                                           type_line=type_line, oracle_text=oracle_text)
+        Card.objects.create(printing=printing)
+    # Вторая печать и еще не обогащенная печать в индекс не попадают
+    Printing.objects.create(scryfall_id="bolt-2", name="Lightning Bolt", set=m19, collector_number="99",
+                            type_line="Instant", oracle_text="Lightning Bolt deals 3 damage to any target.")
+    Printing.objects.create(scryfall_id="blank", name="Unknown", set=m19, collector_number="100")
+    return m19
+
+
+def _neighbors(name):
+    return [n for n, _ in CardSimilarity.objects.get(name=name).neighbors]
+
+
+@pytest.mark.django_db
+def test_build_finds_textual_neighbors(catalog):
+    assert recommender.build_similar_cards() == {"cards": 7, "updated": 7}
+    assert _neighbors("Lightning Bolt")[0] == "Chain Lightning"  # CARDNAME уравнивает тексты
+    assert _neighbors("Llanowar Elves")[0] == "Elvish Mystic"
+    assert _neighbors("Counterspell")[0] == "Cancel"
+    assert not CardSimilarity.objects.filter(name="Unknown").exists()
+    assert recommender.update_similar_cards() == {"cards": 7, "updated": 0}
+
+
+@pytest.mark.django_db
+def test_incremental_update_matches_new_card_both_ways(catalog):
+    recommender.build_similar_cards()
+    before = recommender.load_index().matrix.shape
+    Printing.objects.create(scryfall_id="essence", name="Essence Scatter", set=catalog, collector_number="7",
+                            type_line="Instant", oracle_text="Counter target creature spell.")
+
+    result = recommender.update_similar_cards()
+
+    index = recommender.load_index()
+    assert result["cards"] == 8 and index.matrix.shape == (before[0] + 1, before[1])  # словарь прежний
+    assert set(_neighbors("Essence Scatter")) == {"Counterspell", "Cancel"}
+    # У старых карт новая карта появилась там, где она сильнее прежнего k-го соседа
+    assert "Essence Scatter" in _neighbors("Counterspell")
+    assert "Essence Scatter" not in _neighbors("Lava Spike")
+    assert len(_neighbors("Counterspell")) == 2
+
+
+@pytest.mark.django_db
+def test_card_detail_shows_similar_cards(catalog, django_assert_max_num_queries):
+    recommender.build_similar_cards()
+    card = Card.objects.get(printing__name="Counterspell")
+    with django_assert_max_num_queries(4):
+        response = Client().get(reverse("mtg_app:card_detail", args=[card.pk]))
+    similar = response.context["similar"]
+    assert similar[0]["name"] == "Cancel"
+    assert similar[0]["card_id"] == Card.objects.get(printing__name="Cancel").pk
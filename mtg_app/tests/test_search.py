@@ -0,0 +1,118 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from mtg_app.models import Card, Printing, Set
+from mtg_app.search import And, Not, Or, SearchSyntaxError, Term, compile_query, parse_query
+
+CARDS = [
+    # name, set, rarity, cost, cmc, type_line, oracle_text, usd
+    ("Grim Flayer", "thb", "mythic", "{B}{G}", 2, "Creature — Human Warrior", "Trample. Deathtouch", "6.50"),
+    ("Typhoid Rats", "m20", "common", "{B}", 1, "Creature — Rat", "Deathtouch", "0.10"),
+    ("Counterspell", "m20", "uncommon", "{U}{U}", 2, "Instant", "Counter target spell.", "1.00"),
+    ("Thassa's Oracle", "thb", "rare", "{U}{U}", 2, "Creature — Merfolk Wizard",
+     "When Thassa's Oracle enters, look at the top X cards of your library.", "8.00"),
+    ("Baleful Strix", "m20", "rare", "{U}{B}", 2, "Artifact Creature — Bird", "Flying, deathtouch", "3.00"),
+    ("Sol Ring", "thb", "uncommon", "{1}", 1, "Artifact", "{T}: Add {C}{C}.", "2.00"),
+]
+
+
+@pytest.fixture
+def catalog(db):
+    sets = {code: Set.objects.create(code=code.upper(), name=code) for code in ("thb", "m20")}
+    return {
+        name: Printing.objects.create(
+            scryfall_id=f"id-{i}", name=name, set=sets[code], collector_number=str(i), rarity=rarity,
+            mana_cost=cost, cmc=cmc, type_line=type_line, oracle_text=text, market_price=Decimal(usd),
+        )
+        for i, (name, code, rarity, cost, cmc, type_line, text, usd) in enumerate(CARDS)
+    }
+
+
+def search(query):
+    return sorted(Printing.objects.filter(compile_query(query).q).values_list("name", flat=True))
+
+
+def test_parse_precedence_and_negation():
+    node = parse_query('t:creature -o:"draw a card" (r:m or r>=rare)')
+    assert isinstance(node, And)
+    creature, negated, either = node.children
+    assert creature == Term("type", ":", ("creature",), "t:creature")
+    assert isinstance(negated, Not) and negated.child.value == ("draw", "a", "card")
+    assert isinstance(either, Or) and [t.value for t in either.children] == ["mythic", "rare"]
+
+
+@pytest.mark.parametrize("query", ["", "t<3", "cmc:abc", "c:xz", "r:epic", "foo:bar", "(t:creature", "a)", "bolt or"])
+def test_parse_errors(query):
+    with pytest.raises(SearchSyntaxError):
+        parse_query(query)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("query, expected", [
+    ("t:creature o:deathtouch", ["Baleful Strix", "Grim Flayer", "Typhoid Rats"]),
+    ("t:creature c<=ub cmc<=3 o:deathtouch", ["Baleful Strix", "Typhoid Rats"]),
+    ("c=ub", ["Baleful Strix"]),
+    ("c:c", ["Sol Ring"]),
+    ("c>=u -t:creature", ["Counterspell"]),
+    ("r:mythic s:thb usd>5", ["Grim Flayer"]),
+    ("r>=rare", ["Baleful Strix", "Grim Flayer", "Thassa's Oracle"]),
+    ("usd<=1", ["Counterspell", "Typhoid Rats"]),
+    ("thass", ["Thassa's Oracle"]),
+    ('o:"counter target"', ["Counterspell"]),
+    ("s!=thb (t:instant or t:rat)", ["Counterspell", "Typhoid Rats"]),
+])
+def test_queries(catalog, query, expected):
+    assert search(query) == expected
+
+
+@pytest.mark.django_db
+def test_fulltext_index_follows_updates(catalog):
+    rats = catalog["Typhoid Rats"]
+    rats.oracle_text = "Menace"
+    rats.save()
+    assert search("o:deathtouch t:rat") == []
+    assert search("o:menace") == ["Typhoid Rats"]
+    rats.delete()
+    assert search("o:menace") == []
+
+
+@pytest.mark.django_db
+def test_planner_puts_selective_terms_first(catalog):
+    # Из шести печатей: 4 существа, 1 мифик, 3 с deathtouch
+    predicate = compile_query("t:creature o:deathtouch r:mythic")
+    assert predicate.text == "r:mythic o:deathtouch t:creature"
+    assert predicate.selectivity == pytest.approx(1 / 6 * 3 / 6 * 4 / 6)
+
+
+@pytest.mark.django_db
+def test_card_list_query(client, catalog):
+    user = get_user_model().objects.create_user("mage", password="x")
+    for printing in catalog.values():
+        Card.objects.create(owner=user, printing=printing)
+
+    response = client.get(reverse("mtg_app:card_list"), {"q": "t:creature usd>5"})
+    assert sorted(card.printing.name for card in response.context["cards"]) == ["Grim Flayer", "Thassa's Oracle"]
+
+    response = client.get(reverse("mtg_app:card_list"), {"q": "cmc<<3"})
+    assert response.status_code == 200
+    assert "ожидалось число" in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_restore_fulltext_triggers(catalog):
+    from django.db import connection
+
+    from mtg_app.search import restore_fulltext_triggers
+
+    if connection.vendor != "sqlite":
+        pytest.skip("триггеры FTS5 есть только в SQLite")
+    assert not restore_fulltext_triggers()
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TRIGGER mtg_app_printing_fts_au")
+    assert restore_fulltext_triggers()
+    catalog["Sol Ring"].oracle_text = "Menace"
+    catalog["Sol Ring"].save()
+    assert search("o:menace") == ["Sol Ring"]
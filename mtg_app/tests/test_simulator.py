@@ -0,0 +1,109 @@
+from unittest import mock
+
+import numpy as np
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from mtg_app.models import Card, Deck, DeckCard, Printing, Set
+from mtg_app.simulator import (
+    MAX_SIMULATION_CELLS, MulliganRules, _bottom_mask, land_colors, load_library, max_trials, run_simulation,
+)
+
+
+@pytest.fixture
+def boros(db):
+    """60 карт: 24 земли (12 Mountain, 12 Plains), 36 заклинаний."""
+    cache.clear()
+    m19 = Set.objects.create(code="M19", name="Core 2019")
+    deck = Deck.objects.create(name="Boros")
+    specs = [
+        ("Mountain", "Basic Land — Mountain", "", 12),
+        ("Plains", "Basic Land — Plains", "", 12),
+        ("Lightning Bolt", "Instant", "{R}", 4),
+        ("Raise the Alarm", "Instant", "{1}{W}", 32),
+    ]
+    cards = {}
+    for i, (name, type_line, mana_cost, quantity) in enumerate(specs):
+        printing = Printing.objects.create(scryfall_id=name, name=name, set=m19, collector_number=str(i),
+                                           type_line=type_line, mana_cost=mana_cost)
+        cards[name] = Card.objects.create(printing=printing)
+        DeckCard.objects.create(deck=deck, card=cards[name], quantity=quantity)
+    return deck, cards
+
+
+def test_land_colors():
+    assert land_colors("Basic Land — Mountain", "") == {"R"}
+    assert land_colors("Land", "{T}: Add {W} or {U}.") == {"W", "U"}
+    assert land_colors("Land", "{T}: Add one mana of any color.") == {"W", "U", "B", "R", "G"}
+
+
+def test_bottom_mask_keeps_lands_near_target():
+    hand = np.array([[True] * 5 + [False] * 2, [True] + [False] * 6])
+    mask = _bottom_mask(hand, np.array([2, 2]), target=3)
+    assert (hand & ~mask).sum(axis=1).tolist() == [3, 1]
+    assert mask.sum(axis=1).tolist() == [2, 2]
+
+
+@pytest.mark.django_db
+def test_simulation_matches_hypergeometric(boros, hypergeom_at_least):
+    deck, cards = boros
+    library = load_library(deck)
+    assert len(library.cards) == 60 and library.colors == ("W", "R")
+
+    result = run_simulation(library, trials=100_000, turns=4, rules=MulliganRules(max_mulligans=0),
+                            card_ids=[cards["Lightning Bolt"].pk])
+
+    # Без муллиганов: к ходу 3 на игре видно 7 + 2 карты
+    assert result["land_drops"]["3"] == pytest.approx(hypergeom_at_least(24, 60, 9, 3), abs=0.01)
+    assert result["cards"][str(cards["Lightning Bolt"].pk)]["1"] == pytest.approx(
+        hypergeom_at_least(4, 60, 7, 1), abs=0.01
+    )
+    assert result["hand_size"] == {"7": 1.0}
+
+
+@pytest.mark.django_db
+def test_mulligans_improve_land_drops(boros):
+    library = load_library(boros[0])
+    strict = run_simulation(library, trials=50_000, turns=3, rules=MulliganRules(max_mulligans=0))
+    london = run_simulation(library, trials=50_000, turns=3)
+
+    assert london["hand_size"]["7"] < 1.0
+    assert london["land_drops"]["2"] > strict["land_drops"]["2"]
+    assert london["all_colors"]["3"] <= min(london["colors"]["W"]["3"], london["colors"]["R"]["3"])
+
+
+@pytest.mark.django_db
+def test_simulate_endpoint_cached_by_version(boros, django_assert_max_num_queries):
+    deck, cards = boros
+    url = reverse("mtg_app:deck_simulate", args=[deck.pk])
+    client = Client()
+
+    first = client.get(url, {"trials": 20_000, "on_play": 0}).json()
+    assert first["on_play"] is False and first["trials"] == 20_000
+    with django_assert_max_num_queries(1):  # только сама колода, результат из кэша
+        assert client.get(url, {"trials": 20_000, "on_play": 0}).json() == first
+
+    DeckCard.objects.filter(deck=deck, card=cards["Mountain"]).delete()
+    assert client.get(url, {"trials": 20_000, "on_play": 0}).json()["library_size"] == 48
+    assert client.get(url, {"mulligans": 9}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_simulation_size_is_capped_and_unknown_cards_share_cache(boros):
+    deck, cards = boros
+    url = reverse("mtg_app:deck_simulate", args=[deck.pk])
+    client = Client()
+    assert max_trials(60) == MAX_SIMULATION_CELLS // 60
+
+    with mock.patch("mtg_app.simulator.run_simulation", wraps=run_simulation) as run:
+        first = client.get(url, {"trials": 5_000, "cards": cards["Lightning Bolt"].pk}).json()
+        # Чужие/несуществующие карты отбрасываются — тот же канонический прогон из кэша
+        again = client.get(url, {"trials": 5_000, "cards": f"{cards['Lightning Bolt'].pk},999999"}).json()
+    assert run.call_count == 1 and again == first
+
+    with mock.patch("mtg_app.simulator.run_simulation", return_value={"trials": 0}) as run:
+        client.get(url, {"trials": 500_000})
+    assert run.call_args.kwargs["trials"] == max_trials(60)
+
@@ -0,0 +1,106 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from mtg_app.models import Card, Deck, DeckCard, Printing, Set, TradeHave, WishlistItem
+from mtg_app.trades import find_trades, refresh_trade_index
+
+
+@pytest.fixture
+def market(db):
+    cache.clear()
+    User = get_user_model()
+    alice, bob, carol = (User.objects.create_user(name, password="pw") for name in ("alice", "bob", "carol"))
+    m19 = Set.objects.create(code="M19", name="Core 2019")
+    prices = {"Lightning Bolt": "2.00", "Counterspell": "1.00", "Thoughtseize": "10.00", "Mountain": "0.10"}
+    printings = {
+        name: Printing.objects.create(scryfall_id=name, name=name, set=m19, collector_number=str(i),
+                                      market_price=Decimal(price))
+        for i, (name, price) in enumerate(prices.items())
+    }
+
+    def own(user, name, quantity):
+        return Card.objects.create(printing=printings[name], owner=user, quantity=quantity)
+
+    bolts = own(alice, "Lightning Bolt", 6)
+    own(alice, "Mountain", 10)
+    own(bob, "Counterspell", 4)
+    own(bob, "Thoughtseize", 1)
+    own(carol, "Counterspell", 4)
+    # Четыре Bolt у Алисы заняты в колоде — свободно только два
+    deck = Deck.objects.create(name="Burn", owner=alice)
+    DeckCard.objects.create(deck=deck, card=bolts, quantity=4)
+
+    WishlistItem.objects.create(owner=alice, name="Counterspell", quantity=4)
+    WishlistItem.objects.create(owner=alice, name="Thoughtseize", quantity=1)
+    WishlistItem.objects.create(owner=bob, name="Lightning Bolt", quantity=4)
+    return {"alice": alice, "bob": bob, "carol": carol, "deck": deck, "bolts": bolts}
+
+
+@pytest.mark.django_db
+def test_refresh_trade_index_subtracts_deck_allocations(market, django_capture_on_commit_callbacks):
+    assert refresh_trade_index() == {"users": 3, "haves": 5}
+    assert TradeHave.objects.get(owner=market["alice"], name="Lightning Bolt").quantity == 2
+    assert refresh_trade_index() == {"users": 0, "haves": 0}  # ничего не менялось
+
+    with django_capture_on_commit_callbacks(execute=True):  # версии колоды растут после коммита
+        DeckCard.objects.filter(deck=market["deck"]).get().delete()  # колода освободила карты
+    assert refresh_trade_index()["users"] == 1
+    assert TradeHave.objects.get(owner=market["alice"], name="Lightning Bolt").quantity == 6
+
+    market["bolts"].quantity = 0
+    market["bolts"].save()
+    refresh_trade_index()
+    assert not TradeHave.objects.filter(owner=market["alice"], name="Lightning Bolt").exists()
+
+
+@pytest.mark.django_db
+def test_trade_index_allocates_by_deck_owner(market):
+    # Колода Боба с записью Кэрол (старые данные) не занимает карты Кэрол
+    deck = Deck.objects.create(name="Control", owner=market["bob"])
+    carol_counters = Card.objects.get(owner=market["carol"], printing__name="Counterspell")
+    DeckCard.objects.create(deck=deck, card=carol_counters, quantity=3)
+    refresh_trade_index()
+    assert TradeHave.objects.get(owner=market["carol"], name="Counterspell").quantity == 4
+    assert TradeHave.objects.get(owner=market["bob"], name="Counterspell").quantity == 1
+
+
+@pytest.mark.django_db
+def test_find_trades_is_mutual_and_balanced(market, django_assert_num_queries):
+    refresh_trade_index()
+    with django_assert_num_queries(5):
+        partners = find_trades(market["alice"])
+
+    # Carol ничего не хочет взамен — не партнер
+    assert [p["user"].username for p in partners] == ["bob"]
+    bob = partners[0]
+    assert bob["give"] == [{"name": "Lightning Bolt", "quantity": 2, "price": Decimal("2.00")}]
+    # Получить можно на $14 (Thoughtseize + 4 Counterspell), отдать — на $4: берем в пределах $4
+    assert bob["get"] == [{"name": "Counterspell", "quantity": 4, "price": Decimal("1.00")}]
+    assert bob["get_value"] == bob["give_value"] == Decimal("4.00") and bob["balance"] == 1.0
+
+    assert [p["user"].username for p in find_trades(market["bob"])] == ["alice"]
+    assert find_trades(market["carol"]) == []
+
+
+@pytest.mark.django_db
+def test_trades_page_and_wishlist(market):
+    refresh_trade_index([market["alice"].pk])  # чужие индексы строит периодическая задача
+    client = Client()
+    client.force_login(market["bob"])
+    response = client.get(reverse("mtg_app:trades"))
+    assert [p["user"].username for p in response.context["partners"]] == ["alice"]
+
+    assert client.post(reverse("mtg_app:trades"), {"name": "Mountain", "quantity": 3}).status_code == 302
+    assert client.post(reverse("mtg_app:trades"), {"name": "Mountain", "quantity": 5}).status_code == 302
+    assert WishlistItem.objects.get(owner=market["bob"], name="Mountain").quantity == 5
+    invalid = client.post(reverse("mtg_app:trades"), {"name": "Montain", "quantity": 1})
+    assert "Mountain" in str(invalid.context["form"].errors["name"])
+
+    item = WishlistItem.objects.get(owner=market["bob"], name="Mountain")
+    client.post(reverse("mtg_app:wishlist_remove", args=[item.pk]))
+    assert not WishlistItem.objects.filter(pk=item.pk).exists()
@@ -0,0 +1,140 @@
+"""
+Обмен: вишлисты и поиск партнеров.
+
+"Есть" — материализованный индекс TradeHave: по каждому названию
+свободные копии пользователя (коллекция минус карты в его колодах).
+Пересчитывается только для пользователей, чья версия коллекции
+(coverage.bump_collection_version — растет при изменении карт и колод)
+ушла от сохраненной в TradeIndexVersion; два сгруппированных запроса на
+всю пачку пользователей.
+
+"Хочу" — WishlistItem. Оба индекса лежат по (name, owner), так что партнеры
+ищутся запросами name IN (...) и группировкой строк по пользователю — без
+перебора пар пользователей. Встречное предложение выравнивается по
+рыночной стоимости: с более дорогой стороны берется столько копий,
+сколько укладывается в стоимость другой.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min, Sum
+
+from .coverage import collection_version_key
+from .models import Card, DeckCard, TradeHave, TradeIndexVersion, WishlistItem
+
+
+def refresh_trade_index(user_ids=None) -> dict[str, int]:
+    """Пересчитывает TradeHave тех пользователей (по умолчанию — всех владельцев карт),
+    чья версия коллекции разошлась с сохраненной."""
+    if user_ids is None:
+        owners = set(Card.objects.exclude(owner=None).values_list("owner_id", flat=True).distinct())
+        owners |= set(TradeIndexVersion.objects.values_list("user_id", flat=True))
+    else:
+        owners = set(user_ids)
+    current = cache.get_many([collection_version_key(pk) for pk in owners])
+    stored = dict(TradeIndexVersion.objects.filter(user_id__in=owners).values_list("user_id", "collection_version"))
+    versions = {
+        pk: current.get(collection_version_key(pk), 0) for pk in owners
+        if stored.get(pk) != current.get(collection_version_key(pk), 0)
+    }
+    if not versions:
+        return {"users": 0, "haves": 0}
+
+    collection = (
+        Card.objects.filter(owner_id__in=versions)
+        .values_list("owner_id", "printing__name")
+        .annotate(total=Sum("quantity"), price=Min("printing__market_price"))
+        .order_by()
+    )
+    allocated = dict(
+        ((owner_id, name), total)
+        for owner_id, name, total in DeckCard.objects.filter(deck__owner_id__in=versions)
+        .values_list("deck__owner_id", "card__printing__name")
+        .annotate(total=Sum("quantity"))
+        .order_by()
+    )
+    haves = [
+        TradeHave(owner_id=owner_id, name=name, quantity=total - allocated.get((owner_id, name), 0), market_price=price)
+        for owner_id, name, total, price in collection
+        if total > allocated.get((owner_id, name), 0)
+    ]
+    with transaction.atomic():
+        TradeHave.objects.filter(owner_id__in=versions).delete()
+        TradeHave.objects.bulk_create(haves, batch_size=1000)
+        TradeIndexVersion.objects.bulk_create(
+            [TradeIndexVersion(user_id=pk, collection_version=version) for pk, version in versions.items()],
+            update_conflicts=True, unique_fields=["user"], update_fields=["collection_version"],
+        )
+    return {"users": len(versions), "haves": len(haves)}
+
+
+def _balanced(items: list[dict], budget: Decimal) -> list[dict]:
+    """Копии с самых дорогих карт, пока стоимость не превысит budget (бесплатные — все)."""
+    chosen, spent = [], Decimal(0)
+    for item in sorted(items, key=lambda item: (-item["price"], item["name"])):
+        price = item["price"]
+        count = item["quantity"] if price <= 0 else min(item["quantity"], int((budget - spent) // price))
+        if count > 0:
+            chosen.append({**item, "quantity": count})
+            spent += count * price
+    return chosen
+
+
+def _value(items: list[dict]) -> Decimal:
+    return sum((item["quantity"] * item["price"] for item in items), Decimal(0))
+
+
+def find_trades(user, *, limit: int = 20) -> list[dict]:
+    """
+    Взаимные партнеры: у них есть что-то из моего вишлиста, а у меня — из их.
+    [{"user", "get": [...], "give": [...], "get_value", "give_value", "balance"}],
+    сначала самые крупные сбалансированные обмены.
+    """
+    wants = dict(WishlistItem.objects.filter(owner=user).values_list("name", "quantity"))
+    haves = {name: (quantity, price) for name, quantity, price in
+             TradeHave.objects.filter(owner=user).values_list("name", "quantity", "market_price")}
+
+    get = defaultdict(list)
+    for owner_id, name, quantity, price in (
+        TradeHave.objects.filter(name__in=list(wants)).exclude(owner=user)
+        .values_list("owner_id", "name", "quantity", "market_price")
+    ):
+        get[owner_id].append({"name": name, "quantity": min(quantity, wants[name]), "price": price})
+
+    give = defaultdict(list)
+    for owner_id, name, quantity in (
+        WishlistItem.objects.filter(name__in=list(haves), owner_id__in=list(get)).exclude(owner=user)
+        .values_list("owner_id", "name", "quantity")
+    ):
+        have, price = haves[name]
+        give[owner_id].append({"name": name, "quantity": min(quantity, have), "price": price})
+
+    partners = []
+    for owner_id in give:
+        get_items, give_items = get[owner_id], give[owner_id]
+        # Выравниваем по более дешевой стороне
+        if _value(get_items) > _value(give_items):
+            get_items = _balanced(get_items, _value(give_items))
+        else:
+            give_items = _balanced(give_items, _value(get_items))
+        if not get_items or not give_items:
+            continue
+        get_value, give_value = _value(get_items), _value(give_items)
+        high = max(get_value, give_value)
+        partners.append({
+            "user_id": owner_id,
+            "get": get_items,
+            "give": give_items,
+            "get_value": get_value,
+            "give_value": give_value,
+            "balance": float(min(get_value, give_value) / high) if high else 1.0,
+        })
+    partners.sort(key=lambda p: (-min(p["get_value"], p["give_value"]), -p["balance"], p["user_id"]))
+    partners = partners[:limit]
+    users = get_user_model().objects.in_bulk([p["user_id"] for p in partners])
+    return [{**p, "user": users[p["user_id"]]} for p in partners]
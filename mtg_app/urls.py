@@ -19,9 +19,15 @@ urlpatterns = [
     # Колоды
     path("decks/", views.deck_list, name="deck_list"),
     path("decks/", views.deck_list, name="decks_list"),  # алиас
+    path("decks/buildable/", views.buildable_decks, name="buildable_decks"),
     path("decks/<int:pk>/", views.deck_detail, name="deck_detail"),
+    path("decks/<int:pk>/simulate/", views.deck_simulate, name="deck_simulate"),
+    path("decks/<int:pk>/odds/", views.deck_odds, name="deck_odds"),
     path("decks/<int:pk>/delete/", views.delete_deck, name="deck_delete"),
     path("decks/<int:pk>/delete/", views.delete_deck, name="decks_delete"),  # алиас
+    # Обмен
+    path("trades/", views.trades, name="trades"),
+    path("trades/wishlist/<int:pk>/remove/", views.wishlist_remove, name="wishlist_remove"),
     # Добавление
     path("add-card/", views.add_card, name="add_card"),
     path("add-deck/", views.add_deck, name="add_deck"),
@@ -36,11 +42,16 @@ urlpatterns = [
     
     # ...
     path('deck/<int:pk>/edit/', views.deck_edit, name='deck_edit'),
+    path('deck/<int:pk>/save/', views.deck_save_changes, name='deck_save_changes'),
     path('deck/<int:pk>/delete/', views.deck_delete, name='deck_delete'),
     # ...
     path('api/get_card_image/', views.get_card_image, name='get_card_image'),
+    path('api/card_images/', views.get_card_images, name='get_card_images'),
+    path('api/card_autocomplete/', views.card_autocomplete, name='card_autocomplete'),
+    path('api/deck_card_autocomplete/', views.deck_card_autocomplete, name='deck_card_autocomplete'),
     
     # --- ДОБАВЬТЕ ЭТИ ДВЕ СТРОКИ (лучше в конец) ---
     path('api/get_user_decks/', views.get_user_decks, name='get_user_decks'),
     path('api/add_card_to_deck/', views.add_card_to_deck, name='add_card_to_deck'),
+    path('api/add_cards_to_deck/', views.add_cards_to_deck_bulk, name='add_cards_to_deck'),
 ]
@@ -1,26 +1,53 @@
 
+import json
+
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
+from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Count, Q, Sum
 from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.views.decorators.http import require_POST
 from django.http import HttpResponseForbidden
 from django.http import JsonResponse
 from django.conf import settings
 
 
-from mtg_app.models import Card, Deck, Set, DeckCard
+from mtg_app.models import Card, Deck, Printing, Set, DeckCard, WishlistItem
+from .analytics import deck_analytics
+from .coverage import collection_coverage, missing_cards
 from .filters import CardFilter
+from .decks import add_cards_to_deck, deck_composition, set_deck_quantities
+from .decorators import async_login_required, async_require_POST
+from .facets import card_facets
+from .deck_similarity import similar_decks
+from .fuzzy import suggest_card_names
+from .images import card_image_urls
+from .legality import validate_deck
+from .recommender import similar_cards
+from .trades import find_trades, refresh_trade_index
+from .hypergeometric import Category, probability_table
+from .simulator import HAND_SIZE, MAX_TRIALS, MAX_TURNS, MulliganRules, simulate_deck
 
 from .forms import CardForm, DeckForm
-from .forms import DeckForm, DeckCardFormSet, CardForm
+from .forms import DeckForm, DeckCardFormSet, CardForm, WishlistItemForm, card_choice_label
+
+
+# Сортировки списков карт; под каждую есть индекс (см. tests/test_query_plans.py)
+CARD_SORTS = {
+    "alphabetical": "printing__name",
+    "price": "purchase_price",
+    "price_desc": "-purchase_price",
+}
 
 
 def home(request):
-    latest_cards = Card.objects.all().order_by("-id")[:10]
+    latest_cards = Card.objects.select_related("printing__set").order_by("-id")[:10]
     popular_sets = Set.objects.all()[:5]
     return render(
         request,
@@ -31,7 +58,7 @@ def home(request):
 
 def card_list(request):
     
-    card_list_qs = Card.objects.all()
+    card_list_qs = Card.objects.select_related("printing__set")
 
     # 1. Применяем наш новый "умный" фильтр
     card_filter = CardFilter(request.GET, queryset=card_list_qs)
@@ -41,17 +68,13 @@ def card_list(request):
 
     # 3. Применяем сортировку поверх фильтров
     sort_option = request.GET.get("sort")
-    if sort_option == 'alphabetical':
-        filtered_cards = filtered_cards.order_by('name')
-    elif sort_option == 'price':
-        filtered_cards = filtered_cards.order_by('purchase_price')
-    elif sort_option == 'price_desc':
-        filtered_cards = filtered_cards.order_by('-purchase_price')
-    else:
-        filtered_cards = filtered_cards.order_by('-id')
+    filtered_cards = filtered_cards.order_by(CARD_SORTS.get(sort_option, '-id'))
 
     # 5. Считаем общее количество
     total_cards_sum = filtered_cards.aggregate(total=Sum("quantity"))["total"] or 0
+
+    # 6. Фасеты текущей выборки (два сгруппированных запроса, в кэше по ключу фильтра)
+    facets = card_facets(card_filter.qs, request.GET, card_filter.filters)
     
     return render(
         request,
@@ -60,18 +83,19 @@ def card_list(request):
             'filter': card_filter,  # Передаем форму фильтра
             'cards': filtered_cards,
             'total_cards': total_cards_sum, 
+            'facets': facets,
             'sort': sort_option # Передаем 'sort' для <select>
         },
     )
 
 def card_detail(request, pk):
-    card = get_object_or_404(Card, id=pk)
-    return render(request, "mtg_app/card_detail.html", {"card": card})
+    card = get_object_or_404(Card.objects.select_related("printing__set"), id=pk)
+    return render(request, "mtg_app/card_detail.html", {"card": card, "similar": similar_cards(card.printing.name)})
 
 
 def set_list(request):
     sort = request.GET.get("sort", "")
-    sets = Set.objects.annotate(total_cards=Count("cards"))
+    sets = Set.objects.annotate(total_cards=Count("printings__entries"))
 
     if sort == "alphabetical":
         sets = sets.order_by("name")
@@ -83,17 +107,9 @@ def set_list(request):
 
 def set_detail(request, pk):
     set_obj = get_object_or_404(Set, id=pk)
-    cards = set_obj.cards.all()
+    cards = Card.objects.filter(printing__set=set_obj).select_related("printing__set")
     sort = request.GET.get("sort")
-
-    if sort == "alphabetical":
-        cards = cards.order_by("name")
-    elif sort == "price":
-        cards = cards.order_by("purchase_price")
-    elif sort == "price_desc":
-        cards = cards.order_by("-purchase_price")
-    else:
-        cards = cards.order_by("-id")
+    cards = cards.order_by(CARD_SORTS.get(sort, "-id"))
 
     total_cards = cards.aggregate(total=Sum("quantity"))["total"] or 0
 
@@ -110,13 +126,27 @@ def deck_list(request):
     else:
         decks = Deck.objects.filter(is_private=False)
 
+    # Результат ночной проверки легальности (legality.refresh_deck_legality)
+    legal = request.GET.get("legal")
+    if legal in ("1", "0"):
+        decks = decks.filter(is_legal=legal == "1")
+
     sort = request.GET.get("sort")
     if sort == "alphabetical":
         decks = decks.order_by("name")
     else:
         decks = decks.order_by("-created_at")
 
-    return render(request, "mtg_app/deck_list.html", {"decks": decks, "sort": sort})
+    return render(request, "mtg_app/deck_list.html", {"decks": decks, "sort": sort, "legal": legal})
+
+
+@login_required
+def buildable_decks(request):
+    """Публичные колоды по готовности из коллекции пользователя."""
+    page = Paginator(collection_coverage(request.user), 30).get_page(request.GET.get("page"))
+    decks = Deck.objects.select_related("owner").in_bulk([item["deck_id"] for item in page])
+    rows = [{**item, "deck": decks[item["deck_id"]]} for item in page if item["deck_id"] in decks]
+    return render(request, "mtg_app/buildable_decks.html", {"page": page, "rows": rows})
 
 
 def deck_detail(request, pk):
@@ -125,11 +155,11 @@ def deck_detail(request, pk):
     if deck.is_private and deck.owner != request.user:
         raise Http404("Колода не найдена")
 
-    cards = deck.cards.all()
+    cards = deck.cards.select_related("printing__set")
     sort = request.GET.get("sort")
 
     if sort == "alphabetical":
-        cards = cards.order_by("name")
+        cards = cards.order_by("printing__name")
     elif sort == "purchase_price":
         cards = cards.order_by("purchase_price")
     elif sort == "purchase_price_desc":
@@ -137,7 +167,139 @@ def deck_detail(request, pk):
     else:
         cards = cards.order_by("-id")
 
-    return render(request, "mtg_app/deck_detail.html", {"deck": deck, "cards": cards, "sort": sort})
+    # Состав колоды вместе с печатями — одним запросом
+    deck_cards = deck.deckcard_set.select_related("card__printing")
+
+    return render(
+        request,
+        "mtg_app/deck_detail.html",
+        {
+            "deck": deck,
+            "cards": cards,
+            "deck_cards": deck_cards,
+            "sort": sort,
+            "analytics": deck_analytics(deck),
+            "legality_issues": validate_deck(deck) if deck.format else None,
+            "similar_decks": similar_decks(deck, limit=5),
+            "missing": missing_cards(request.user, deck)
+            if request.user.is_authenticated and deck.owner_id != request.user.pk else None,
+        },
+    )
+
+
+def deck_simulate(request, pk):
+    """
+    API: goldfish-симуляция колоды (JSON).
+    ?trials=100000&turns=6&on_play=1&mulligans=2&cards=12,34
+    """
+    deck = get_object_or_404(Deck, id=pk)
+    if deck.is_private and deck.owner != request.user:
+        raise Http404("Колода не найдена")
+
+    try:
+        trials = min(int(request.GET.get("trials", 100_000)), MAX_TRIALS)
+        turns = min(int(request.GET.get("turns", 6)), MAX_TURNS)
+        rules = MulliganRules(max_mulligans=int(request.GET.get("mulligans", MulliganRules.max_mulligans)))
+        card_ids = [int(part) for part in request.GET.get("cards", "").split(",") if part]
+        if trials < 1 or turns < 1 or rules.max_mulligans < 0:
+            raise ValueError("trials, turns и mulligans должны быть положительными.")
+        result = simulate_deck(
+            deck,
+            trials=trials,
+            turns=turns,
+            on_play=request.GET.get("on_play", "1") != "0",
+            rules=rules,
+            card_ids=card_ids,
+            workers=settings.DECK_SIMULATION_WORKERS,
+        )
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    return JsonResponse(result)
+
+
+def _parse_odds_category(spec: str, composition: dict) -> tuple[Category, list[int]]:
+    """"12,34:2" — хотя бы 2 из карт 12 и 34; "lands:3:4" — от 3 до 4 земель."""
+    cards_part, _, bounds = spec.partition(":")
+    card_ids = []
+    for token in filter(None, cards_part.split(",")):
+        card_ids.extend(composition["lands"] if token == "lands" else [int(token)])
+    card_ids = list(dict.fromkeys(card_ids))
+    missing = [card_id for card_id in card_ids if card_id not in composition["cards"]]
+    if not card_ids or missing:
+        raise ValueError(f"Карт нет в колоде: {missing}" if missing else "Пустая категория.")
+    at_least, _, at_most = bounds.partition(":")
+    category = Category(
+        size=sum(composition["cards"][card_id] for card_id in card_ids),
+        at_least=int(at_least or 1),
+        at_most=int(at_most) if at_most else None,
+    )
+    return category, card_ids
+
+
+def deck_odds(request, pk):
+    """
+    API: точные вероятности добора для колоды (JSON).
+    ?cat=12,34:2&cat=lands:3 — все условия сразу (категории не должны пересекаться);
+    ?turns=6&on_play=1 — таблица по ходам, либо ?draws=7,10 — по числу карт.
+    """
+    deck = get_object_or_404(Deck, id=pk)
+    if deck.is_private and deck.owner != request.user:
+        raise Http404("Колода не найдена")
+
+    composition = deck_composition(deck)
+    population = sum(composition["cards"].values())
+    try:
+        parsed = [_parse_odds_category(spec, composition) for spec in request.GET.getlist("cat")]
+        seen = [card_id for _, card_ids in parsed for card_id in card_ids]
+        if len(seen) != len(set(seen)):
+            raise ValueError("Одна карта не может входить в несколько категорий.")
+        on_play = request.GET.get("on_play", "1") != "0"
+        if "draws" in request.GET:
+            turns = None
+            draws = [int(part) for part in request.GET["draws"].split(",") if part]
+        else:
+            turns = range(1, min(int(request.GET.get("turns", 6)), population) + 1)
+            draws = [min(HAND_SIZE + turn - (1 if on_play else 0), population) for turn in turns]
+        table = probability_table(population, [category for category, _ in parsed], draws)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    result = {
+        "population": population,
+        "categories": [
+            {"cards": card_ids, "size": c.size, "at_least": c.at_least, "at_most": c.at_most}
+            for c, card_ids in parsed
+        ],
+        "draws": {str(d): round(p, 6) for d, p in table.items()},
+    }
+    if turns is not None:
+        result["turns"] = {str(turn): round(table[d], 6) for turn, d in zip(turns, draws, strict=True)}
+    return JsonResponse(result)
+
+
+@login_required
+def trades(request):
+    """Вишлист пользователя и взаимные партнеры по обмену."""
+    form = WishlistItemForm(request.POST or None)
+    if request.method == "POST" and form.is_valid():
+        WishlistItem.objects.update_or_create(
+            owner=request.user, name=form.cleaned_data["name"], defaults={"quantity": form.cleaned_data["quantity"]}
+        )
+        return redirect("mtg_app:trades")
+
+    refresh_trade_index([request.user.pk])  # свой индекс — сразу, остальные обновляет задача
+    return render(request, "mtg_app/trades.html", {
+        "form": form,
+        "wishlist": request.user.wishlist.order_by("name"),
+        "partners": find_trades(request.user),
+    })
+
+
+@login_required
+@require_POST
+def wishlist_remove(request, pk):
+    get_object_or_404(WishlistItem, pk=pk, owner=request.user).delete()
+    return redirect("mtg_app:trades")
 
 
 def register(request):
@@ -157,10 +319,10 @@ def register(request):
 def add_card(request):
     if request.method == "POST":
         form = CardForm(request.POST, request.FILES)
+        # До валидации: дубликат печати в коллекции — ошибка формы, а не IntegrityError
+        form.instance.owner = request.user
         if form.is_valid():
-            card = form.save(commit=False)
-            card.owner = request.user
-            card.save()
+            form.save()
             return redirect("mtg_app:cards_list")
     else:
         form = CardForm()
@@ -172,7 +334,7 @@ def add_deck(request):
     if request.method == "POST":
         form = DeckForm(request.POST)
         # prefix='deck_cards' обязателен, так как он прописан в JS
-        formset = DeckCardFormSet(request.POST, prefix='deck_cards')
+        formset = DeckCardFormSet(request.POST, prefix='deck_cards', form_kwargs={'owner': request.user})
         
         if form.is_valid() and formset.is_valid():
             # 1. Сохраняем саму колоду
@@ -204,7 +366,7 @@ def add_deck(request):
             messages.error(request, "Ошибка сохранения. Проверьте данные.")
     else:
         form = DeckForm()
-        formset = DeckCardFormSet(prefix='deck_cards')
+        formset = DeckCardFormSet(prefix='deck_cards', form_kwargs={'owner': request.user})
         
     return render(request, 'mtg_app/add_deck.html', {
         'form': form,
@@ -236,7 +398,7 @@ def deck_edit(request, pk):
     
     if request.method == "POST":
         form = DeckForm(request.POST, instance=deck)
-        formset = DeckCardFormSet(request.POST, instance=deck, prefix='deck_cards')
+        formset = DeckCardFormSet(request.POST, instance=deck, prefix='deck_cards', form_kwargs={'owner': request.user})
         
         if form.is_valid() and formset.is_valid():
             form.save()
@@ -256,7 +418,7 @@ def deck_edit(request, pk):
             print("Errors:", formset.errors)
     else:
         form = DeckForm(instance=deck)
-        formset = DeckCardFormSet(instance=deck, prefix='deck_cards')
+        formset = DeckCardFormSet(instance=deck, prefix='deck_cards', form_kwargs={'owner': request.user})
     
     return render(request, 'mtg_app/add_deck.html', {
         'form': form, 
@@ -264,6 +426,79 @@ def deck_edit(request, pk):
         'formset': formset
     })
 
+def _parse_deck_changes(payload) -> dict[int, int]:
+    """{"changes": [{"card_id": 1, "quantity": 3}, ...]} -> {1: 3}; 0 — убрать карту."""
+    changes = payload.get('changes', []) if isinstance(payload, dict) else None
+    if not isinstance(changes, list):
+        raise ValueError('changes должен быть списком.')
+    quantities = {}
+    for change in changes:
+        try:
+            card_id, quantity = int(change['card_id']), int(change['quantity'])
+        except (TypeError, KeyError, ValueError):
+            raise ValueError('Каждый элемент changes — {"card_id": int, "quantity": int}.')
+        if quantity < 0:
+            raise ValueError('quantity не может быть отрицательным.')
+        quantities[card_id] = quantity
+    return quantities
+
+
+@login_required
+@require_POST
+def deck_save_changes(request, pk):
+    """
+    API редактора колоды: сохраняет только изменения.
+    Тело — JSON: {"deck": {"name": ..., ...} (необязательно),
+                  "changes": [{"card_id": 1, "quantity": 3}, ...]}.
+    Нетронутые строки не отправляются и не валидируются заново.
+    """
+    deck = get_object_or_404(Deck, pk=pk)
+    if deck.owner != request.user:
+        return HttpResponseForbidden('Вы не владелец этой колоды.')
+
+    try:
+        payload = json.loads(request.body)
+        quantities = _parse_deck_changes(payload)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    form = None
+    if payload.get('deck') is not None:
+        form = DeckForm(payload['deck'], instance=deck)
+        if not form.is_valid():
+            return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
+
+    # Добавлять можно только карты своей коллекции; убрать (0) — любую строку колоды
+    owned = set(Card.objects.filter(pk__in=quantities, owner=request.user).values_list('pk', flat=True))
+    missing = sorted(card_id for card_id, quantity in quantities.items() if quantity and card_id not in owned)
+    if missing:
+        return JsonResponse({'status': 'error', 'message': 'Карты не найдены.', 'missing': missing}, status=404)
+
+    with transaction.atomic():
+        if form is not None:
+            form.save()
+        totals = set_deck_quantities(deck, quantities)
+
+    return JsonResponse({
+        'status': 'success',
+        'deck': {'id': deck.pk, **totals},
+        'redirect': reverse('mtg_app:deck_detail', args=[deck.pk]),
+    })
+
+
+@login_required
+def deck_card_autocomplete(request):
+    """API для Select2 в редакторе колоды: карты коллекции пользователя по названию."""
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'results': []})
+    cards = (
+        Card.objects.filter(owner=request.user, printing__name__icontains=query)
+        .select_related('printing__set')
+        .order_by('printing__name', 'id')[:20]
+    )
+    return JsonResponse({'results': [{'id': card.pk, 'text': card_choice_label(card)} for card in cards]})
+
 @login_required
 def deck_delete(request, pk):
     deck = get_object_or_404(Deck, pk=pk)
@@ -278,46 +513,72 @@ def deck_delete(request, pk):
         
     return render(request, 'mtg_app/deck_confirm_delete.html', {'deck': deck})
 
-def get_card_image(request):
+async def get_card_image(request):
     """API для получения URL картинки по ID карты (для AJAX)"""
-    card_id = request.GET.get('id')
-    if card_id:
-        try:
-            card = Card.objects.get(pk=card_id)
-            
-            # 1. Проверяем, есть ли физическое поле 'image' и есть ли в нем файл
-            if hasattr(card, 'image') and card.image:
-                return JsonResponse({'url': card.image.url})
-            
-            # 2. Если нет, проверяем поле ссылки 'image_url' (от CSV импорта)
-            elif hasattr(card, 'image_url') and card.image_url:
-                if card.image_url.startswith('http') or card.image_url.startswith('/'):
-                    return JsonResponse({'url': card.image_url})
-                else:
-                    return JsonResponse({'url': f"{settings.MEDIA_URL}{card.image_url}"})
-                    
-        except Card.DoesNotExist:
-            pass
-            
+    card_id = request.GET.get('id', '')
+    if card_id.isdigit():
+        images = (await sync_to_async(card_image_urls)([int(card_id)])).get(int(card_id))
+        if images:
+            return JsonResponse({'url': images['url']})
     return JsonResponse({'url': None})
 
+
+MAX_IMAGE_IDS = 200
+
+
+async def get_card_images(request):
+    """
+    API: картинки сразу для многих карт — ?ids=1,2,3.
+    Ответ: {"images": {"1": {"url", "small", "normal", "large"}, "2": null, ...}};
+    несуществующих id в ответе нет. Один вызов на экран вместо вызова на карту.
+    """
+    try:
+        card_ids = [int(part) for part in request.GET.get('ids', '').split(',') if part]
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'ids — список чисел через запятую.'}, status=400)
+    if len(card_ids) > MAX_IMAGE_IDS:
+        return JsonResponse({'status': 'error', 'message': f'Не больше {MAX_IMAGE_IDS} id за запрос.'}, status=400)
+
+    images = await sync_to_async(card_image_urls)(card_ids)
+    return JsonResponse({'images': {str(card_id): urls for card_id, urls in images.items()}})
+
+def card_autocomplete(request):
+    """
+    API для Select2: поиск карт по названию.
+    Если по подстроке ничего не нашлось — отдаем подсказки "Возможно, вы имели в виду".
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'results': [], 'did_you_mean': []})
+
+    printings = Printing.objects.filter(name__icontains=query).order_by('name').values('id', 'name')[:20]
+    results = [{'id': p['id'], 'text': p['name']} for p in printings]
+
+    did_you_mean = []
+    if not results:
+        for candidate in suggest_card_names(query):
+            results.append({'id': candidate.printing_ids[0], 'text': candidate.name})
+            did_you_mean.append(candidate.name)
+
+    return JsonResponse({'results': results, 'did_you_mean': did_you_mean})
+
 # --- API ДЛЯ "ДОБАВИТЬ В КОЛОДУ" ---
 
-@login_required
-def get_user_decks(request):
+@async_login_required
+async def get_user_decks(request):
     """
     API: Возвращает список колод пользователя (ID и Имя) 
     для модального окна.
     """
     decks = Deck.objects.filter(owner=request.user).order_by('-created_at')
     # Преобразуем в простой список словарей, понятный для JavaScript
-    decks_list = list(decks.values('id', 'name'))
+    decks_list = [deck async for deck in decks.values('id', 'name')]
     return JsonResponse({'decks': decks_list})
 
 
-@login_required
-@require_POST # Эта функция безопасности (принимает только POST-запросы)
-def add_card_to_deck(request):
+@async_login_required
+@async_require_POST # Эта функция безопасности (принимает только POST-запросы)
+async def add_card_to_deck(request):
     """
     API: Добавляет 1 карту (card_id) в выбранную колоду (deck_id).
     """
@@ -325,28 +586,22 @@ def add_card_to_deck(request):
         card_id = request.POST.get('card_id')
         deck_id = request.POST.get('deck_id')
 
-        card = Card.objects.get(pk=card_id)
-        deck = Deck.objects.get(pk=deck_id)
+        deck = await Deck.objects.aget(pk=deck_id)
 
         # Безопасность: Убедимся, что пользователь - владелец этой колоды
-        if deck.owner != request.user:
+        # (сравниваем id: deck.owner — ленивый запрос, в async-контексте запрещен)
+        if deck.owner_id != request.user.pk:
             return HttpResponseForbidden('Вы не являетесь владельцем этой колоды.')
 
-        # Находим или создаем запись
-        deck_card, created = DeckCard.objects.get_or_create(
-            deck=deck,
-            card=card,
-            defaults={'quantity': 1} # Если создаем, то 1 штука
-        )
+        # Карта — только из своей коллекции (чужая — как несуществующая)
+        card = await Card.objects.select_related("printing").aget(pk=card_id, owner=request.user)
 
-        if not created:
-            # Если карта уже была, просто увеличиваем количество
-            deck_card.quantity += 1
-            deck_card.save(update_fields=['quantity'])
+        # +1 атомарно в БД: параллельные клики не теряют обновлений
+        result = await sync_to_async(add_cards_to_deck)(deck, {card.pk: 1})
 
         return JsonResponse({
             'status': 'success',
-            'message': f"Карта '{card.name}' добавлена в '{deck.name}'. (Всего: {deck_card.quantity})",
+            'message': f"Карта '{card.printing.name}' добавлена в '{deck.name}'. (Всего: {result['cards'][card.pk]})",
         })
 
     except Card.DoesNotExist:
@@ -354,4 +609,71 @@ def add_card_to_deck(request):
     except Deck.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'Колода не найдена.'}, status=404)
     except Exception as e:
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+MAX_BULK_CARDS = 500     # разных карт в одном запросе
+MAX_BULK_QUANTITY = 100  # копий одной карты за раз
+
+
+def _parse_bulk_cards(payload) -> dict[int, int]:
+    """[{"card_id": 1, "quantity": 4}, ...] -> {1: 4}; повторы card_id суммируются."""
+    items = payload.get('cards') if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ValueError('Ожидается непустой список cards.')
+    quantities: dict[int, int] = {}
+    for item in items:
+        try:
+            card_id, quantity = int(item['card_id']), int(item.get('quantity', 1))
+        except (TypeError, KeyError, ValueError):
+            raise ValueError('Каждый элемент cards — {"card_id": int, "quantity": int}.')
+        if not 1 <= quantity <= MAX_BULK_QUANTITY:
+            raise ValueError(f'quantity должно быть от 1 до {MAX_BULK_QUANTITY}.')
+        quantities[card_id] = quantities.get(card_id, 0) + quantity
+    if len(quantities) > MAX_BULK_CARDS:
+        raise ValueError(f'Не больше {MAX_BULK_CARDS} разных карт за запрос.')
+    return quantities
+
+
+@async_login_required
+@async_require_POST
+async def add_cards_to_deck_bulk(request):
+    """
+    API: Добавляет в колоду (deck_id) сразу много карт одним запросом.
+    Тело — JSON: {"deck_id": 1, "cards": [{"card_id": 5, "quantity": 4}, ...]}.
+    Все изменения применяются в одной транзакции; в ответе — новые
+    количества затронутых карт и итоги колоды.
+    """
+    try:
+        payload = json.loads(request.body)
+        quantities = _parse_bulk_cards(payload)
+        deck = await Deck.objects.aget(pk=payload.get('deck_id'))
+    except Deck.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'Колода не найдена.'}, status=404)
+    except ValueError as e:  # в т.ч. JSONDecodeError и нечисловой deck_id
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    if deck.owner_id != request.user.pk:
+        return HttpResponseForbidden('Вы не являетесь владельцем этой колоды.')
+
+    # Только карты коллекции пользователя (чужие — как несуществующие)
+    found = {
+        pk async for pk in Card.objects.filter(pk__in=quantities, owner=request.user).values_list('pk', flat=True)
+    }
+    missing = sorted(set(quantities) - found)
+    if missing:
+        return JsonResponse(
+            {'status': 'error', 'message': 'Карты не найдены.', 'missing': missing}, status=404
+        )
+
+    result = await sync_to_async(add_cards_to_deck)(deck, quantities)
+    return JsonResponse({
+        'status': 'success',
+        'deck': {
+            'id': deck.pk,
+            'name': deck.name,
+            'total_cards': result['total_cards'],
+            'unique_cards': result['unique_cards'],
+        },
+        'cards': [{'card_id': card_id, 'quantity': quantity} for card_id, quantity in result['cards'].items()],
+    })
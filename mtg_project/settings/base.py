@@ -105,6 +105,24 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 LOGIN_REDIRECT_URL = "mtg_app:home"
 LOGOUT_REDIRECT_URL = "mtg_app:home"
 
+# --- CACHE ---
+# Общий кэш (Redis) нужен, чтобы версии индексов были видны всем процессам.
+# Без REDIS_URL используется локальный кэш процесса (dev/тесты).
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 # --- CELERY SETTINGS ---
 # Указываем, что Redis (наш брокер) работает на стандартном порту
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
@@ -114,11 +132,61 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE # Используем часовой пояс из Django
 
+# Импорт CSV коммитится чанками: после падения воркера задача продолжит с чекпоинта
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "200"))
+# Файлы от IMPORT_PARALLEL_THRESHOLD строк делятся на части по IMPORT_PART_SIZE
+# и обрабатываются параллельно всеми свободными воркерами (Celery chord)
+IMPORT_PARALLEL_THRESHOLD = int(os.getenv("IMPORT_PARALLEL_THRESHOLD", "2000"))
+IMPORT_PART_SIZE = int(os.getenv("IMPORT_PART_SIZE", "500"))
+
+# Обновление цен: каждый запуск берет только устаревшие цены (по приоритету)
+# и делает не больше PRICE_REFRESH_BUDGET запросов (по 75 карт в запросе)
+PRICE_REFRESH_BUDGET = int(os.getenv("PRICE_REFRESH_BUDGET", "100"))
+PRICE_REFRESH_MAX_SECONDS = int(os.getenv("PRICE_REFRESH_MAX_SECONDS", "900"))
+PRICE_REFRESH_HIGH_VALUE = 10  # от этой цены карта обновляется ежедневно
+PRICE_REFRESH_BULK_VALUE = 1   # ниже — раз в месяц
+PRICE_REFRESH_RECENT_DAYS = 7  # новые карты тоже ежедневно
+
+# Goldfish-симулятор колод: >1 — испытания делятся между процессами
+DECK_SIMULATION_WORKERS = int(os.getenv("DECK_SIMULATION_WORKERS", "1"))
+
+# Похожие карты: TF-IDF индекс (матрица + словарь) нужен только воркеру Celery,
+# страница карты читает готовые списки соседей из БД
+SIMILAR_CARDS_INDEX_PATH = Path(os.getenv("SIMILAR_CARDS_INDEX_PATH", BASE_DIR / "var" / "similar_cards.joblib"))
+SIMILAR_CARDS_TOP_K = 10
+
 # --- CELERY BEAT SCHEDULE ---
 CELERY_BEAT_SCHEDULE = {
-    'update-card-prices-daily': {
-        'task': 'data_processing.tasks.update_all_card_prices',
-        # crontab(minute=0, hour=4) = запускать в 4:00 ночи
-        'schedule': crontab(minute=0, hour=4), 
+    'refresh-card-prices-hourly': {
+        'task': 'data_processing.tasks.refresh_card_prices',
+        # Каждый час в :00 — запуск ограничен бюджетом, а не размером коллекции
+        'schedule': crontab(minute=0),
+    },
+    'revalidate-deck-legality-daily': {
+        'task': 'data_processing.tasks.revalidate_deck_legality',
+        # После ночных обновлений цен: легальность печатей приходит в том же ответе Scryfall
+        'schedule': crontab(minute=30, hour=4),
+    },
+    'update-similar-cards-hourly': {
+        'task': 'data_processing.tasks.update_similar_cards',
+        # Только новые карты каталога; полная перестройка — раз в неделю
+        'schedule': crontab(minute=45),
+    },
+    'rebuild-similar-cards-weekly': {
+        'task': 'data_processing.tasks.rebuild_similar_cards',
+        'schedule': crontab(minute=0, hour=5, day_of_week=1),
+    },
+    'refresh-deck-signatures': {
+        'task': 'data_processing.tasks.refresh_deck_signatures',
+        # Берет только колоды, чья версия ушла вперед, — частый запуск дешев
+        'schedule': crontab(minute='*/10'),
+    },
+    'refresh-trade-index': {
+        'task': 'data_processing.tasks.refresh_trade_index',
+        'schedule': crontab(minute='*/15'),
+    },
+    'cluster-deck-archetypes-daily': {
+        'task': 'data_processing.tasks.cluster_deck_archetypes',
+        'schedule': crontab(minute=0, hour=5),
     },
 }
\ No newline at end of file